@@ -0,0 +1,191 @@
+# app/cache.py
+# api_cache 테이블 앞단에 프로세스 메모리 LRU 캐시를 둔 2단 캐시입니다.
+#
+#   1차: 메모리 (LRU + TTL, 크기 제한) → 적중 시 DB 왕복/JSON 디코딩 없음
+#   2차: MySQL api_cache 테이블 (워커/프로세스 간 공유)
+#
+# 서비스는 get_cached / set_cached 헬퍼만 사용하며,
+# 네임스페이스별 TTL과 적중/실패 카운터를 이 모듈에서 관리합니다.
+# 반환되는 데이터는 여러 요청이 공유하므로 읽기 전용으로 다뤄야 합니다.
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import CACHE_MEMORY_MAXSIZE
+from app.metrics import register_collector
+
+# 네임스페이스별 기본 TTL
+NAMESPACE_TTLS: Dict[str, timedelta] = {
+    "fmp_quote": timedelta(minutes=5),
+    "price_history": timedelta(hours=1),
+    "analyst_ratings": timedelta(hours=24),
+    "earnings_calendar": timedelta(hours=24),
+    "insider_trades": timedelta(hours=24),
+    "chat_answer": timedelta(hours=1),  # 데이터 버전이 키에 포함되므로 TTL은 상한 역할
+    "earnings_transcript_latest": timedelta(hours=24),  # "최신 분기" 조회 결과 (전문 자체는 영구 저장)
+}
+DEFAULT_TTL = timedelta(hours=1)
+
+# commit 전까지 메모리 계층에 올리지 않고 세션에 보류해 두는 값 (session.info 키)
+_PENDING_INFO_KEY = "cache_pending_memory"
+
+
+class LRUTTLCache:
+    """크기 제한이 있는 LRU + TTL 메모리 캐시 (스레드 안전)."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            deadline, value = entry
+            if deadline <= time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        if ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_memory = LRUTTLCache(CACHE_MEMORY_MAXSIZE)
+# namespace -> {"memory_hits", "db_hits", "misses"}
+_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"memory_hits": 0, "db_hits": 0, "misses": 0})
+
+
+def _ttl_for(namespace: str) -> timedelta:
+    return NAMESPACE_TTLS.get(namespace, DEFAULT_TTL)
+
+
+def get_cached(db: Session, namespace: str, cache_key: str) -> Optional[Any]:
+    """
+    캐시에서 값을 조회합니다. (메모리 → api_cache 순)
+    DB에서 찾은 값은 남은 만료 시간만큼 메모리에 올려 다음 조회를 메모리에서 처리합니다.
+    없거나 만료되었으면 None을 반환합니다.
+    """
+    hit, value = _memory.get(cache_key)
+    if hit:
+        _stats[namespace]["memory_hits"] += 1
+        print(f"[Cache HIT:memory] {cache_key}")
+        return value
+
+    now = datetime.now()
+    row = db.query(models.ApiCache).filter(
+        models.ApiCache.cache_key == cache_key,
+        models.ApiCache.expires_at > now,
+    ).first()
+    if row is None:
+        _stats[namespace]["misses"] += 1
+        print(f"[Cache MISS] {cache_key}")
+        return None
+
+    _stats[namespace]["db_hits"] += 1
+    print(f"[Cache HIT:db] {cache_key}")
+    remaining = min((row.expires_at - now).total_seconds(), _ttl_for(namespace).total_seconds())
+    _memory.set(cache_key, row.data, remaining)
+    return row.data
+
+
+def set_cached(
+    db: Session,
+    namespace: str,
+    cache_key: str,
+    data: Any,
+    ttl: Optional[timedelta] = None,
+) -> None:
+    """
+    두 캐시 계층에 값을 저장합니다.
+    DB에는 merge만 수행하므로, commit은 호출한 서비스의 트랜잭션에서 처리합니다.
+    메모리 계층은 그 commit이 성공한 뒤에 채워집니다 (롤백되면 버림).
+    """
+    ttl = ttl or _ttl_for(namespace)
+    db.merge(models.ApiCache(cache_key=cache_key, data=data, expires_at=datetime.now() + ttl))
+    db.info.setdefault(_PENDING_INFO_KEY, []).append((cache_key, data, time.monotonic() + ttl.total_seconds()))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    """commit 성공: 보류해 둔 값을 메모리 계층에 올립니다. (AsyncSession도 내부 Session으로 호출됨)"""
+    for cache_key, data, deadline in session.info.pop(_PENDING_INFO_KEY, []):
+        _memory.set(cache_key, data, deadline - time.monotonic())
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending(session: Session, transaction: Any) -> None:
+    """commit 없이 끝난 최상위 트랜잭션(롤백, 실패한 commit, close): 보류 값은 DB에 없으므로 버립니다."""
+    if transaction.parent is None:
+        session.info.pop(_PENDING_INFO_KEY, None)
+
+
+def invalidate_cached(cache_key: str) -> None:
+    """메모리 계층에서 키를 제거합니다. (DB 행은 만료 시각에 따라 자연 소멸)"""
+    _memory.delete(cache_key)
+
+
+def cache_stats() -> Dict[str, Any]:
+    """네임스페이스별 적중/실패 카운터와 메모리 캐시 상태를 반환합니다."""
+    namespaces = {}
+    for namespace, counters in _stats.items():
+        total = counters["memory_hits"] + counters["db_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["db_hits"]
+        namespaces[namespace] = {**counters, "hit_rate": round(hits / total, 4) if total else None}
+    return {
+        "memory_entries": len(_memory),
+        "memory_maxsize": _memory.maxsize,
+        "evictions": _memory.evictions,
+        "namespaces": namespaces,
+    }
+
+
+def _collect_cache_metrics():
+    """cache_stats 카운터를 /metrics 형식으로 변환합니다."""
+    results = {"memory_hits": "memory_hit", "db_hits": "db_hit", "misses": "miss"}
+    yield (
+        "cache_requests_total",
+        "counter",
+        "네임스페이스별 캐시 조회 결과",
+        [
+            ({"namespace": namespace, "result": result}, counters[field])
+            for namespace, counters in list(_stats.items())
+            for field, result in results.items()
+        ],
+    )
+    yield ("cache_memory_entries", "gauge", "메모리 캐시 항목 수", [({}, len(_memory))])
+    yield ("cache_memory_evictions_total", "counter", "메모리 캐시 LRU 축출 수", [({}, _memory.evictions)])
+
+
+register_collector(_collect_cache_metrics)
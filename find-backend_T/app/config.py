@@ -22,4 +22,50 @@ print(f"FMP Key Loaded: {FMP_API_KEY is not None}")
 
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 40))
\ No newline at end of file
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 40))
+
+# LLM 클라이언트 설정 (app/llm_client.py)
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 60))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 20))
+
+# MCP 도구 병렬 실행 설정 (app/mcp/executor.py)
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", 4))
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", 30))
+
+# 2단 캐시 설정 (app/cache.py)
+CACHE_MEMORY_MAXSIZE = int(os.getenv("CACHE_MEMORY_MAXSIZE", 2048))
+
+# 도구 응답 토큰 예산 (app/mcp/compaction.py)
+TOOL_OUTPUT_TOKEN_BUDGET = int(os.getenv("TOOL_OUTPUT_TOKEN_BUDGET", 1500))
+CONVERSATION_TOOL_TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOOL_TOKEN_BUDGET", 6000))
+
+# 의도 라우터의 선행 도구 실행 여부 (app/mcp/intent_router.py)
+INTENT_ROUTER_PREFETCH = os.getenv("INTENT_ROUTER_PREFETCH", "true").lower() == "true"
+
+# 에이전트 실행 모드: "react"(턴마다 도구 선택) | "plan"(계획 → DAG 실행 → 종합) (app/mcp/planner.py)
+AGENT_MODE = os.getenv("AGENT_MODE", "react")
+
+# LLM으로 찾은 기업명 → 티커 학습 별칭 (app/services/learned_aliases.py)
+# 재사용(hits) + 수락(accepts) 횟수가 이 값에 도달하면 메모리 별칭 인덱스에 승격
+LEARNED_ALIAS_PROMOTE_COUNT = int(os.getenv("LEARNED_ALIAS_PROMOTE_COUNT", 2))
+
+# 인증 사용자 조회 캐시 (app/principal_cache.py)
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+PRINCIPAL_CACHE_MAXSIZE = int(os.getenv("PRINCIPAL_CACHE_MAXSIZE", 1024))
+
+# 비밀번호 해싱 전용 프로세스 풀 (app/password_hasher.py)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 4))  # 풀에 동시에 넣는 작업 수
+
+# 요청/도구 단위 쿼리 카운터와 N+1 감지 (app/query_counter.py)
+# 같은 모양의 SQL이 한 요청(또는 도구 호출) 안에서 이 횟수 이상 실행되면 N+1 의심으로 기록
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 5))
+QUERY_STATS_LOG = os.getenv("QUERY_STATS_LOG", "false").lower() == "true"  # 모든 요청의 쿼리 요약 출력
+
+# 요청 단위 프로파일러 (app/profiler.py)
+# 토큰이 없으면 비활성 (미들웨어 자체를 등록하지 않음). 요청에 X-Profile: <토큰> 헤더 (쿼리 파라미터는 받지 않음)
+PROFILER_ADMIN_TOKEN = os.getenv("PROFILER_ADMIN_TOKEN")
+PROFILER_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILER_SAMPLE_INTERVAL_MS", 5))
+PROFILER_MAX_STORED = int(os.getenv("PROFILER_MAX_STORED", 20))  # 워커별로 보관하는 최근 프로파일 수
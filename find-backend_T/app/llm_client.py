@@ -0,0 +1,134 @@
+# app/llm_client.py
+# 모든 LLM 호출이 공유하는 비동기 OpenAI 클라이언트 계층입니다.
+# - AsyncOpenAI 사용: LLM 왕복 동안 이벤트 루프를 막지 않음
+# - 커넥션 풀 공유: 호출마다 TLS 핸드셰이크를 새로 하지 않음
+# - 호출별 타임아웃: 느린 응답 하나가 요청 전체를 붙잡지 않도록 제한
+# - 호출 label별 지연시간/토큰 수를 /metrics에 기록
+
+from __future__ import annotations
+
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from app.config import (
+    OPENAI_API_KEY,
+    LLM_MODEL,
+    LLM_TIMEOUT_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_MAX_CONNECTIONS,
+)
+from app.metrics import (
+    LLM_FIRST_TOKEN_SECONDS,
+    LLM_REQUEST_SECONDS,
+    add_request_time,
+    llm_call_label,
+    observe_llm_usage,
+)
+
+_client: Optional[AsyncOpenAI] = None
+
+
+def get_llm_client() -> AsyncOpenAI:
+    """프로세스 전역에서 공유하는 AsyncOpenAI 클라이언트를 반환합니다 (최초 호출 시 생성)."""
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            timeout=LLM_TIMEOUT_SECONDS,
+            max_retries=LLM_MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                ),
+            ),
+        )
+    return _client
+
+
+async def close_llm_client() -> None:
+    """앱 종료 시 커넥션 풀을 정리합니다."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def _log_usage(label: str, response: Any) -> None:
+    if hasattr(response, "usage") and response.usage:
+        usage = response.usage
+        print(f"[Token Usage] {label} - Prompt: {usage.prompt_tokens}, Completion: {usage.completion_tokens}, Total: {usage.total_tokens}")
+
+
+async def chat_completion(
+    messages: List[Dict[str, Any]],
+    *,
+    label: str,
+    model: Optional[str] = None,
+    timeout: Optional[float] = None,
+    **kwargs: Any,
+) -> Any:
+    """
+    Chat Completions API를 비동기로 호출합니다.
+
+    label은 토큰 사용량 로그에 표시될 호출 이름이며,
+    timeout을 생략하면 LLM_TIMEOUT_SECONDS가 적용됩니다.
+    """
+    model = model or LLM_MODEL
+    started = time.perf_counter()
+    try:
+        response = await get_llm_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            timeout=timeout if timeout is not None else LLM_TIMEOUT_SECONDS,
+            **kwargs,
+        )
+    finally:
+        elapsed = time.perf_counter() - started
+        LLM_REQUEST_SECONDS.labels(llm_call_label(label), model).observe(elapsed)
+        add_request_time("llm", elapsed)
+    _log_usage(label, response)
+    observe_llm_usage(label, model, getattr(response, "usage", None))
+    return response
+
+
+async def stream_chat_completion(
+    messages: List[Dict[str, Any]],
+    *,
+    label: str,
+    model: Optional[str] = None,
+    timeout: Optional[float] = None,
+    **kwargs: Any,
+) -> AsyncIterator[Any]:
+    """
+    Chat Completions API를 스트리밍 모드로 호출하고 청크를 순서대로 내보냅니다.
+    마지막 청크(usage 포함)에서 토큰 사용량을 로깅합니다.
+    """
+    model = model or LLM_MODEL
+    call = llm_call_label(label)
+    started = time.perf_counter()
+    first_chunk = True
+    try:
+        stream = await get_llm_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            timeout=timeout if timeout is not None else LLM_TIMEOUT_SECONDS,
+            stream=True,
+            stream_options={"include_usage": True},
+            **kwargs,
+        )
+        async for chunk in stream:
+            if first_chunk:
+                first_chunk = False
+                LLM_FIRST_TOKEN_SECONDS.labels(call, model).observe(time.perf_counter() - started)
+            if getattr(chunk, "usage", None):
+                _log_usage(label, chunk)
+                observe_llm_usage(label, model, chunk.usage)
+            yield chunk
+    finally:
+        elapsed = time.perf_counter() - started
+        LLM_REQUEST_SECONDS.labels(call, model).observe(elapsed)
+        add_request_time("llm", elapsed)
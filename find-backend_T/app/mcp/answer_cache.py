@@ -0,0 +1,283 @@
+# app/mcp/answer_cache.py
+# 반복되는 채팅 질문("엔비디아 PER 어때?", "애플 현금흐름")의 최종 답변 캐시입니다.
+#
+# 키 = 정규화된 의도 + 세부 주제(배당/부채/PER ...) + 티커 + 기간 + 관련 원천 데이터 버전(data_versions)
+#   - 표현이 달라도 의도/주제/티커/기간이 같으면 같은 답변을 재사용
+#   - 기간은 연도/분기/월/상대 기간(작년, 최근 3년, 1주일 ...)을 절대값 또는 정규화된 토큰으로 변환
+#     해석할 수 없는 기간 표현이 남으면 캐시하지 않음 (다른 기간의 답변을 돌려주지 않도록)
+#   - 의도는 "financials"처럼 넓은 분류라 "배당 얼마야?"와 "부채 많아?"를 구분하지 못하므로
+#     질문에 나온 지표/주제 키워드(TOPIC_PATTERNS)를 정규화해 키에 함께 넣음
+#   - key_metrics / cash_flows / earnings_calendar / news 등이 다시 저장되면
+#     버전이 올라가 키가 바뀌므로 이전 답변은 자동으로 무효화됨
+# 저장소는 2단 캐시(app/cache.py)의 "chat_answer" 네임스페이스를 사용합니다.
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.cache import get_cached, set_cached
+from app.database import SessionLocal
+from app.mcp.intent_router import RoutePlan
+from app.services import data_versions
+
+ANSWER_NAMESPACE = "chat_answer"
+
+# 의도별로 답변이 의존하는 원천 데이터
+INTENT_DATASETS: Dict[str, List[str]] = {
+    "earnings": [data_versions.EARNINGS_CALENDAR, data_versions.INCOME_STATEMENTS],
+    "valuation": [data_versions.KEY_METRICS],
+    "price_move": [data_versions.KEY_METRICS, data_versions.EARNINGS_CALENDAR, data_versions.NEWS],
+    "news": [data_versions.NEWS],
+    "trend": [],
+    "financials": [
+        data_versions.INCOME_STATEMENTS,
+        data_versions.BALANCE_SHEETS,
+        data_versions.CASH_FLOWS,
+        data_versions.KEY_METRICS,
+    ],
+    "ratings": [],
+    "insider": [],
+}
+
+# 주가에 따라 달라지는 답변은 버전 테이블이 없으므로 짧은 TTL로만 관리
+# (valuation: PER/PBR 등은 재무 데이터 버전이 같아도 현재가에 따라 달라짐)
+PRICE_SENSITIVE_INTENTS = {"price_move", "trend", "valuation"}
+PRICE_SENSITIVE_TTL = timedelta(minutes=15)
+
+# 세부 주제 → 키워드 (소문자 비교). 같은 의도 안에서 다른 지표를 묻는 질문이 같은 키를 쓰지 않도록 함
+TOPIC_PATTERNS: Dict[str, re.Pattern] = {
+    "revenue": re.compile(r"매출|revenue|\bsales\b"),
+    "operating_income": re.compile(r"영업\s*이익(?!\s*률)|operating\s*income"),
+    "margin": re.compile(r"이익\s*률|마진|margin"),
+    "net_income": re.compile(r"순\s*이익|당기\s*순|net\s*income"),
+    "eps": re.compile(r"\beps\b|주당\s*순이익"),
+    "cash_flow": re.compile(r"현금\s*흐름|cash\s*flow"),
+    "free_cash_flow": re.compile(r"잉여\s*현금|\bfcf\b|free\s*cash"),
+    "capex": re.compile(r"capex|설비\s*투자|자본\s*지출"),
+    "cash": re.compile(r"현금(?!\s*흐름)|\bcash\b(?!\s*flow)"),
+    "debt": re.compile(r"부채|차입|레버리지|debt|leverage"),
+    "assets": re.compile(r"자산|asset"),
+    "equity": re.compile(r"자기\s*자본(?!\s*이익)|자본\s*총계|\bequity\b"),
+    "dividend": re.compile(r"배당|dividend"),
+    "buyback": re.compile(r"자사주|buyback|repurchase"),
+    "shareholder_return": re.compile(r"주주\s*환원|자본\s*배분|capital\s*allocation"),
+    "per": re.compile(r"\bper\b|\bp/?e\b|주가\s*수익"),
+    "pbr": re.compile(r"\bpbr\b|\bp/?b\b|주가\s*순자산"),
+    "peg": re.compile(r"\bpeg\b"),
+    "roe": re.compile(r"\broe\b|자기\s*자본\s*이익"),
+    "roa": re.compile(r"\broa\b|총\s*자산\s*이익"),
+    "growth": re.compile(r"성장|증가율|\byoy\b|growth"),
+    "guidance": re.compile(r"가이던스|전망|guidance|outlook"),
+    "surprise": re.compile(r"서프라이즈|예상치|컨센서스|surprise|consensus|beat|miss"),
+    "transcript": re.compile(r"컨콜|컨퍼런스\s*콜|발언|transcript"),
+    "target_price": re.compile(r"목표\s*(?:주)?가|target\s*price"),
+}
+
+_UNITS = {
+    "년": "y", "year": "y", "years": "y",
+    "개월": "m", "달": "m", "month": "m", "months": "m",
+    "주": "w", "주일": "w", "week": "w", "weeks": "w",
+    "일": "d", "day": "d", "days": "d",
+    "y": "y", "m": "m", "w": "w", "d": "d",
+}
+_UNIT_WORDS = r"(개월|달|주일|주(?![가-힣])|년|일|years?|months?|weeks?|days?)"
+
+
+def _quarter_of(day: date, offset: int = 0) -> str:
+    index = day.year * 4 + (day.month - 1) // 3 + offset
+    return f"{index // 4}q{index % 4 + 1}"
+
+
+def _week_of(day: date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}w{week:02d}"
+
+
+def _month_of(day: date, offset: int = 0) -> str:
+    index = day.year * 12 + day.month - 1 + offset
+    return f"{index // 12}-{index % 12 + 1:02d}"
+
+
+# (패턴, 정규화 함수) - 위에서부터 순서대로 적용하고, 매칭된 부분은 지워 다음 규칙이 다시 보지 않게 함
+# 정규화 함수가 None을 반환하면 모호한 표현이므로 캐시하지 않음
+_TIME_RULES: List[Tuple[re.Pattern, Callable[["re.Match[str]", date], Optional[str]]]] = [
+    (re.compile(r"전년\s*(?:대비|동기)"), lambda m, today: "cmp:yoy"),
+    (re.compile(r"전\s*분기\s*대비"), lambda m, today: "cmp:qoq"),
+    # 범위: 2020~2024년 / 1-6일 (나머지 숫자 범위는 해석하지 않음)
+    (re.compile(r"(?<!\d)((?:19|20)\d{2})\s*년?\s*[-~]\s*((?:19|20)\d{2})(?:\s*년)?"),
+     lambda m, today: f"y{m.group(1)}-{m.group(2)}"),
+    (re.compile(r"(?<!\d)(\d{1,2})\s*[-~]\s*(\d{1,2})\s*일"), lambda m, today: f"day{m.group(1)}-{m.group(2)}"),
+    (re.compile(r"\d+\s*[-~]\s*\d+"), lambda m, today: None),
+    # 최근 3년 / 지난 6개월 / past 2 weeks
+    (re.compile(r"(?:최근|지난|과거|last|past)\s*(\d+)\s*" + _UNIT_WORDS + r"(?:\s*(?:간|동안))?"),
+     lambda m, today: f"last{m.group(1)}{_UNITS[m.group(2)]}"),
+    # 2024년 / FY2024 / fy24
+    (re.compile(r"(?<!\d)(?:fy\s*)?((?:19|20)\d{2})(?!\d)(?:\s*(?:년|회계\s*연도))?"), lambda m, today: f"y{m.group(1)}"),
+    (re.compile(r"\bfy\s*(\d{2})\b"), lambda m, today: f"y20{m.group(1)}"),
+    # "24년 매출"(2024년)인지 "10년 추세"(10년간)인지 알 수 없음
+    (re.compile(r"(?<!\d)\d{2}\s*년(?!\s*(?:간|동안|치))"), lambda m, today: None),
+    (re.compile(r"재작년"), lambda m, today: f"y{today.year - 2}"),
+    (re.compile(r"작년|지난\s*해|last\s*year"), lambda m, today: f"y{today.year - 1}"),
+    (re.compile(r"올해|금년|this\s*year"), lambda m, today: f"y{today.year}"),
+    (re.compile(r"내년|next\s*year"), lambda m, today: f"y{today.year + 1}"),
+    # 1분기 / Q1 / 1st quarter
+    (re.compile(r"(?<![a-z0-9])q\s*([1-4])(?!\d)"), lambda m, today: f"q{m.group(1)}"),
+    (re.compile(r"(?<!\d)([1-4])\s*분기"), lambda m, today: f"q{m.group(1)}"),
+    (re.compile(r"(?<!\d)([1-4])(?:st|nd|rd|th)\s*quarter"), lambda m, today: f"q{m.group(1)}"),
+    (re.compile(r"(?:이번|현)\s*분기|this\s*quarter"), lambda m, today: _quarter_of(today)),
+    (re.compile(r"(?:지난|직전|전|저번)\s*분기|last\s*quarter|previous\s*quarter"), lambda m, today: _quarter_of(today, -1)),
+    (re.compile(r"상반기|\bh1\b"), lambda m, today: "h1"),
+    (re.compile(r"하반기|\bh2\b"), lambda m, today: "h2"),
+    # 3년 추세 / 1주일 / 6개월간 / 5일간 / 1m / 3 months
+    (re.compile(r"(?<!\d)(\d+)\s*(개월|달|주일|주(?![가-힣])|년)(?:\s*(?:간|동안|치))?"),
+     lambda m, today: f"span{m.group(1)}{_UNITS[m.group(2)]}"),
+    (re.compile(r"(?<!\d)(\d+)\s*(일)\s*(?:간|동안|치)"), lambda m, today: f"span{m.group(1)}d"),
+    (re.compile(r"(?<![a-z0-9])(\d+)[\s-]*(years?|months?|weeks?|days?|[ymwd])\b"),
+     lambda m, today: f"span{m.group(1)}{_UNITS[m.group(2)]}"),
+    # 12월 / 3일 (날짜)
+    (re.compile(r"(?<!\d)(1[0-2]|[1-9])\s*월"), lambda m, today: f"month{m.group(1)}"),
+    (re.compile(r"(?<!\d)([1-9]|[12]\d|3[01])\s*일"), lambda m, today: f"day{m.group(1)}"),
+    (re.compile(r"오늘|today"), lambda m, today: today.isoformat()),
+    (re.compile(r"어제|yesterday"), lambda m, today: (today - timedelta(days=1)).isoformat()),
+    (re.compile(r"내일|tomorrow"), lambda m, today: (today + timedelta(days=1)).isoformat()),
+    (re.compile(r"이번\s*주|this\s*week"), lambda m, today: _week_of(today)),
+    (re.compile(r"(?:지난|저번)\s*주|last\s*week"), lambda m, today: _week_of(today - timedelta(days=7))),
+    (re.compile(r"이번\s*달|this\s*month"), lambda m, today: _month_of(today)),
+    (re.compile(r"(?:지난|저번)\s*달|last\s*month"), lambda m, today: _month_of(today, -1)),
+    (re.compile(r"ytd|연초\s*(?:대비|이후|부터)?"), lambda m, today: "ytd"),
+    (re.compile(r"장기|long[\s-]*term"), lambda m, today: "long"),
+    (re.compile(r"중기|mid[\s-]*term"), lambda m, today: "mid"),
+    (re.compile(r"단기|short[\s-]*term"), lambda m, today: "short"),
+    (re.compile(r"최근|요즘|최신|recent(?:ly)?|latest"), lambda m, today: "recent"),
+    (re.compile(r"다음|next|upcoming|예정"), lambda m, today: "next"),
+    (re.compile(r"지난|저번|직전|previous"), lambda m, today: "previous"),
+    (re.compile(r"이번"), lambda m, today: "current"),
+    (re.compile(r"분기별|분기|quarterly|quarter"), lambda m, today: "quarterly"),
+    (re.compile(r"반기"), lambda m, today: "semiannual"),
+    (re.compile(r"연간|연도별|annual(?:ly)?|yearly"), lambda m, today: "annual"),
+    (re.compile(r"부터|since|\bfrom\b"), lambda m, today: "from"),
+    (re.compile(r"까지|until|through"), lambda m, today: "until"),
+    (re.compile(r"사이|between"), lambda m, today: "between"),
+    (re.compile(r"이후|\bafter\b|(?<![가-힣])후(?![가-힣])"), lambda m, today: "after"),
+    (re.compile(r"이전|\bbefore\b|(?<![가-힣])전(?![가-힣])"), lambda m, today: "before"),
+]
+# 위 규칙을 모두 적용한 뒤에도 남아 있으면 해석하지 못한 기간 표현
+_UNPARSED_TIME = re.compile(
+    r"\d+\s*(?:년|개월|달|주|일|월|분기|시간)|\d+\s*[-~]\s*\d+|년|개월|주일|작년|올해|내년|어제|내일|그제"
+    r"|\byears?\b|\bmonths?\b|\bweeks?\b|\bdays?\b|\bfy"
+)
+
+
+def _time_scope(user_message: str, today: Optional[date] = None) -> Optional[List[str]]:
+    """
+    질문의 기간 표현을 정규화한 토큰 목록 ("애플 2021년 매출" → ["y2021"], "작년 4분기" → ["q4", "y2025"]).
+    상대 기간(작년/이번 주 ...)은 오늘 기준 절대값으로 바꿔, 날짜가 바뀐 뒤 이전 답변을 재사용하지 않게 합니다.
+    해석할 수 없는 기간 표현이 있으면 None (캐시하지 않음).
+    """
+    today = today or date.today()
+    text = user_message.lower()
+    tokens = set()
+    for pattern, normalize in _TIME_RULES:
+        for match in pattern.finditer(text):
+            token = normalize(match, today)
+            if token is None:
+                return None
+            tokens.add(token)
+        text = pattern.sub(" ", text)
+    if _UNPARSED_TIME.search(text):
+        return None
+    return sorted(tokens)
+
+
+_stats = {"hits": 0, "misses": 0, "stores": 0, "bypassed": 0, "uncacheable": 0}
+
+
+def _topics(user_message: str) -> List[str]:
+    """질문에 나온 세부 주제 (TOPIC_PATTERNS 순서로 고정)."""
+    text = user_message.lower()
+    return [topic for topic, pattern in TOPIC_PATTERNS.items() if pattern.search(text)]
+
+
+def answer_cache_key(route: RoutePlan, user_message: str) -> Optional[str]:
+    """
+    라우팅 결과로 캐시 키를 만듭니다.
+    의도나 티커를 확정하지 못한 질문(후속 질문 등)은 대화 맥락에 의존하므로,
+    해석할 수 없는 기간 표현이 있는 질문은 다른 기간의 답변과 섞일 수 있으므로 캐시하지 않습니다.
+    """
+    if not route.intents or not route.tickers:
+        return None
+    time_scope = _time_scope(user_message)
+    if time_scope is None:
+        return None
+
+    datasets = sorted({dataset for intent in route.intents for dataset in INTENT_DATASETS.get(intent, [])})
+    # 요청 세션은 REPEATABLE READ 스냅샷이 이미 열려 있어, 도구가 다른 세션에서 올린 버전이 안 보임
+    # → 최신 버전은 별도 세션에서 읽음
+    db = SessionLocal()
+    try:
+        versions = data_versions.load_data_versions(db, route.tickers, datasets)
+    finally:
+        db.close()
+
+    fingerprint = json.dumps(
+        {
+            "intents": sorted(route.intents),
+            "topics": _topics(user_message),
+            "tickers": sorted(route.tickers),
+            "period": time_scope,
+            "versions": sorted(f"{ticker}:{dataset}={version}" for (ticker, dataset), version in versions.items()),
+        },
+        sort_keys=True,
+    )
+    return f"{ANSWER_NAMESPACE}_{hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()}"
+
+
+def get_cached_answer(db: Session, route: RoutePlan, user_message: str, use_cache: bool) -> Optional[Dict[str, Any]]:
+    """캐시된 {"content", "widgets"}를 반환합니다. 없거나 캐시를 쓰지 않으면 None."""
+    if not use_cache:
+        _stats["bypassed"] += 1
+        return None
+    key = answer_cache_key(route, user_message)
+    if key is None:
+        _stats["uncacheable"] += 1
+        return None
+    cached = get_cached(db, ANSWER_NAMESPACE, key)
+    if cached:
+        _stats["hits"] += 1
+        return cached
+    _stats["misses"] += 1
+    return None
+
+
+def store_answer(
+    db: Session,
+    route: RoutePlan,
+    user_message: str,
+    content: str,
+    widgets: List[Dict[str, Any]],
+) -> None:
+    """
+    답변을 저장합니다. (commit은 호출하는 쪽에서 수행)
+    키는 답변 생성이 끝난 시점의 데이터 버전으로 다시 계산합니다
+    (도구 실행 중 원천 데이터가 갱신되었다면 갱신된 버전이 답변의 근거이므로).
+    """
+    key = answer_cache_key(route, user_message)
+    if key is None or not content:
+        return
+    ttl = PRICE_SENSITIVE_TTL if PRICE_SENSITIVE_INTENTS & set(route.intents) else None
+    # 위젯에 date/Decimal 등이 섞여 있을 수 있어 JSON 호환 값으로 정리
+    payload = json.loads(json.dumps({"content": content, "widgets": widgets}, default=str, ensure_ascii=False))
+    set_cached(db, ANSWER_NAMESPACE, key, payload, ttl=ttl)
+    _stats["stores"] += 1
+
+
+def answer_cache_stats() -> Dict[str, Any]:
+    """답변 캐시 적중률 (캐시 대상 질문 기준)과 옵트아웃/캐시 불가 건수."""
+    lookups = _stats["hits"] + _stats["misses"]
+    return {**_stats, "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else None}
@@ -0,0 +1,150 @@
+# app/mcp/compaction.py
+# 도구 응답을 LLM 메시지로 보내기 전에 토큰 예산에 맞춰 압축합니다.
+#
+# - 도구별 projection: LLM 답변에 필요한 필드만 남기고 위젯/UI 전용 필드는 제거
+#   (위젯은 원본 응답에서 collected_widgets로 그대로 전달됨)
+# - 도구별 예산 + 대화(요청) 전체 예산: 이후 턴마다 다시 전송되는 양을 제한
+# - 예산 초과 시 긴 문자열/리스트를 결정적으로 잘라냄 (같은 입력 → 같은 출력)
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, Optional
+
+from app.config import CONVERSATION_TOOL_TOKEN_BUDGET, TOOL_OUTPUT_TOKEN_BUDGET
+
+# 어떤 도구든 LLM에는 보내지 않는 UI 전용/내부 표식 필드
+UI_ONLY_KEYS = {"widgets", "history", "sub_tabs", "active_sub_tab", "view_type", "learned_alias"}
+
+# 도구별 예산 (기본값은 TOOL_OUTPUT_TOKEN_BUDGET)
+TOOL_TOKEN_BUDGETS: Dict[str, int] = {
+    "fetch_earnings_call_transcript": 2500,
+    "search_earnings_call_transcript": 1800,
+    "search_summarized_news": 1500,
+    "fetch_company_key_metrics": 1200,
+    "fetch_stock_quote": 300,
+}
+
+# 예산이 거의 소진돼도 도구 결과가 비지 않도록 보장하는 최소치
+MIN_TOOL_TOKEN_BUDGET = 200
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토크나이저 없이 쓰는 근사치.
+    영문/숫자/기호는 약 4자당 1토큰, 한글 등 비ASCII 문자는 1자당 약 1토큰으로 계산합니다.
+    """
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=str, ensure_ascii=False)
+
+
+def _drop_ui_fields(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _drop_ui_fields(v) for k, v in value.items() if k not in UI_ONLY_KEYS}
+    if isinstance(value, list):
+        return [_drop_ui_fields(v) for v in value]
+    return value
+
+
+def _project_transcript(response: Dict[str, Any]) -> Dict[str, Any]:
+    # 전문(content)은 예산 내에서 앞부분만 남기도록 축소 단계에 맡기고, 길이 정보를 함께 전달
+    projected = dict(response)
+    content = projected.get("content")
+    if isinstance(content, str):
+        projected["content_length"] = len(content)
+    return projected
+
+
+def _project_news(response: Any) -> Any:
+    if not isinstance(response, list):
+        return response
+    return [
+        {k: item.get(k) for k in ("title", "publishedDate", "summary")} if isinstance(item, dict) else item
+        for item in response
+    ]
+
+
+# 도구별 LLM projection (UI 필드 제거 이후 적용)
+TOOL_PROJECTIONS: Dict[str, Callable[[Any], Any]] = {
+    "fetch_earnings_call_transcript": _project_transcript,
+    "search_summarized_news": _project_news,
+}
+
+
+def _shrink(value: Any, max_chars: int, max_items: int) -> Any:
+    """문자열은 max_chars, 리스트는 max_items까지만 남기고 생략 표시를 붙입니다."""
+    if isinstance(value, str):
+        if len(value) <= max_chars:
+            return value
+        return value[:max_chars] + f"…(+{len(value) - max_chars}자 생략)"
+    if isinstance(value, list):
+        kept = [_shrink(v, max_chars, max_items) for v in value[:max_items]]
+        if len(value) > max_items:
+            kept.append(f"…(+{len(value) - max_items}건 생략)")
+        return kept
+    if isinstance(value, dict):
+        return {k: _shrink(v, max_chars, max_items) for k, v in value.items()}
+    return value
+
+
+def compact_tool_response(name: str, response: Any, budget: Optional[int] = None) -> str:
+    """
+    도구 응답을 LLM용 JSON 문자열로 변환합니다.
+    projection 후에도 budget(토큰)을 넘으면 문자열/리스트 길이를 절반씩 줄여 맞춥니다.
+    """
+    if budget is None:
+        budget = TOOL_TOKEN_BUDGETS.get(name, TOOL_OUTPUT_TOKEN_BUDGET)
+
+    projected = _drop_ui_fields(response)
+    projection = TOOL_PROJECTIONS.get(name)
+    if projection and isinstance(projected, (dict, list)):
+        projected = projection(projected)
+
+    text = _dumps(projected)
+    if estimate_tokens(text) <= budget:
+        return text
+
+    max_chars, max_items = 4000, 40
+    while max_chars >= 50 and max_items >= 2:
+        text = _dumps(_shrink(projected, max_chars, max_items))
+        if estimate_tokens(text) <= budget:
+            return text
+        max_chars //= 2
+        max_items = max(2, max_items // 2) if max_items > 2 else 1
+
+    # 구조를 줄여도 넘치면 JSON 앞부분만 미리보기로 전달
+    preview_chars = budget * 2
+    return _dumps({"truncated": True, "preview": text[:preview_chars]})
+
+
+class ToolOutputBudget:
+    """한 요청(대화 턴 전체)에서 도구 결과에 쓸 수 있는 토큰 예산을 관리합니다."""
+
+    def __init__(self, total: int = CONVERSATION_TOOL_TOKEN_BUDGET) -> None:
+        self.total = total
+        self.used = 0
+        self.original = 0
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.total - self.used)
+
+    def budget_for(self, name: str, calls_in_turn: int) -> int:
+        """도구별 예산과 (남은 대화 예산 / 이번 턴 도구 수) 중 작은 값."""
+        per_tool = TOOL_TOKEN_BUDGETS.get(name, TOOL_OUTPUT_TOKEN_BUDGET)
+        share = self.remaining // max(1, calls_in_turn)
+        return max(MIN_TOOL_TOKEN_BUDGET, min(per_tool, share))
+
+    def compact(self, name: str, response: Any, calls_in_turn: int) -> str:
+        text = compact_tool_response(name, response, self.budget_for(name, calls_in_turn))
+        original_tokens = estimate_tokens(_dumps(response))
+        compacted_tokens = estimate_tokens(text)
+        self.used += compacted_tokens
+        self.original += original_tokens
+        if compacted_tokens < original_tokens:
+            print(f"[Compaction] {name}: ~{original_tokens} → ~{compacted_tokens} tokens")
+        return text
@@ -9,6 +9,9 @@ ToolCallable = Callable[..., Any]
 
 _tool_registry: List[ToolCallable] = []
 
+# 실행 시점에 주입되는 파라미터 (LLM 스키마에서 제외)
+INJECTED_PARAMS = {"db", "client", "httpx_client", "current_user", "user_id", "current_user_id"}
+
 
 def register_tool(func: ToolCallable) -> ToolCallable:
     """
@@ -73,7 +76,7 @@ def build_tool_schema(func: ToolCallable) -> Dict[str, Any]:
     required: List[str] = []
 
     for name, param in sig.parameters.items():
-        if name in {"db", "client", "httpx_client", "current_user", "user_id", "current_user_id"}:
+        if name in INJECTED_PARAMS:
             continue
 
         annotation = param.annotation if param.annotation is not inspect.Parameter.empty else str
@@ -0,0 +1,323 @@
+# app/mcp/executor.py
+# 한 턴에서 AI가 요청한 여러 tool_call을 동시에 실행하는 실행기입니다.
+# - 동시 실행 개수 제한 (Semaphore)
+# - 도구별 타임아웃
+# - 도구마다 독립 DB 세션 사용 (요청 세션은 동시 사용에 안전하지 않음)
+#   db 파라미터 타입에 AsyncSession이 있으면 AsyncSession, 아니면 기존 동기 Session을 주입
+# - 결과는 끝나는 순서대로 (원래 tool_call index와 함께) 내보냄
+# - 라우터가 미리 시작한 도구(SpeculativePrefetch)와 같은 호출이면 그 결과를 재사용
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import time
+import typing
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.config import TOOL_MAX_CONCURRENCY, TOOL_TIMEOUT_SECONDS
+from app.database import AnySession, AsyncSessionLocal, SessionLocal, db_close, db_rollback
+from app.mcp.compaction import ToolOutputBudget
+from app.mcp.decorators import INJECTED_PARAMS
+from app.mcp.registry import available_tools
+from app.metrics import MCP_PREFETCH_HITS, MCP_TOOL_SECONDS, add_request_time
+from app.query_counter import track_queries
+
+
+@dataclass
+class ToolOutcome:
+    """tool_call 하나의 실행 결과."""
+
+    tool_call_id: str
+    name: str
+    response: Any
+    elapsed: float
+
+    def to_message(
+        self,
+        token_budget: Optional[ToolOutputBudget] = None,
+        calls_in_turn: int = 1,
+    ) -> Dict[str, Any]:
+        """
+        OpenAI messages 배열에 추가할 tool 메시지로 변환합니다.
+        token_budget이 주어지면 위젯/UI 필드를 제외하고 예산에 맞춰 압축합니다.
+        """
+        if token_budget is not None:
+            content = token_budget.compact(self.name, self.response, calls_in_turn)
+        else:
+            content = json.dumps(self.response, default=str, ensure_ascii=False)
+        return {
+            "tool_call_id": self.tool_call_id,
+            "role": "tool",
+            "name": self.name,
+            "content": content,
+        }
+
+
+def _parse_arguments(raw_arguments: Optional[str]) -> Dict[str, Any]:
+    try:
+        function_args = json.loads(raw_arguments or "{}")
+    except (TypeError, ValueError):
+        function_args = {}
+    if not isinstance(function_args, dict):
+        function_args = {}
+    return function_args
+
+
+@lru_cache(maxsize=None)
+def _wants_async_session(function_to_call: Callable) -> bool:
+    """도구의 db 파라미터 타입에 AsyncSession이 포함되어 있는지 (AsyncSession / AnySession)."""
+    try:
+        annotation = typing.get_type_hints(function_to_call).get("db")
+    except Exception:
+        return False
+    return annotation is AsyncSession or AsyncSession in typing.get_args(annotation)
+
+
+def _inject_dependencies(
+    function_to_call: Callable,
+    function_args: Dict[str, Any],
+    db: AnySession,
+    httpx_client: httpx.AsyncClient,
+    current_user: models.User,
+) -> Dict[str, Any]:
+    """도구 시그니처를 보고 db/client/user 의존성을 주입합니다."""
+    signature = inspect.signature(function_to_call)
+    for param_name in signature.parameters.keys():
+        if param_name == "db": function_args.setdefault("db", db)
+        elif param_name in {"client", "httpx_client"}: function_args.setdefault(param_name, httpx_client)
+        elif param_name in {"user_id", "current_user_id"}: function_args.setdefault(param_name, current_user.id)
+        elif param_name == "current_user": function_args.setdefault("current_user", current_user)
+    return function_args
+
+
+def _close_session_later(db: AnySession, function_name: str) -> None:
+    """타임아웃/취소 뒤에도 계속 실행되던 동기 도구의 스레드가 끝났을 때 호출: 세션을 스레드풀에서 닫습니다."""
+    print(f"[Tool] {function_name} 스레드 종료 - 세션 정리")
+    asyncio.get_running_loop().run_in_executor(None, db.close)
+
+
+async def _run_tool(
+    tool_call: Any,
+    *,
+    httpx_client: httpx.AsyncClient,
+    current_user: models.User,
+    semaphore: asyncio.Semaphore,
+    timeout: float,
+) -> ToolOutcome:
+    function_name = tool_call.function.name
+    function_to_call = available_tools.get(function_name)
+    started = time.perf_counter()
+
+    if function_to_call is None:
+        print(f"[Tool Error] 등록되지 않은 도구: {function_name}")
+        return ToolOutcome(tool_call.id, function_name, {"error": f"Unknown tool: {function_name}"}, 0.0)
+
+    status = "ok"
+    async with semaphore:
+        # 도구마다 독립 세션: 동시에 실행되는 도구끼리 Session을 공유하지 않음
+        db = AsyncSessionLocal() if _wants_async_session(function_to_call) else SessionLocal()
+        worker: Optional[asyncio.Future] = None
+        try:
+            function_args = _inject_dependencies(
+                function_to_call,
+                _parse_arguments(tool_call.function.arguments),
+                db,
+                httpx_client,
+                current_user,
+            )
+            print(f"--- [DEBUG] Executing {function_name} ---")
+            # 도구별 쿼리 수/N+1 집계 (요청 범위에도 함께 합산)
+            with track_queries(function_name, kind="tool"):
+                if inspect.iscoroutinefunction(function_to_call):
+                    function_response = await asyncio.wait_for(function_to_call(**function_args), timeout=timeout)
+                else:
+                    # 스레드는 타임아웃/취소로 멈출 수 없으므로 shield로 감싸 스레드 작업은 그대로 두고 기다림만 중단
+                    worker = asyncio.ensure_future(asyncio.to_thread(function_to_call, **function_args))
+                    function_response = await asyncio.wait_for(asyncio.shield(worker), timeout=timeout)
+
+            # Clean Response
+            if hasattr(function_response, "dict"): function_response = function_response.dict()
+        except asyncio.TimeoutError:
+            status = "timeout"
+            if worker is None:
+                await db_rollback(db)
+            function_response = {"error": f"{function_name} 실행 시간이 {timeout:.0f}초를 초과했습니다."}
+            print(f"[Tool Timeout] {function_name} ({timeout:.0f}s)")
+        except Exception as e:
+            status = "error"
+            await db_rollback(db)
+            function_response = {"error": str(e)}
+            print(f"[Tool Error] {e}")
+        finally:
+            if worker is not None and not worker.done():
+                # 아직 스레드가 세션을 쓰는 중: 스레드가 끝난 뒤에 닫음 (close가 미완료 트랜잭션도 롤백)
+                worker.add_done_callback(lambda _: _close_session_later(db, function_name))
+            else:
+                await db_close(db)
+
+    elapsed = time.perf_counter() - started
+    # 세마포어 대기 포함 (턴 지연시간에 실제로 더해지는 시간)
+    MCP_TOOL_SECONDS.labels(function_name, status).observe(elapsed)
+    add_request_time(f"tool:{function_name}", elapsed)
+    print(f"[Tool Done] {function_name} ({elapsed:.2f}s)")
+    return ToolOutcome(tool_call.id, function_name, function_response, elapsed)
+
+
+def canonical_call_key(function_name: str, function_args: Dict[str, Any]) -> Optional[str]:
+    """
+    기본값을 채우고 티커를 대문자로 맞춘 호출 키.
+    모델이 기본 인자를 생략하거나 명시해도 같은 호출로 취급하기 위해 사용합니다.
+    """
+    function_to_call = available_tools.get(function_name)
+    if function_to_call is None:
+        return None
+    signature = inspect.signature(function_to_call)
+    try:
+        bound = signature.bind_partial(**{
+            name: value for name, value in function_args.items()
+            if name in signature.parameters and name not in INJECTED_PARAMS
+        })
+    except TypeError:
+        return None
+    bound.apply_defaults()
+    arguments = {name: value for name, value in bound.arguments.items() if name not in INJECTED_PARAMS}
+    if isinstance(arguments.get("ticker"), str):
+        arguments["ticker"] = arguments["ticker"].strip().upper()
+    return json.dumps([function_name, arguments], sort_keys=True, default=str)
+
+
+class SpeculativePrefetch:
+    """
+    모델이 요청하기 전에 예상 도구를 백그라운드로 실행해 두는 저장소.
+    같은 호출이 들어오면 진행 중이거나 끝난 작업의 결과를 그대로 돌려줍니다.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Dict[str, "asyncio.Task[ToolOutcome]"] = {}
+        self.hits = 0
+
+    def start(
+        self,
+        calls: List[Tuple[str, Dict[str, Any]]],
+        *,
+        httpx_client: httpx.AsyncClient,
+        current_user: models.User,
+        max_concurrency: int = TOOL_MAX_CONCURRENCY,
+        timeout: float = TOOL_TIMEOUT_SECONDS,
+    ) -> None:
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        for function_name, function_args in calls:
+            key = canonical_call_key(function_name, function_args)
+            if key is None or key in self._tasks:
+                continue
+            tool_call = SimpleNamespace(
+                id=f"prefetch-{len(self._tasks)}",
+                function=SimpleNamespace(name=function_name, arguments=json.dumps(function_args)),
+            )
+            self._tasks[key] = asyncio.create_task(_run_tool(
+                tool_call,
+                httpx_client=httpx_client,
+                current_user=current_user,
+                semaphore=semaphore,
+                timeout=timeout,
+            ))
+            print(f"[Prefetch] 시작: {function_name}({function_args})")
+
+    async def claim(self, tool_call: Any) -> Optional[ToolOutcome]:
+        """tool_call과 같은 선실행 작업이 있으면 그 결과를 반환합니다 (에러였으면 None)."""
+        key = canonical_call_key(tool_call.function.name, _parse_arguments(tool_call.function.arguments))
+        task = self._tasks.get(key) if key else None
+        if task is None or task.cancelled():
+            return None
+        started = time.perf_counter()
+        outcome = await task
+        if isinstance(outcome.response, dict) and outcome.response.get("error"):
+            return None
+        self.hits += 1
+        MCP_PREFETCH_HITS.labels(outcome.name).inc()
+        waited = time.perf_counter() - started
+        print(f"[Prefetch HIT] {outcome.name} (대기 {waited:.2f}s / 실행 {outcome.elapsed:.2f}s)")
+        return replace(outcome, tool_call_id=tool_call.id, elapsed=waited)
+
+    def close(self) -> None:
+        """요청 종료 시 호출: 아직 끝나지 않은(사용되지 않은) 선실행 작업을 취소합니다."""
+        pending = [task for task in self._tasks.values() if not task.done()]
+        for task in pending:
+            task.cancel()
+        if self._tasks:
+            print(f"[Prefetch] 시작 {len(self._tasks)}개, 적중 {self.hits}개, 취소 {len(pending)}개")
+
+
+async def run_tool_call(
+    tool_call: Any,
+    *,
+    httpx_client: httpx.AsyncClient,
+    current_user: models.User,
+    semaphore: asyncio.Semaphore,
+    timeout: float = TOOL_TIMEOUT_SECONDS,
+    prefetch: Optional[SpeculativePrefetch] = None,
+) -> ToolOutcome:
+    """tool_call 하나를 실행합니다. 같은 호출이 선실행 중이면 그 결과를 재사용합니다."""
+    if prefetch is not None:
+        outcome = await prefetch.claim(tool_call)
+        if outcome is not None:
+            return outcome
+    return await _run_tool(
+        tool_call,
+        httpx_client=httpx_client,
+        current_user=current_user,
+        semaphore=semaphore,
+        timeout=timeout,
+    )
+
+
+async def iter_tool_calls(
+    tool_calls: List[Any],
+    *,
+    httpx_client: httpx.AsyncClient,
+    current_user: models.User,
+    max_concurrency: int = TOOL_MAX_CONCURRENCY,
+    timeout: float = TOOL_TIMEOUT_SECONDS,
+    prefetch: Optional[SpeculativePrefetch] = None,
+) -> AsyncIterator[Tuple[int, ToolOutcome]]:
+    """
+    tool_call 목록을 동시에 실행하고, 끝나는 순서대로 (원래 index, 결과)를 내보냅니다.
+    스트리밍 응답에서 도구 하나가 끝날 때마다 이벤트를 보내는 데 사용합니다.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def _indexed(index: int, tool_call: Any) -> Tuple[int, ToolOutcome]:
+        outcome = await run_tool_call(
+            tool_call,
+            httpx_client=httpx_client,
+            current_user=current_user,
+            semaphore=semaphore,
+            timeout=timeout,
+            prefetch=prefetch,
+        )
+        return index, outcome
+
+    tasks = [asyncio.create_task(_indexed(i, tc)) for i, tc in enumerate(tool_calls)]
+    started = time.perf_counter()
+    total = 0.0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, outcome = await next_done
+            total += outcome.elapsed
+            yield index, outcome
+    finally:
+        # 소비자가 중간에 끊으면(클라이언트 연결 종료 등) 남은 도구는 취소
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+    if len(tasks) > 1:
+        print(f"[MCP Executor] {len(tasks)}개 도구 병렬 실행: {time.perf_counter() - started:.2f}s (순차 합계 {total:.2f}s)")
@@ -0,0 +1,91 @@
+# app/mcp/intent_router.py
+# 첫 LLM 호출 전에 로컬에서 질문을 분류하고 티커를 확정하는 결정적 라우터입니다.
+#
+# 대부분의 질문은 시스템 프롬프트의 "Chain of Command"를 그대로 따릅니다:
+#   Step 1 search_company_by_name → Step 2 Rule A~E의 고정 도구 → Step 3 답변
+# 그런데 기존에는 Step 1부터 LLM 왕복을 기다린 뒤에야 데이터 조회가 시작됐습니다.
+# 라우터는
+#   - 키워드 의도 감지(app/mcp/prompts.py) + 기업 별칭 인덱스로 티커를 미리 찾고
+#   - Rule A~E에 해당하는 도구를 백그라운드로 먼저 실행(SpeculativePrefetch)하며
+#   - 확정된 티커를 system 힌트로 넣어 Step 1 턴을 생략하게 합니다.
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.mcp.prompts import detect_intents
+from app.services.company_alias_index import get_alias_index
+
+# 프롬프트 Step 2 규칙과 동일한 도구 (ticker 인자는 라우팅 시 채움)
+PREDICTED_TOOLS: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {
+    "earnings": [("fetch_earnings_surprises", {})],                 # Rule A
+    "valuation": [("fetch_company_key_metrics", {})],               # Rule B
+    "price_move": [                                                 # Rule C
+        ("fetch_market_time_series", {"period": "1M"}),
+        ("fetch_earnings_calendar", {}),
+        ("fetch_company_key_metrics", {}),
+        ("search_summarized_news", {}),
+    ],
+    "news": [("search_summarized_news", {})],                       # Rule D
+    "trend": [("fetch_market_time_series", {})],                    # Rule E
+}
+
+MAX_PREFETCH_TICKERS = 2
+MAX_PREFETCH_CALLS = 8
+
+
+@dataclass
+class RoutePlan:
+    """라우팅 결과: 감지된 의도, 확정된 티커, 미리 실행할 도구 호출."""
+
+    intents: List[str]
+    tickers: List[str]
+    names: Dict[str, str] = field(default_factory=dict)
+    calls: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)
+
+    def ticker_hint(self) -> Optional[Dict[str, str]]:
+        """티커가 확정됐으면 Step 1(search_company_by_name)을 건너뛰라는 system 메시지."""
+        if not self.tickers:
+            return None
+        resolved = ", ".join(f"{ticker} ({self.names.get(ticker, ticker)})" for ticker in self.tickers)
+        return {
+            "role": "system",
+            "content": (
+                f"Router hint: the company in the latest question is already resolved → {resolved}. "
+                "Step 1 is done: do NOT call `search_company_by_name` for it. "
+                "Call the Step 2 tools with this ticker directly."
+            ),
+        }
+
+
+def route_question(user_message: str, db: Session) -> RoutePlan:
+    """질문을 분류하고, 티커가 확정되면 예상 도구 호출 목록을 만듭니다."""
+    intents = detect_intents(user_message)
+    try:
+        index = get_alias_index(db)
+    except Exception as e:
+        # 인덱스를 못 만들면 라우팅 없이 기존 흐름(LLM이 검색)으로 진행
+        print(f"[Router] 별칭 인덱스 로드 실패: {e}")
+        db.rollback()
+        return RoutePlan(intents=intents, tickers=[])
+
+    tickers = index.find_in_text(user_message, limit=MAX_PREFETCH_TICKERS)
+    plan = RoutePlan(
+        intents=intents,
+        tickers=tickers,
+        names={ticker: index.names.get(ticker, ticker) for ticker in tickers},
+    )
+
+    for ticker in tickers:
+        for intent in intents:
+            for tool_name, arguments in PREDICTED_TOOLS.get(intent, []):
+                call = (tool_name, {"ticker": ticker, **arguments})
+                if call not in plan.calls:
+                    plan.calls.append(call)
+    plan.calls = plan.calls[:MAX_PREFETCH_CALLS]
+
+    print(f"[Router] intents={intents} tickers={tickers} prefetch={len(plan.calls)}개")
+    return plan
@@ -0,0 +1,308 @@
+# app/mcp/planner.py
+# Plan-then-execute 모드: 계획 LLM 호출 1회 → 도구 DAG 병렬 실행 → 종합 LLM 호출 1회.
+#
+# ReAct 루프는 search_company_by_name 결과(티커)를 알기 위해서만 LLM 한 턴을 쓰고,
+# MAX_TURNS = 3 안에 데이터 도구까지 못 가는 경우가 있습니다.
+# 여기서는 계획 단계에서 도구 호출 전체를 DAG로 받습니다.
+#   {"steps": [
+#     {"id": "s1", "tool": "search_company_by_name", "args": {"query": "엔비디아"}},
+#     {"id": "s2", "tool": "fetch_company_key_metrics", "args": {"ticker": "{s1.ticker}"}},
+#     {"id": "s3", "tool": "search_summarized_news", "args": {"ticker": "{s1.ticker}"}}
+#   ]}
+# "{s1.ticker}"처럼 앞 단계 출력을 참조하는 단계만 그 단계를 기다리고, 나머지는 즉시 동시에 실행됩니다.
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from app import models
+from app.config import TOOL_MAX_CONCURRENCY, TOOL_TIMEOUT_SECONDS
+from app.llm_client import chat_completion
+from app.mcp.executor import SpeculativePrefetch, ToolOutcome, run_tool_call
+from app.mcp.registry import available_tools
+
+PLAN_MAX_STEPS = 8
+# 문자열 전체 또는 일부에 들어가는 참조: {s1.ticker}, {s2.0.symbol}
+_REFERENCE = re.compile(r"\{(s\d+)((?:\.[A-Za-z0-9_]+)*)\}")
+
+PLANNER_SYSTEM_PROMPT = """\
+You are the planning step of Fin:D Pro, a financial analysis agent.
+Do NOT answer the user. Output ONLY a JSON object describing the tool calls needed to answer the latest question:
+{"steps": [{"id": "s1", "tool": "<tool name>", "args": {...}}, ...]}
+
+Rules:
+- Use only the tools listed below, with their argument names.
+- Step ids are "s1", "s2", ... in order.
+- A step may reference an EARLIER step's output with "{sN.field}" (e.g. "{s1.ticker}"). If that output is a list, the first item is used.
+- If the ticker is unknown, the first step is `search_company_by_name`, and later steps use "{s1.ticker}".
+- If a "Router hint" gives the ticker, use it directly and skip `search_company_by_name`.
+- Follow the data rules: Earnings → fetch_earnings_surprises; Valuation/PER → fetch_company_key_metrics;
+  Why did it drop/rise → fetch_market_time_series(period="1M") + fetch_earnings_calendar + fetch_company_key_metrics + search_summarized_news;
+  News → search_summarized_news; Price trend → fetch_market_time_series.
+- At most %d steps. If no data is needed (greeting, follow-up on data already in the conversation), return {"steps": []}.
+""" % PLAN_MAX_STEPS
+
+
+class PlanError(ValueError):
+    """계획 JSON이 잘못되어 실행할 수 없을 때 (호출 측은 ReAct 모드로 대체)."""
+
+
+@dataclass
+class PlanStep:
+    id: str
+    tool: str
+    args: Dict[str, Any]
+    depends_on: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ToolPlan:
+    steps: List[PlanStep]
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """SSE "plan" 이벤트용 요약."""
+        return [
+            {"id": step.id, "tool": step.tool, "args": step.args, "depends_on": step.depends_on}
+            for step in self.steps
+        ]
+
+
+def _tool_catalog(tools: List[Dict[str, Any]]) -> str:
+    """전체 스키마 대신 이름/인자/설명 첫 줄만 전달 (계획에는 이 정도로 충분)."""
+    lines = []
+    for schema in tools:
+        function = schema["function"]
+        params = function.get("parameters", {})
+        required = set(params.get("required", []))
+        arguments = ", ".join(
+            name if name in required else f"{name}?" for name in params.get("properties", {})
+        )
+        summary = next((line.strip() for line in function.get("description", "").splitlines() if line.strip()), "")
+        lines.append(f"- {function['name']}({arguments}): {summary}")
+    return "\n".join(lines)
+
+
+def _collect_references(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return [match.group(1) for match in _REFERENCE.finditer(value)]
+    if isinstance(value, dict):
+        return [ref for item in value.values() for ref in _collect_references(item)]
+    if isinstance(value, list):
+        return [ref for item in value for ref in _collect_references(item)]
+    return []
+
+
+def parse_plan(raw: str, allowed_tools: List[str]) -> ToolPlan:
+    """
+    계획 JSON을 검증합니다.
+    참조는 앞선 단계만 가리킬 수 있으므로 순환이 생기지 않습니다.
+    """
+    try:
+        payload = json.loads(raw or "")
+    except ValueError as e:
+        raise PlanError(f"계획 JSON 파싱 실패: {e}")
+    raw_steps = payload.get("steps") if isinstance(payload, dict) else None
+    if not isinstance(raw_steps, list):
+        raise PlanError("steps 배열이 없습니다.")
+    if len(raw_steps) > PLAN_MAX_STEPS:
+        raise PlanError(f"단계 수 초과: {len(raw_steps)} > {PLAN_MAX_STEPS}")
+
+    steps: List[PlanStep] = []
+    seen = set()
+    for raw_step in raw_steps:
+        if not isinstance(raw_step, dict):
+            raise PlanError(f"잘못된 단계: {raw_step}")
+        step_id = str(raw_step.get("id") or f"s{len(steps) + 1}")
+        tool = raw_step.get("tool")
+        args = raw_step.get("args") or {}
+        if step_id in seen:
+            raise PlanError(f"중복된 단계 id: {step_id}")
+        if tool not in allowed_tools or tool not in available_tools:
+            raise PlanError(f"사용할 수 없는 도구: {tool}")
+        if not isinstance(args, dict):
+            raise PlanError(f"{step_id}: args는 객체여야 합니다.")
+        depends_on = []
+        for ref in _collect_references(args):
+            if ref not in seen:
+                raise PlanError(f"{step_id}: 앞선 단계가 아닌 {ref}를 참조합니다.")
+            if ref not in depends_on:
+                depends_on.append(ref)
+        steps.append(PlanStep(step_id, tool, args, depends_on))
+        seen.add(step_id)
+    return ToolPlan(steps)
+
+
+async def create_plan(
+    user_message: str,
+    *,
+    history: List[Dict[str, Any]],
+    tools: List[Dict[str, Any]],
+    hint: Optional[str] = None,
+) -> ToolPlan:
+    """계획 LLM 호출 1회로 도구 DAG를 받습니다."""
+    context = "\n".join(f"{msg['role']}: {msg['content']}" for msg in history)
+    messages = [
+        {"role": "system", "content": PLANNER_SYSTEM_PROMPT},
+        {"role": "system", "content": "Available tools:\n" + _tool_catalog(tools)},
+    ]
+    if context:
+        messages.append({"role": "system", "content": "Recent conversation (context only):\n" + context})
+    if hint:
+        messages.append({"role": "system", "content": hint})
+    messages.append({"role": "user", "content": user_message})
+
+    response = await chat_completion(
+        messages,
+        label="Planner",
+        temperature=0,
+        response_format={"type": "json_object"},
+    )
+    plan = parse_plan(
+        response.choices[0].message.content,
+        [schema["function"]["name"] for schema in tools],
+    )
+    print(f"[Planner] {len(plan.steps)}단계 계획: {[f'{s.id}:{s.tool}' for s in plan.steps]}")
+    return plan
+
+
+def _lookup(output: Any, path: List[str]) -> Any:
+    for key in path:
+        if isinstance(output, list):
+            if key.isdigit():
+                output = output[int(key)] if int(key) < len(output) else None
+                continue
+            output = output[0] if output else None
+        if isinstance(output, dict):
+            output = output.get(key)
+        else:
+            return None
+    if isinstance(output, list) and not path:
+        output = output[0] if output else None
+    return output
+
+
+def resolve_arguments(value: Any, outputs: Dict[str, Any]) -> Any:
+    """참조를 실제 값으로 치환합니다. 문자열 전체가 참조면 원래 타입을 유지합니다."""
+    if isinstance(value, dict):
+        return {key: resolve_arguments(item, outputs) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_arguments(item, outputs) for item in value]
+    if not isinstance(value, str):
+        return value
+
+    def _value(match: "re.Match[str]") -> Any:
+        resolved = _lookup(outputs.get(match.group(1)), [p for p in match.group(2).split(".") if p])
+        if resolved is None:
+            raise PlanError(f"참조를 해석할 수 없습니다: {match.group(0)}")
+        return resolved
+
+    whole = _REFERENCE.fullmatch(value)
+    if whole:
+        return _value(whole)
+    return _REFERENCE.sub(lambda match: str(_value(match)), value)
+
+
+async def execute_plan(
+    plan: ToolPlan,
+    *,
+    httpx_client: httpx.AsyncClient,
+    current_user: models.User,
+    prefetch: Optional[SpeculativePrefetch] = None,
+    max_concurrency: int = TOOL_MAX_CONCURRENCY,
+    timeout: float = TOOL_TIMEOUT_SECONDS,
+) -> AsyncIterator[Tuple[str, PlanStep, Any]]:
+    """
+    DAG를 최대 동시성으로 실행합니다. 의존 단계가 끝나는 즉시 다음 단계가 시작됩니다.
+    ("start", step, args) / ("finish", step, ToolOutcome) 이벤트를 발생 순서대로 내보냅니다.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    events: "asyncio.Queue[Tuple[str, PlanStep, Any]]" = asyncio.Queue()
+    tasks: Dict[str, "asyncio.Task[ToolOutcome]"] = {}
+
+    async def _execute_step(step: PlanStep) -> ToolOutcome:
+        outputs: Dict[str, Any] = {}
+        for dependency in step.depends_on:
+            outcome = await tasks[dependency]
+            outputs[dependency] = outcome.response
+        for dependency, response in outputs.items():
+            if isinstance(response, dict) and response.get("error"):
+                raise PlanError(f"선행 단계 {dependency} 실패로 건너뜀")
+        args = resolve_arguments(step.args, outputs)
+
+        await events.put(("start", step, args))
+        tool_call = SimpleNamespace(
+            id=f"plan_{step.id}",
+            function=SimpleNamespace(name=step.tool, arguments=json.dumps(args, ensure_ascii=False, default=str)),
+        )
+        return await run_tool_call(
+            tool_call,
+            httpx_client=httpx_client,
+            current_user=current_user,
+            semaphore=semaphore,
+            timeout=timeout,
+            prefetch=prefetch,
+        )
+
+    async def _run_step(step: PlanStep) -> ToolOutcome:
+        # 어떤 예외로 끝나도 finish 이벤트는 반드시 보냄 (소비 루프가 finish 개수를 세며 기다리므로)
+        try:
+            outcome = await _execute_step(step)
+        except PlanError as e:
+            outcome = ToolOutcome(f"plan_{step.id}", step.tool, {"error": str(e)}, 0.0)
+        except Exception as e:
+            print(f"[Planner] {step.id}:{step.tool} 실행 실패 - {e}")
+            outcome = ToolOutcome(f"plan_{step.id}", step.tool, {"error": str(e)}, 0.0)
+        await events.put(("finish", step, outcome))
+        return outcome
+
+    # 선언 순서대로 태스크를 만들면 참조 대상 태스크가 항상 먼저 존재함
+    for step in plan.steps:
+        tasks[step.id] = asyncio.create_task(_run_step(step))
+
+    try:
+        finished = 0
+        while finished < len(plan.steps):
+            event = await events.get()
+            if event[0] == "finish":
+                finished += 1
+            yield event
+    finally:
+        for task in tasks.values():
+            if not task.done():
+                task.cancel()
+
+
+def plan_messages(
+    plan: ToolPlan,
+    outcomes: Dict[str, ToolOutcome],
+    resolved_args: Dict[str, Dict[str, Any]],
+) -> Tuple[Dict[str, Any], List[ToolOutcome]]:
+    """
+    실행 결과를 종합 호출용 assistant(tool_calls) 메시지 + tool 결과 목록으로 변환합니다.
+    arguments에는 참조가 치환된 실제 인자를 넣습니다 (건너뛴 단계는 계획 그대로).
+    """
+    ordered = [outcomes[step.id] for step in plan.steps if step.id in outcomes]
+    assistant = {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [
+            {
+                "id": f"plan_{step.id}",
+                "type": "function",
+                "function": {
+                    "name": step.tool,
+                    "arguments": json.dumps(resolved_args.get(step.id, step.args), ensure_ascii=False, default=str),
+                },
+            }
+            for step in plan.steps
+            if step.id in outcomes
+        ],
+    }
+    return assistant, ordered
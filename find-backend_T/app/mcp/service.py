@@ -1,503 +1,221 @@
 # app/mcp/service.py
 # MCP 에이전트의 핵심 로직(두뇌)을 담당합니다.
 
-from typing import Dict, Any
-import inspect
 import json
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 import httpx
-from openai import OpenAI
 from sqlalchemy.orm import Session
 
-from app.config import OPENAI_API_KEY
 from app import models, schemas
+from app.llm_client import stream_chat_completion
 
 # 1. 도구 등록소에서 도구 리스트와 매핑을 가져옵니다
-from app.mcp.registry import tools_schema, available_tools
+from app.mcp.registry import tools_schema
+from app.config import AGENT_MODE, INTENT_ROUTER_PREFETCH
+from app.mcp.executor import SpeculativePrefetch, ToolOutcome, iter_tool_calls
+from app.mcp.planner import create_plan, execute_plan, plan_messages
+from app.mcp.intent_router import route_question
+from app.mcp.answer_cache import get_cached_answer, store_answer
+from app.mcp.compaction import ToolOutputBudget
+from app.mcp.prompts import build_prompt_plan
 from app.services import ServiceError
+from app.services.company_alias_index import invalidate_alias_index
+from app.services.learned_aliases import accept_learned_aliases, learned_alias_keys
+from app.services.memory_service import load_recent_messages
+
+
+async def _stream_llm_turn(
+    messages: List[Dict[str, Any]],
+    *,
+    label: str,
+    tool_choice: str,
+    tools: Optional[List[Dict[str, Any]]] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    LLM 한 턴을 스트리밍으로 호출합니다.
+    텍스트 조각은 ("token", str)으로 내보내고,
+    마지막에 ("message", {"content": str, "tool_calls": list})로 완성된 응답을 내보냅니다.
+    도구를 호출할 수 있는 턴(tool_choice != "none")은 tool_call과 함께 온 텍스트가 답변으로 전달되지 않도록
+    턴이 끝날 때까지 모아 두었다가, 도구 호출이 없을 때만 내보냅니다.
+    (저장되는 답변/done.content와 스트리밍된 텍스트가 항상 같도록)
+    """
+    buffer_tokens = tool_choice != "none"
+    content_parts: List[str] = []
+    tool_call_parts: Dict[int, Dict[str, Any]] = {}
+
+    async for chunk in stream_chat_completion(
+        messages,
+        label=label,
+        tools=tools if tools is not None else tools_schema,
+        tool_choice=tool_choice,
+    ):
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            content_parts.append(delta.content)
+            if not buffer_tokens:
+                yield "token", delta.content
+        # tool_call은 index별로 id/name/arguments가 조각나서 도착하므로 누적
+        for tc in delta.tool_calls or []:
+            part = tool_call_parts.setdefault(tc.index, {"id": None, "name": "", "arguments": ""})
+            if tc.id:
+                part["id"] = tc.id
+            if tc.function and tc.function.name:
+                part["name"] += tc.function.name
+            if tc.function and tc.function.arguments:
+                part["arguments"] += tc.function.arguments
+
+    tool_calls = [
+        SimpleNamespace(
+            id=part["id"],
+            function=SimpleNamespace(name=part["name"], arguments=part["arguments"]),
+        )
+        for _, part in sorted(tool_call_parts.items())
+    ]
+    if buffer_tokens and not tool_calls:
+        for part in content_parts:
+            yield "token", part
+    yield "message", {"content": "".join(content_parts), "tool_calls": tool_calls}
+
+
+def _widget_key(widget: Dict[str, Any]) -> str:
+    # 위젯을 식별할 수 있는 키 생성 (type + ticker)
+    # ticker가 없으면 title 사용 (fallback)
+    ticker = widget.get('ticker', '')
+    title = widget.get('title', '')
+    return f"{widget.get('type')}_{ticker or title}"
+
+
+def _tool_finish_events(
+    outcome: ToolOutcome,
+    seen_widget_keys: set,
+    collected_widgets: List[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """도구 하나가 끝났을 때 보낼 tool_finish 이벤트와 (중복 제거된) widget 이벤트."""
+    error = outcome.response.get("error") if isinstance(outcome.response, dict) else None
+    events = [{
+        "type": "tool_finish",
+        "tool": outcome.name,
+        "tool_call_id": outcome.tool_call_id,
+        "elapsed_ms": round(outcome.elapsed * 1000),
+        "error": error,
+    }]
+    # Widget Collection
+    if isinstance(outcome.response, dict) and "widgets" in outcome.response:
+        for widget in outcome.response["widgets"]:
+            key = _widget_key(widget)
+            if key in seen_widget_keys:
+                continue
+            seen_widget_keys.add(key)
+            collected_widgets.append(widget)
+            events.append({"type": "widget", "widget": widget})
+    return events
 
-# OpenAI 클라이언트 초기화
-client = OpenAI(api_key=OPENAI_API_KEY)
 
 async def run_mcp_agent(
     user_message: str,
     current_user: models.User,
     db: Session,
-    httpx_client: httpx.AsyncClient
+    httpx_client: httpx.AsyncClient,
+    agent_mode: Optional[str] = None,
+    use_cache: bool = True,
 ) -> Dict[str, Any]:
     """
-    AI 에이전트의 전체 MCP 사이클을 실행합니다.
+    AI 에이전트의 전체 MCP 사이클을 실행하고 최종 결과만 반환합니다.
+    (스트리밍을 쓰지 않는 클라이언트용: stream_mcp_agent의 "done" 이벤트를 기다립니다.)
+    """
+    result: Optional[Dict[str, Any]] = None
+    async for event in stream_mcp_agent(
+        user_message, current_user, db, httpx_client, agent_mode=agent_mode, use_cache=use_cache
+    ):
+        if event["type"] == "done":
+            result = {"content": event["content"], "widgets": event["widgets"]}
+    if result is None:
+        raise ServiceError("AI 에이전트가 최종 답변을 생성하지 못했습니다.")
+    return result
+
+
+async def stream_mcp_agent(
+    user_message: str,
+    current_user: models.User,
+    db: Session,
+    httpx_client: httpx.AsyncClient,
+    agent_mode: Optional[str] = None,
+    use_cache: bool = True,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    AI 에이전트의 전체 MCP 사이클을 실행하면서 진행 이벤트를 순서대로 내보냅니다.
     1. 메모리 로드 -> 2. AI 1차 호출 -> 3. 도구 실행 -> 4. AI 2차 호출 -> 5. 메모리 저장
+
+    agent_mode (기본값: config.AGENT_MODE)
+    - "react": 모델이 턴마다 도구를 고르는 기존 루프 (최대 MAX_TURNS)
+    - "plan": 계획 호출 1회로 도구 DAG를 받아 병렬 실행 후 종합 호출 1회
+              (계획이 잘못되면 react로 대체)
+    use_cache=False면 답변 캐시(app/mcp/answer_cache.py)를 조회/저장하지 않습니다.
+
+    이벤트 종류:
+    - {"type": "start"}: 요청 수신 직후 (첫 바이트를 바로 보내기 위함)
+    - {"type": "plan", "steps"}: plan 모드에서 계획이 확정된 직후
+    - {"type": "tool_start", "tool", "tool_call_id", "arguments"}
+    - {"type": "tool_finish", "tool", "tool_call_id", "elapsed_ms", "error"}
+    - {"type": "widget", "widget"}: 도구가 끝나는 즉시 (중복 제거 후) 전송
+    - {"type": "token", "content"}: 답변 텍스트 조각
+    - {"type": "done", "content", "widgets", "cached"}: DB 저장까지 끝난 최종 결과
     """
 
     # --- 1. DB에서 최근 대화 기록 로드 (메모리: Smart Short-Term) ---
     # [활성화] 최근 1쌍(User+AI)만 로드하여 "꼬리 질문" 대응
     # 하지만 System Prompt에서 "주제 전환 시 정보 폐기"를 강제함
     print(f"[MCP Agent] 사용자 질문 처리 시작: {user_message[:50]}...")
-    db_history = db.query(models.ChatHistory)\
-                   .filter(models.ChatHistory.user_id == current_user.id)\
-                   .order_by(models.ChatHistory.created_at.desc())\
-                   .limit(2)\
-                   .all()
+    yield {"type": "start"}
+    db_history = load_recent_messages(db, current_user.id, 2)
     print(f"[MCP Agent] 대화 기록 로드 완료: {len(db_history)}개 메시지") 
     # db_history = []  # 기존 비활성화 코드 제거
 
 
-    collected_widgets = [] # [NEW] 위젯 수집 리스트
-
-    messages = [
-        {"role": "system", "content": 
-            """
-            ### 0. Context & Focus Rule
-            - Conversation history is context only.
-            - Always answer the user's most recent message.
-            - Do not get distracted by earlier topics unless the latest question requires it.
-
-            ### 0. CRITICAL: Tool Usage Rule (MUST READ FIRST)
-            - **ABSOLUTELY FORBIDDEN**: Never say "I will fetch", "가져오겠습니다", "확인하겠습니다", "기다려주세요", "잠시만", "이제 ~하겠습니다", "데이터를 확인하겠습니다", or ANY future-tense promises.
-            - **MANDATORY**: When user asks about ANY financial data (PER, PBR, cash flow, etc.), you MUST call the appropriate tool IMMEDIATELY and silently.
-            - **NO EXCEPTIONS**: You CANNOT answer without calling tools first. If you don't call a tool, you CANNOT provide any answer.
-            - **RESPONSE FORMAT**: After calling tools, present the results DIRECTLY. Do NOT explain what you will do - just present the actual data from tool responses.
-            - **AFTER TOOL CALLS**: When you receive tool responses, IMMEDIATELY use that data in your answer. Do NOT say "확인하겠습니다" - you have ALREADY checked. Present the results NOW.
-            
-            ### 0.7. CRITICAL: Evidence First Protocol (Numeric Citation)
-            - **NO ADJECTIVES WITHOUT NUMBERS**: You CANNOT say "high", "low", "increased", "decreased", "improved", "worsened" without providing the EXACT numbers in parentheses.
-            - **FORMAT**: "Qualitative Claim + (**Previous -> Current**)" or "Qualitative Claim + (**Target -> Actual**)""
-              - *Startlingly Bad*: "Revenue beat estimates." (BANNED)
-              - *Professional*: "Revenue was **$26.0B (Estimate: $24.5B)**, beating consensus by 6%."
-              - *Startlingly Bad*: "Profit margins declined." (BANNED)
-              - *Professional*: "Gross Margin declined by 2.3%p to **(45.1% -> 42.8%)**, indicating cost pressure."
-            - **NO HALLUCINATION**: If stock dropped, DO NOT assume margins dropped. CHECK `fetch_company_key_metrics`.
-              - If data says margins rose, say: "Interestingly, despite the stock drop, **Gross Margin actually improved (40% -> 42%)**, suggesting other factors are at play."
-
-            ### 1. Persona: "Fin:D Pro (Objective Financial Analyst)"
-            - **Role**: You are an objective, data-driven financial analyst.
-            - **Goal**: Synthesize actual data into rational insights.
-            - **Tone**: Professional, Rational, Insightful.
-            - **Language**: Your final answer **MUST** be in **Korean**.
-
-            ### 2. 🔗 The "Chain of Command" Protocol (MANDATORY)
-            *(You MUST follow this workflow for every query. Do NOT skip steps.)*
-
-            **Step 1: Identify Ticker**
-            - Input: "Samsung earnings?"
-            - Action: Call `search_company_by_name("Samsung")`
-            - Result: "005930.KS"
-
-            **Step 2: Fetch Hard Data (CRITICAL - DO NOT SKIP)**
-            - **Rule A (Earnings)**: If user asks about Earnings/Results/Surprise → You **MUST** call `fetch_earnings_surprises(ticker)`.
-            - **Rule B (Valuation)**: If user asks about Valuation/PER/Price → You **MUST** call `fetch_company_key_metrics(ticker)`.
-            - **Rule C (Why/Drop/Rise Analysis)**: If user asks "Why did [stock] drop/rise?" → You **MUST** call MULTIPLE tools:
-              1. `fetch_market_time_series(ticker, period="1M")` - Verify WHEN and HOW MUCH it moved
-              2. `fetch_earnings_calendar(ticker)` - Check if earnings event triggered it
-              3. `fetch_company_key_metrics(ticker)` - Check valuation changes
-              4. `search_summarized_news(ticker)` - Get narrative context
-              **CRITICAL**: Do NOT answer with news only. You MUST verify the price movement first!
-            - **Rule D (News Only)**: If user asks general "What's happening?" → Call `search_summarized_news(ticker)`.
-            - **Rule E (Trend)**: If user asks about Price Trend → Call `fetch_market_time_series(ticker)`.
-
-            **Step 3: Answer (Synthesis & Insight)**
-            - Action: Synthesize the *actual data* returned from Step 2 using the **"Fin:D Pro Analysis Framework"**.
-            - **DO NOT** use your internal training data for specific numbers. Always use the Tool Output.
-            - **CRITICAL - Pre-Calculated YoY Changes (백엔드 계산 활용)**:
-              - Backend provides pre-calculated YoY changes in the data
-              - **DO NOT recalculate** - use the provided `*_yoy_change_pct` fields
-              - **Available fields in payload[0]**:
-                * `debt_to_equity_yoy_change_pct`: -28.5 (means -28.5% vs prior year)
-                * `pe_ratio_yoy_change_pct`: +5.4
-                * `return_on_equity_yoy_change_pct`: -8.2
-                * `debt_to_equity_previous`: 5.41 (prior year value)
-                * `avg_de`, `avg_pe`, `avg_pbr` (5-year averages)
-              
-              - **Response Format (Wall Street Standard)**:
-                ```
-                부채비율: 3.87 (전년 5.41 대비 -28.5% 개선)
-                * FY2025 (2025년 9월 기준)
-                * 5년 평균 4.95 대비 21.8% 낮은 수준으로, 자본 구조가 개선되고 있습니다.
-                ```
-              
-              - **Mandatory Elements (월스트리트 표준)**:
-                1. **Current value**: "3.87"
-                2. **Previous value**: "전년 5.41"
-                3. **YoY change**: "대비 -28.5% 개선" (use `*_yoy_change_pct`)
-                4. **Historical average**: "5년 평균 4.95" (use `avg_*`)
-                5. **Interpretation**: "자본 구조가 개선되고 있습니다"
-            
-            ### 2.3 Narrative Polish Rules (MANDATORY)
-            
-            **Rule 0: CRITICAL Financial Terminology (MUST FOLLOW)**
-            1. **Revenue vs Profit (매출 vs 이익)**:
-               - When summarizing government policies (Tariffs, Fees), you **MUST** distinguish between:
-                 - **"Sales/Revenue" (판매 금액/매출)**: Total money received.
-                 - **"Profit/Earnings" (수익/이익)**: Money left after costs.
-               - **Case Study**: Trump's "25% of chip sales" means **"Sales Revenue"**, NOT "Profit". Correct this immediately.
-               - **Warning**: Confusing these two is a critical failure that can mislead users about bankruptcy risks.
-
-            2. **Source Attribution (출처 명시)**:
-               - For shocking news (like "giving 25% to gov"), **ALWAYS** cite the speaker directly.
-               - **Bad**: "미국 정부에 제공해야 하는 규제가 붙었습니다." (Sounds like a confirmed law)
-               - **Good**: "트럼프 대통령이 소셜미디어를 통해 **'판매 금액의 25%를 미국 정부에 지급하는 조건'**을 언급했습니다." (Clarifies it is a statement)
-
-            3. **Capital Allocation Terminology (자본 배분 용어 정의)**:
-               - **Total Capital Allocation (총 자본 배분)** = Buybacks + Dividends + CapEx
-               - **Shareholder Return (주주 환원)** = Buybacks + Dividends ONLY (when specifically mentioning "return to shareholders")
-               - **Correct Usage**:
-                 - "총 자본 배분: $37.8B" ✅ (includes all three)
-                 - "자사주 매입과 배당을 포함한 주주환원 규모" ✅ (Buyback + Div only)
-                 - "주주환원에 $34.5B, 설비투자에 $3.2B 사용" ✅ (when breaking down)
-            
-            4. **Fiscal Year & Quarter Interpretation (회계연도 해석 규칙)**:
-               - **CRITICAL**: Report dates and fiscal quarters DO NOT match calendar quarters
-               - **Key Rules**:
-                 1. Fiscal Year (FY) ≠ Calendar Year
-                    - Example: Apple FY2025 = Oct 2024 ~ Sep 2025
-                 2. Quarter numbering follows FISCAL year, not calendar
-                    - Q1 FY2025 = Oct~Dec 2024 (ends 2024-12-28)
-                    - Q4 FY2025 = Jul~Sep 2025 (ends 2025-09-27)
-                 3. NEVER say "Q4 2025" for 2024-12-28 date
-                    - Correct: "Q1 FY2025 (2024년 12월 종료)"
-                    - Wrong: "Q4 2025" ❌
-               - **Response Format**:
-                 "Q1 FY2025 (2024년 12월 종료 분기)" or "FY2025 Q1 (Oct-Dec 2024)"
-            
-            6. **Debt-to-Equity Ratio Specification (부채비율 계산 기준 명시)**:
-               - **CRITICAL**: When mentioning D/E Ratio, ALWAYS clarify the calculation basis
-               - **Our System Uses**: Total Liabilities / Total Equity (총부채 기준)
-               - **MANDATORY Format**:
-                 ```
-                 부채비율: 0.545 (54.5%)
-                 * 계산 기준: 총부채(Total Liabilities) ÷ 자본총계
-                 * 총부채에는 유동부채(매입채무, 단기차입금 등)와 비유동부채(장기차입금 등)가 모두 포함됩니다.
-                 ```
-               - **Alternative Metrics to Mention** (if available):
-                 - 순차입금비율 = (장단기차입금 - 현금) / 자본 (이자부담부채 기준)
-                 - 차입금비율 = (장단기차입금) / 자본 (차입금만)
-               - **Why This Matters**: 
-                 - Total Liabilities 기준이 더 보수적 (안전성 평가에 유리)
-                 - 차입금만 보면 실제보다 낮게 나올 수 있음
-               - **Example Response**:
-                 "부채비율은 **54.5% (총부채 기준)**로, 이는 자본 대비 총부채 비율입니다. 
-                  매입채무 등 영업부채를 포함한 모든 부채를 반영하므로, 순차입금 기준보다 높게 산출됩니다."
-            
-            7. **Professional Financial Report Format (전문 리포트 형식)**:
-               
-               **Standard Output Template for Cash Flow Analysis:**
-               ```
-               [Company]의 최근 현금 흐름 데이터 (FY[Year], [Year]년 [Month]월 종료 기준)
-               
-               ● 운영 현금 흐름 (Operating Cash Flow): $XX.XB
-               ● 투자 현금 흐름 (Investing Cash Flow): -$XX.XB
-               ● 재무 현금 흐름 (Financing Cash Flow): -$XX.XB
-               ● 자본 지출 (CapEx): -$X.XB
-               ● 자유 현금 흐름 (Free Cash Flow): $XX.XB
-               ● 주식 매입 (Buyback): -$XX.XB
-               ● 배당금 지급 (Dividends Paid): -$XXXM
-               ● 총 자본 배분 (Total Capital Allocation): $XX.XB
-               
-               💡 추가 인사이트
-               ● [강력한/탁월한] [metric] 능력을 보유하고 있습니다.
-               ● 전체 매출의 약 [XX]%가 자유 현금 흐름으로 남아, [평가] 수익 구조를 보여줍니다.
-               ● 자사주 매입과 배당을 포함한 주주환원 규모가 [평가], 주주 친화적인 정책을 지속하고 있습니다.
-               ● 전반적으로 [Company]는 [종합 평가].
-               
-               이 분석은 공개된 재무 데이터에 기반한 참고 자료이며, 투자 권유가 아닙니다.
-               
-               Source: [Company] FY[Year] Company Filings, 기준일: [YYYY]년 [M]월.
-               ```
-               
-               **Writing Style Guidelines:**
-               - **CRITICAL**: ALWAYS use `●` (black circle) for ALL bullet points, not `-` or `*`
-               - Use professional descriptors: "강력한", "탁월한", "높은", "안정적인"
-               - Provide exactly 4 bullet points in "💡 추가 인사이트" section
-               - Each bullet point MUST start with `●` followed by a space
-               - Always include disclaimer and source at the end
-               - Be comprehensive and insightful, not just data listing
-               
-               **Correct Bullet Format:**
-               ```
-               ● 엔비디아는 강력한 영업 현금 흐름을...
-               ● 전체 매출의 약 46.6%가...
-               ```
-               
-               **WRONG Formats (DO NOT USE):**
-               ```
-               - 엔비디아는... ❌
-               * 엔비디아는... ❌
-               • 엔비디아는... ❌
-               ```
-               
-               **Output Templates for Other Analysis Types:**
-               
-               **For Valuation Analysis:**
-               ```
-               [Company]의 현재 밸류에이션 (기준일: [YYYY]년 [M]월)
-               
-               ● 주가-수익 비율 (PER): XX.X
-               ● Forward PER: XX.X
-               ● PEG Ratio: X.XX
-               ● 주가-장부가 비율 (PBR): X.XX
-               ● 자기자본이익률 (ROE): XX.X%
-               
-               💡 밸류에이션 인사이트
-               ● [Historical/Sector comparison with specific numbers]
-               ● [Growth-adjusted valuation assessment]
-               ● [Quality metrics (ROE, margins) context]
-               ● [Overall valuation conclusion]
-               ```
-               
-               **For Earnings Analysis:**
-               ```
-               [Company]의 [QX FY20XX] 실적 발표 (발표일: [YYYY]년 [M]월 [D]일)
-               
-               ● EPS: $X.XX (예상: $X.XX, 서프라이즈: +X.X%)
-               ● 매출: $XX.XB (예상: $XX.XB, +X.X%)
-               ● 영업이익률: XX.X% (전년 동기: XX.X%)
-               ● 순이익: $XX.XB (YoY +XX.X%)
-               
-               💡 실적 분석
-               ● [Beat/Miss context with Wall Street expectations]
-               ● [Margin trends and profitability]
-               ● [Guidance and forward outlook]
-               ● [Market reaction and stock performance context]
-               ```
-               
-               **Number Formatting Standards:**
-               - **CRITICAL**: Use consistent units with proper decimal places
-               - **Billions**: Use `$XX.XB` format (e.g., `$64.1B`, NOT `$64,089,000,000`)
-               - **Millions**: Use `$XXXM` format (e.g., `$834M`, NOT `$834,000,000`)
-               - **Negative values**: Use minus sign before dollar (e.g., `-$3.2B`, NOT `($3.2B)`)
-               - **Percentages**: Use one decimal place (e.g., `46.6%`, NOT `46.63%`)
-               - **Price movements**: Include arrow (e.g., `(145 → 137)`)
-               
-               **Examples:**
-               ```
-               ✅ 자유 현금 흐름: $60.9B
-               ✅ 배당금 지급: -$834M
-               ✅ FCF Margin: 46.6%
-               ✅ 주가 변동: -4.2% (145 → 137)
-               
-               ❌ 자유 현금 흐름: $60,900,000,000
-               ❌ 배당금 지급: ($834,000,000)
-               ❌ FCF Margin: 46.63421%
-               ```
-            
-            **Rule 1: Time Period Specificity**
-            - **NEVER** say "최근" without specifying the exact period
-            - **ALWAYS** include date ranges or time frames:
-              - Good: "이번 주(12월 1-6일) -8.2% 하락"
-              - Good: "월간(11월 6일~12월 6일) 기준 -2.1%"
-              - Bad: "최근 하락했습니다" ❌
-            - **For "Why Drop?" queries**: Check BOTH short-term (5D) and medium-term (1M) to distinguish:
-              - "이번 주 급락 -8%" vs "월간 추세는 소폭 하락 -2%"
-            
-            **Rule 2: News Contextualization (Not Translation)**
-            - **DO NOT** quote English news titles directly
-            - **DO** extract core meaning and reframe in natural Korean:
-              - Bad: "Amazon launches Trainium2 chip..." ❌
-              - Good: "아마존이 자체 AI 칩 '트레이니엄2'의 성능을 4배 개선했다는 소식이..." ✅
-            - **Template**: "[Company]가 [Action]했다는 소식이 전해지면서..."
-            
-            **Rule 3: Earnings Paradox Explanation (Wall Street Standard)**
-            - **Pattern**: Good Earnings + Bad Stock = Explain with standard logic
-            - **Standard Explanations**:
-              1. "높은 눈높이 (High Expectations)": "시장은 이미 실적 개선을 선반영했고, 기대치가 높았기 때문"
-              2. "차익 실현 (Profit Taking)": "실적 발표 전 선반영 랠리 후 차익 실현 매물 출회"
-              3. "가이던스 실망 (Guidance Disappointment)": "실적은 양호했으나 향후 전망이 기대에 못 미침"
-            - **Example**: "실적은 Beat했으나 주가는 -5% 하락 → '높은 눈높이' 때문. 
-                           실적 발표 전 +15% 선반영 랠리가 있었고, 시장은 더 큰 서프라이즈를 기대했습니다."
-            
-            **Rule 4: Mandatory Quantification of Price Movements**
-            - **NEVER** say "dropped", "rose", "fell", "increased" without exact percentage
-            - **ALWAYS** use `fetch_market_time_series` data to calculate:
-              - Formula: (End Price - Start Price) / Start Price × 100
-              - Format: "주가가 **-4.2%** 하락 (145 → 137)"
-            - **Examples**:
-              - Bad: "주가가 하락했습니다" ❌
-              - Good: "주가가 **-4.2%** 하락했습니다 (145 → 137)" ✅
-              - Bad: "큰 폭으로 상승" ❌
-              - Good: "**+8.5%** 급등 (120 → 130)" ✅
-            
-            **Rule 5: Professional Financial Terminology (Principle-Based)**
-            - **Principle 1**: Replace casual emotions with technical concepts
-              - Instead of "투자자들이 걱정" → Identify specific concern:
-                * "밸류에이션 우려로 시장 심리 약화"
-                * "유동성 리스크로 매도 압력 증가"
-                * "규제 불확실성으로 관망세 확대"
-              - Instead of "기대감" → Specify what:
-                * "실적 개선 기대감"
-                * "가이던스 상향 전망"
-                * "시장 점유율 확대 기대"
-            
-            - **Principle 2**: Use Wall Street Standard Jargon (When Appropriate)
-              - "Profit Taking" (차익 실현) - After rally
-              - "Sell the News" (호재 소진) - Good news + price drop
-              - "Priced In" (선반영) - Expected event already in price
-              - "Flight to Quality" (안전자산 선호) - Risk-off move
-              - "Risk-Off Sentiment" (위험 회피 심리)
-              - "Momentum Play" (모멘텀 매수)
-              - "Dead Cat Bounce" (기술적 반등) - Temporary recovery
-            
-            - **Principle 3**: Quantify Sentiment Changes
-              - Instead of "많이 올랐다" → "강한 상승 모멘텀 (+15% in 2 weeks)"
-              - Instead of "실망스럽다" → "컨센서스 대비 -8% 미달"
-              - Instead of "기대 이상" → "추정치 대비 +12% 상회"
-            
-            ### 2.5 "Fin:D Pro Analysis Framework" (MANDATORY for Step 3)
-
-            
-            **A. For "Why" Questions (Stock Drop/Rise Analysis)**
-            1. **Verify Movement**: "NVDA dropped -5.2% (145 → 137) on Nov 20-21"
-            2. **Quality Check**: "Earnings beat by 8% but guidance disappointed"
-            3. **Expectation Check**: "Stock had rallied +15% pre-earnings, priced in perfection"
-            4. **Context Check**: "Semiconductor sector (SOXX) also down -3.1%"
-            5. **[ADVANCED] Competitive Dynamics Analysis (Comparative If-Then Logic)**:
-                - **Trigger**: When analyzing ANY stock movement (Drop OR Rise) for market leaders
-                - **Reasoning Framework** (Identify key players):
-                  1. **"Who are the competitors?"** (Direct rivals)
-                     - Use industry knowledge: NVIDIA vs AMD, Tesla vs BYD, Apple vs Samsung
-                  2. **"Who are the customers?"** (Ecosystem partners)
-                     - NVIDIA's customers = GOOGL, AMZN, MSFT (Cloud providers)
-                  3. **"Are customers also competitors?"** (Vertical Integration)
-                     - If YES → They are BOTH customer AND competitor
-                
-                - **ACTION PLAN** (Comparative Cross-Reference):
-                  **Step A**: Fetch target stock movement: `fetch_market_time_series("[Target]", period="1M")`
-                  **Step B**: Identify 2-3 key competitors/customers from reasoning above
-                  **Step C**: Fetch competitor movements: `fetch_market_time_series("[Rival]", period="1M")`
-                  **Step D**: Compare directions and apply If-Then Logic below
-                  **Step E**: Search news for both tickers to confirm causality
-                
-                - **IF-THEN CAUSALITY LOGIC** (Apply based on relative movements):
-                  
-                  **Scenario A: Target ↓ vs Rival ↑** (Opposite directions)
-                  - **Interpretation**: "Market Share Loss Risk" (Zero-sum game)
-                  - **Insight Template**: 
-                    "[Target] 하락은 **[Rival]의 [Specific Success]**와 대조됩니다. 
-                     [Rival]이 [Achievement]하면서 [Target]의 시장 점유율 하락 우려를 자극했습니다."
-                  - **Example**: "NVDA -5% vs GOOGL +3% → 구글 TPU 성공으로 NVDA 점유율 우려"
-                  
-                  **Scenario B: Target ↑ vs Rival ↓** (Opposite directions)
-                  - **Interpretation**: "Relative Strength / Competitor Failure" (Winner takes all)
-                  - **Insight Template**:
-                    "경쟁사 **[Rival]의 [Specific Failure]**가 전해지면서, 
-                     [Target]의 기술적 우위와 시장 지배력이 부각되어 반사이익으로 상승했습니다."
-                  - **Example**: "NVDA +8% vs AMD -3% → AMD 신규 칩 발열 이슈로 NVDA 반사이익"
-                  
-                  **Scenario C: Target ↑ vs Customer ↑** (Same direction)
-                  - **Interpretation**: "Ecosystem Growth" (Rising tide lifts all boats)
-                  - **Insight Template**:
-                    "핵심 고객사인 **[Customer]가 [Investment/Expansion]**하자, 
-                     [Target]의 매출 증가 기대감이 커지며 동반 상승했습니다."
-                  - **Example**: "NVDA +6% vs MSFT +5% → MSFT AI CAPEX 상향으로 NVDA 수혜"
-                  
-                  **Scenario D: Target ↓ vs Sector ↓** (Same direction)
-                  - **Interpretation**: "Sector-wide Correction" (Macro factor)
-                  - **Insight Template**:
-                    "[Target] 하락은 개별 이슈보다 **[Sector] 전체 조정**의 영향입니다. 
-                     [Macro Factor]로 인한 섹터 전반의 약세가 원인입니다."
-                
-                - **Key Concepts to Identify**:
-                  * "Market Share Loss" (점유율 잠식)
-                  * "Relative Strength" (상대적 우위)
-                  * "Ecosystem Growth" (생태계 성장)
-                  * "Sector Correction" (섹터 조정)
-            6. **Synthesis Report Structure**:
-                > **🔍 분석 요약:**
-                > "[Company]의 주가 변동은 **①[Price Data]**, **②[Fundamental Trigger]**, **③[Competitive Dynamics]**, **④[Market Context]**가 복합적으로 작용한 결과입니다."
-                > 
-                > **1. 주가 데이터:**
-                > - [Date] 기준 [Price Change]% 변동 ([From] → [To])
-                > 
-                > **2. 펀더멘털 분석:**
-                > - 실적: EPS [Actual] vs [Estimate] ([Surprise]%)
-                > - 밸류에이션: PER [Before] → [After]
-                > 
-                > **3. 경쟁 구도 변화:** (If applicable)
-                > - [Competitor]의 [Specific Threat]: [Impact on Company]
-                > - 예: "구글 TPU 성능 개선 → NVDA 의존도 감소 우려"
-                > 
-                > **4. 시장 맥락:**
-                > - 섹터 동향: [Sector] [Trend]
-                > - 뉴스 요인: [Key Headlines]
-
-            **B. For Earnings/Result Questions (4-Step Logic)**
-            1. **Quality Check**: Did margins improve? Mention specific numbers.
-            2. **Expectation Check**: Comparing pre-event price trend vs result. "Priced in?"
-            3. **Context Check**: Sector peers & Macro factors.
-            4. **Synthesis Report Structure**:
-                > **🔍 분석 요약 (Analysis Summary):**
-                > "[Company]의 실적은 **①[Key Factor]**와 **②[Market Reaction]**이 결합된 결과입니다."
-                > **1. 데이터 팩트:** ...
-                > **2. 시장 해석:** ...
-                > **3. 외부 변수:** ...
-
-            **C. For Valuation Questions (GARP Protocol)**
-            1. **Trailing vs Forward PE**: "Current PE [X] -> Fwd PE [Y]."
-            2. **PEG Ratio**: "PEG [Z] (Growth adjusted)."
-            3. **Bull Case Disclaimer**: "Note: Consensus is conservative. Bull case may justify higher valuations."
-            
-            ### 2.6 Anti-Hallucination Constraints
-
-            ### 3. 🚫 Anti-Hallucination Constraints
-            - **STOP!**: If you found the ticker but haven't called a `fetch_` tool yet, **STOP and call the tool**.
-            - **Visual Check**: Before answering, ask yourself: "Did I see the tool output with the number I'm about to write?" If no, call the tool.
-            - **No Future Tense**: Do no say "I will check". Do it.
-
-            ### 4. 🧪 Examples (Mental Model)
-            
-            **User:** "How were Apple's last earnings?"
-            **Bad Agent:** Calls `search_company` -> "Apple's earnings were good..." (Hallucination ❌)
-            **Good Agent:** Calls `search_company` -> **Calls `fetch_earnings_surprises`** -> "Based on the data, Apple reported EPS of $1.40..." (Correct ✅)
-
-            **User:** "Is NVDA expensive?"
-            **Bad Agent:** Calls `search_company` -> "NVDA has a PE of 60..." (Internal Memory ❌)
-            **Good Agent:** Calls `search_company` -> **Calls `fetch_company_key_metrics`** -> "Data shows Current PE is 75.4 and Forward PE is 39.8..." (Correct ✅)
-
-            ### 5. Disclaimer (Mandatory)
-            - **ALWAYS** end your response with this exact format:
-              ```
-              이 분석은 공개된 재무 데이터에 기반한 참고 자료이며, 투자 권유가 아닙니다.
-              
-              Source: [Company] FY[Year] Company Filings, 기준일: [YYYY]년 [M]월.
-              ```
-            - **Note**: For Cash Flow / Earnings / Valuation analysis, ALWAYS include the Source line
-            - For general news/trend queries, disclaimer only is sufficient
-
-            ### 0.5. Context Reset Rule (Memory Safety)
-            
-            **A. Detect Ticker Change (Mandatory)**
-            - **IF** the user asks about a NEW company (e.g., switched from AAPL to NVDA),
-            - **THEN** you MUST DISCARD all financial data/numbers from the previous conversation history.
-            - Treat it as a fresh start. Do NOT mix data from Company A with Company B.
-            
-            **B. Self-Verification Protocol (Before Every Answer)**
-            - Before finalizing your answer, ask yourself:
-              1. **"What ticker am I answering about?"** (Confirm from latest tool call)
-              2. **"Is the Revenue/EPS I'm about to state consistent with this ticker?"**
-              3. **"Did I accidentally use data from a previous company?"**
-            
-            - **Example Verification**:
-              - Current Ticker: NVDA
-              - I'm about to say: "Revenue is $102B"
-              - **STOP!** NVDA revenue is ~$60B. $102B is AAPL data.
-              - **Action**: Fetch fresh data with `fetch_company_income_statement("NVDA")`
-            
-            - **Red Flags (Hallucination Indicators)**:
-              - Revenue number seems wrong for the company size
-              - Mixing quarterly/annual figures
-              - Using data from conversation history without fresh tool call
-            
-            **C. Enforcement**
-            - If you detect ANY inconsistency, **STOP immediately** and call the appropriate tool again.
-            - NEVER proceed with suspicious data. Better to fetch twice than hallucinate once.
-            """
-        }
-    ]
+    collected_widgets = [] # [NEW] 위젯 수집 리스트 (Type + Ticker 기준 중복 제거)
+    seen_widget_keys = set()
+
+    # 질문 의도에 맞춰 system 프롬프트/도구 스키마 조립 (공통 접두부는 고정)
+    previous_user_message = next((msg.content for msg in db_history if msg.role == "user"), None)
+    prompt_plan = build_prompt_plan(user_message, previous_user_message)
+    messages = list(prompt_plan.system_messages)
     
     # [활성화] 이전 대화 기록을 메시지에 추가 (Smart Memory)
     # 최신순으로 로드되므로 reversed로 뒤집어서 (과거 -> 최신) 순서 확보
     for msg in reversed(db_history):
         messages.append({"role": msg.role, "content": msg.content})
+
+    # 로컬 라우터: 티커를 미리 확정하고, 모델이 곧 요청할 도구를 첫 LLM 호출과 겹쳐 실행
+    route = route_question(user_message, db)
+
+    # 같은 의도/티커/기간 + 같은 데이터 버전의 답변이 있으면 LLM/도구 없이 바로 반환
+    cached_answer = get_cached_answer(db, route, user_message, use_cache)
+    if cached_answer:
+        print("[MCP Agent] 답변 캐시 적중 → LLM/도구 호출 생략")
+        try:
+            db.add(models.ChatHistory(user_id=current_user.id, role="user", content=user_message))
+            db.add(models.ChatHistory(user_id=current_user.id, role="assistant", content=cached_answer["content"]))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"AI 에이전트 서비스 에러 발생: {e}")
+            raise e
+        for widget in cached_answer["widgets"]:
+            yield {"type": "widget", "widget": widget}
+        yield {"type": "token", "content": cached_answer["content"]}
+        yield {"type": "done", "content": cached_answer["content"], "widgets": cached_answer["widgets"], "cached": True}
+        return
+
+    ticker_hint = route.ticker_hint()
+    if ticker_hint:
+        messages.append(ticker_hint)
     messages.append({"role": "user", "content": user_message})
+    prefetch = SpeculativePrefetch()
+    if INTENT_ROUTER_PREFETCH and route.calls:
+        prefetch.start(route.calls, httpx_client=httpx_client, current_user=current_user)
 
     try:
         # --- 2. DB에 "사용자 질문" 먼저 저장 ---
@@ -511,27 +229,83 @@ async def run_mcp_agent(
         # --- [NEW] Multi-Turn ReAct Loop ---
         MAX_TURNS = 3
         turn_count = 0
+        token_budget = ToolOutputBudget()  # 이번 요청에서 도구 결과가 차지할 수 있는 토큰 총량
         ai_response_content = ""
+        answer_cacheable = use_cache  # 도구 에러나 Fail-safe 답변은 캐시하지 않음
+        resolved_aliases: set = set()  # 학습 별칭으로 찾은 기업 (답변이 정상 완료되면 수락으로 기록)
+        used_fail_safe = False
+
+        mode = agent_mode or AGENT_MODE
+        plan = None
+        if mode == "plan":
+            try:
+                plan = await create_plan(
+                    user_message,
+                    history=[{"role": msg.role, "content": msg.content} for msg in reversed(db_history)],
+                    tools=prompt_plan.tools,
+                    hint=ticker_hint["content"] if ticker_hint else None,
+                )
+            except Exception as e:  # 계획 JSON 오류(PlanError)나 계획 호출 실패 모두 ReAct로 대체
+                print(f"[MCP Agent] 계획 실패, ReAct 모드로 대체: {e}")
+
+        if plan is not None:
+            # --- Plan-then-execute: DAG 병렬 실행 후 종합 호출 1회 ---
+            yield {"type": "plan", "steps": plan.describe()}
+            plan_outcomes: Dict[str, ToolOutcome] = {}
+            plan_args: Dict[str, Dict[str, Any]] = {}
+            async for kind, step, payload in execute_plan(
+                plan,
+                httpx_client=httpx_client,
+                current_user=current_user,
+                prefetch=prefetch,
+            ):
+                if kind == "start":
+                    plan_args[step.id] = payload
+                    yield {
+                        "type": "tool_start",
+                        "tool": step.tool,
+                        "tool_call_id": f"plan_{step.id}",
+                        "arguments": json.dumps(payload, ensure_ascii=False, default=str),
+                    }
+                    continue
+                plan_outcomes[step.id] = payload
+                resolved_aliases.update(learned_alias_keys(payload.response))
+                for event in _tool_finish_events(payload, seen_widget_keys, collected_widgets):
+                    if event["type"] == "tool_finish" and event["error"]:
+                        answer_cacheable = False
+                    yield event
+
+            if plan_outcomes:
+                assistant_message, ordered = plan_messages(plan, plan_outcomes, plan_args)
+                messages.append(assistant_message)
+                for outcome in ordered:
+                    messages.append(outcome.to_message(token_budget, calls_in_turn=len(ordered)))
+
+            prompt_plan.llm_calls += 1
+            async for kind, payload in _stream_llm_turn(
+                messages, label="Synthesis", tool_choice="none", tools=prompt_plan.tools
+            ):
+                if kind == "token":
+                    yield {"type": "token", "content": payload}
+                else:
+                    ai_response_content = payload["content"]
+            turn_count = MAX_TURNS  # ReAct 루프는 건너뜀
 
         while turn_count < MAX_TURNS:
             turn_count += 1
             print(f"[MCP Agent] Turn {turn_count}/{MAX_TURNS} 시작...")
 
-            # AI 호출 (항상 tools 제공)
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                tools=tools_schema,
-                tool_choice="auto" 
-            )
-            
-            response_message = response.choices[0].message
-            tool_calls = response_message.tool_calls
-            
-            # [토큰 사용량 로깅]
-            if hasattr(response, 'usage') and response.usage:
-                usage = response.usage
-                print(f"[Token Usage] Turn {turn_count} - Prompt: {usage.prompt_tokens}, Completion: {usage.completion_tokens}, Total: {usage.total_tokens}")
+            # AI 호출 (항상 tools 제공, 스트리밍 - 도구 호출이 없는 턴의 텍스트만 답변 토큰으로 전달)
+            response_message = None
+            prompt_plan.llm_calls += 1
+            async for kind, payload in _stream_llm_turn(
+                messages, label=f"Turn {turn_count}", tool_choice="auto", tools=prompt_plan.tools
+            ):
+                if kind == "token":
+                    yield {"type": "token", "content": payload}
+                else:
+                    response_message = payload
+            tool_calls = response_message["tool_calls"]
 
             # Case A: AI가 도구를 호출함
             if tool_calls:
@@ -540,7 +314,7 @@ async def run_mcp_agent(
                 # [FIX B] 안전한 직렬화: response_message 객체를 dict로 변환
                 messages.append({
                     "role": "assistant",
-                    "content": response_message.content,
+                    "content": response_message["content"] or None,
                     "tool_calls": [
                         {
                             "id": tc.id,
@@ -553,51 +327,32 @@ async def run_mcp_agent(
                     ]
                 })
 
-                for tool_call in tool_calls:
-                    function_name = tool_call.function.name
-                    # ... [Tool Execution Logic - Same as before] ...
-                    function_to_call = available_tools.get(function_name)
-                    raw_arguments = tool_call.function.arguments or "{}"
-                    try: function_args = json.loads(raw_arguments)
-                    except: function_args = {}
-                    if not isinstance(function_args, dict): function_args = {}
-
-                    # Inject Dependencies
-                    if function_to_call:
-                        signature = inspect.signature(function_to_call)
-                        for param_name in signature.parameters.keys():
-                            if param_name == "db": function_args.setdefault("db", db)
-                            elif param_name in {"client", "httpx_client"}: function_args.setdefault(param_name, httpx_client)
-                            elif param_name in {"user_id", "current_user_id"}: function_args.setdefault(param_name, current_user.id)
-                            elif param_name == "current_user": function_args.setdefault("current_user", current_user)
-                        
-                        # Execute
-                        print(f"--- [DEBUG] Executing {function_name} ---")
-                        try:
-                            if inspect.iscoroutinefunction(function_to_call):
-                                function_response = await function_to_call(**function_args)
-                            else:
-                                function_response = function_to_call(**function_args)
-                            
-                            # Clean Response
-                            if hasattr(function_response, "dict"): function_response = function_response.dict()
-                            
-                            # Widget Collection
-                            if isinstance(function_response, dict) and "widgets" in function_response:
-                                collected_widgets.extend(function_response["widgets"])
-
-                        except Exception as e:
-                            function_response = {"error": str(e)}
-                            print(f"[Tool Error] {e}")
-
-                        tool_response_json = json.dumps(function_response, default=str, ensure_ascii=False)
-                        
-                        messages.append({
-                            "tool_call_id": tool_call.id,
-                            "role": "tool",
-                            "name": function_name,
-                            "content": tool_response_json
-                        })
+                for tc in tool_calls:
+                    yield {
+                        "type": "tool_start",
+                        "tool": tc.function.name,
+                        "tool_call_id": tc.id,
+                        "arguments": tc.function.arguments,
+                    }
+
+                # 독립적인 도구들을 동시에 실행하고, 끝나는 순서대로 이벤트 전송
+                outcomes = [None] * len(tool_calls)
+                async for index, outcome in iter_tool_calls(
+                    tool_calls,
+                    httpx_client=httpx_client,
+                    current_user=current_user,
+                    prefetch=prefetch,
+                ):
+                    outcomes[index] = outcome
+                    resolved_aliases.update(learned_alias_keys(outcome.response))
+                    for event in _tool_finish_events(outcome, seen_widget_keys, collected_widgets):
+                        if event["type"] == "tool_finish" and event["error"]:
+                            answer_cacheable = False
+                        yield event
+
+                # tool 메시지는 원래 tool_call 순서대로 추가 (LLM용 projection만 예산 내로 압축)
+                for outcome in outcomes:
+                    messages.append(outcome.to_message(token_budget, calls_in_turn=len(outcomes)))
                 
                 # Loop continues to next turn to let AI process the tool result
                 continue
@@ -605,27 +360,24 @@ async def run_mcp_agent(
             # Case B: AI가 도구 없이 답변함 (종료 조건)
             else:
                 # [FIX A] 루프 안에서 ai_response_content 확정
-                ai_response_content = response_message.content
+                ai_response_content = response_message["content"]
                 print("[MCP Agent] AI가 최종 답변을 생성했습니다.")
                 break
         
         # [FIX C] Fail-safe: MAX_TURNS 도달 시 강제 답변 생성
         if not ai_response_content:
             print("[MCP Agent] ⚠️ MAX_TURNS 도달, 강제 답변 생성 중...")
-            fail_safe_response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                tools=tools_schema,
-                tool_choice="none"  # 도구 호출 금지, 답변만 생성
-            )
-            ai_response_content = fail_safe_response.choices[0].message.content
+            answer_cacheable = False
+            used_fail_safe = True
+            prompt_plan.llm_calls += 1
+            async for kind, payload in _stream_llm_turn(
+                messages, label="Fail-safe", tool_choice="none", tools=prompt_plan.tools
+            ):  # 도구 호출 금지, 답변만 생성
+                if kind == "token":
+                    yield {"type": "token", "content": payload}
+                else:
+                    ai_response_content = payload["content"]
             print(f"[MCP Agent] Fail-safe 답변 생성 완료: {len(ai_response_content)} chars")
-        
-        
-        # 6. 최종 응답 저장 (DB)
-            if hasattr(response, 'usage') and response.usage:
-                usage = response.usage
-                print(f"[Token Usage] 단순 답변 - Prompt: {usage.prompt_tokens}, Completion: {usage.completion_tokens}, Total: {usage.total_tokens}")
 
         # --- 7. DB에 "AI 답변" 저장 ---
         db_ai_message = models.ChatHistory(
@@ -634,40 +386,30 @@ async def run_mcp_agent(
             content=ai_response_content
         )
         db.add(db_ai_message)
+        if answer_cacheable:
+            store_answer(db, route, user_message, ai_response_content, collected_widgets)
+        promoted_aliases = 0
+        if resolved_aliases and not used_fail_safe:
+            promoted_aliases = accept_learned_aliases(db, resolved_aliases)
 
         db.commit() # 질문+답변을 한 번에 커밋
-        print(f"[MCP Agent] 처리 완료 (답변 길이: {len(ai_response_content)} chars)\")")
-
-        # [NEW] 위젯 중복 제거 (Type + Ticker 기준, 조건부 실행)
-        unique_widgets = collected_widgets
-        
-        # 위젯이 2개 이상일 때만 중복 체크 (성능 최적화)
-        if len(collected_widgets) > 1:
-            unique_widgets = []
-            seen = set()
-            for w in collected_widgets:
-                # 위젯을 식별할 수 있는 키 생성 (type + ticker)
-                # ticker가 없으면 title 사용 (fallback)
-                ticker = w.get('ticker', '')
-                title = w.get('title', '')
-                key = f"{w.get('type')}_{ticker or title}"
-                
-                if key not in seen:
-                    seen.add(key)
-                    unique_widgets.append(w)
-            
-            # 실제로 중복이 제거되었을 때만 로그 출력
-            if len(unique_widgets) < len(collected_widgets):
-                print(f"[MCP Agent] ✂️ 위젯 중복 제거: {len(collected_widgets)} → {len(unique_widgets)}")
-
-        # [NEW] 텍스트 답변과 위젯 리스트를 함께 반환 (딕셔너리 형태)
-        return {
+        if promoted_aliases:
+            invalidate_alias_index()
+        print(f"[MCP Agent] 처리 완료 (답변 길이: {len(ai_response_content)} chars)")
+        print(prompt_plan.report())
+
+        # [NEW] 텍스트 답변과 (중복 제거된) 위젯 리스트를 함께 전달
+        yield {
+            "type": "done",
             "content": ai_response_content,
-            "widgets": unique_widgets  # collected_widgets 대신 unique_widgets 사용
+            "widgets": collected_widgets,
+            "cached": False,
         }
 
 
     except Exception as e:
         db.rollback() 
         print(f"AI 에이전트 서비스 에러 발생: {e}")
-        raise e # 에러를 다시 발생시켜 router가 처리하도록 함
\ No newline at end of file
+        raise e # 에러를 다시 발생시켜 router가 처리하도록 함
+    finally:
+        prefetch.close()
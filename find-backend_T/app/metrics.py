@@ -0,0 +1,444 @@
+# app/metrics.py
+# Prometheus 텍스트 형식(0.0.4)으로 내보내는 프로세스 내 지표 레지스트리입니다.
+#
+# 운영 정보가 print 로그([Cache HIT], [Token Usage] ...)에만 있어 집계할 수 없었습니다.
+#   - Counter / Histogram: 라벨별 값을 메모리에 누적 (스레드풀에서 호출돼도 안전하도록 lock 사용)
+#   - collector: 다른 모듈이 이미 가진 통계(캐시 적중, 커넥션 풀 상태 등)를 /metrics 조회 시점에 변환
+#   - MetricsMiddleware: 라우트 템플릿별 HTTP 처리 시간 (스트리밍 응답은 마지막 청크 전송까지)
+#   - InstrumentedTransport: 외부 API(FMP, Twelve Data) 호출 지연시간/상태 코드
+#   - TimedQueuePool: DB 커넥션 체크아웃 대기 시간
+#   - add_request_time: 프로파일링 중인 요청에서만 외부 API/LLM/도구 시간을 요청별로 합산
+# 프로세스(워커)별 값이므로 여러 워커로 실행하면 워커마다 수집해야 합니다.
+# 이 모듈은 app 내부 모듈을 import하지 않습니다 (database 등에서 import하므로 순환 방지).
+
+from __future__ import annotations
+
+import contextvars
+import math
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+# collector가 반환하는 지표: (이름, 타입, 설명, [(라벨 dict, 값)])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: Any) -> Any:
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name}: 라벨 {self.labelnames} 값이 필요합니다 (받은 값 {values})")
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def _label_dict(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self._label_dict(key))} {_format_value(child.value)}"
+            for key, child in sorted(self._children.items())
+        ]
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for index, upper in enumerate(self.buckets):
+                if value <= upper:
+                    self.counts[index] += 1
+                    break
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, child in sorted(self._children.items()):
+            labels = self._label_dict(key)
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for upper, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels({**labels, "le": _format_value(upper)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"이미 등록된 지표입니다: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                # 통계 하나가 실패해도 나머지 지표는 내보냄
+                print(f"[Metrics] collector 실패 ({getattr(collector, '__name__', collector)}): {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = LATENCY_BUCKETS,
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def register_collector(collector: Callable[[], Iterable[Family]]) -> None:
+    """/metrics 조회 시점에 호출되어 (이름, 타입, 설명, 샘플) 목록을 반환하는 함수를 등록합니다."""
+    REGISTRY.register_collector(collector)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+# --- 지표 정의 ---
+
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds",
+    "HTTP 요청 처리 시간 (라우트 템플릿별, 스트리밍은 마지막 청크까지)",
+    ["method", "route", "status"],
+)
+MCP_TOOL_SECONDS = histogram(
+    "mcp_tool_duration_seconds",
+    "MCP 도구 실행 시간",
+    ["tool", "status"],
+)
+MCP_PREFETCH_HITS = counter(
+    "mcp_prefetch_hits_total",
+    "선실행(SpeculativePrefetch) 결과를 재사용한 도구 호출 수",
+    ["tool"],
+)
+UPSTREAM_SECONDS = histogram(
+    "upstream_request_duration_seconds",
+    "외부 API 호출 시간 (응답 헤더 수신까지)",
+    ["upstream", "endpoint", "status"],
+)
+LLM_REQUEST_SECONDS = histogram(
+    "llm_request_duration_seconds",
+    "LLM 호출 시간 (스트리밍은 마지막 청크까지)",
+    ["call", "model"],
+)
+LLM_FIRST_TOKEN_SECONDS = histogram(
+    "llm_time_to_first_chunk_seconds",
+    "스트리밍 LLM 호출의 첫 청크까지 시간",
+    ["call", "model"],
+)
+LLM_TOKENS = histogram(
+    "llm_tokens_per_call",
+    "LLM 호출(턴)당 토큰 수",
+    ["call", "model", "kind"],
+    buckets=TOKEN_BUCKETS,
+)
+DB_POOL_WAIT_SECONDS = histogram(
+    "db_pool_checkout_wait_seconds",
+    "DB 커넥션 풀에서 커넥션을 얻기까지 대기 시간 (새 커넥션 생성 포함)",
+    ["engine"],
+    buckets=POOL_WAIT_BUCKETS,
+)
+
+
+# --- 요청 단위 시간 분해 (app/profiler.py가 켠 요청에서만 수집) ---
+
+_request_times: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_times", default=None
+)
+
+
+def start_request_times() -> Tuple[Dict[str, float], contextvars.Token]:
+    totals: Dict[str, float] = {}
+    return totals, _request_times.set(totals)
+
+
+def stop_request_times(token: contextvars.Token) -> None:
+    _request_times.reset(token)
+
+
+def add_request_time(category: str, seconds: float) -> None:
+    """현재 요청이 프로파일링 중이면 category별 시간을 더합니다. (아니면 아무것도 하지 않음)"""
+    totals = _request_times.get()
+    if totals is not None:
+        totals[category] = totals.get(category, 0.0) + seconds
+
+
+# --- HTTP 미들웨어 ---
+
+class MetricsMiddleware:
+    """
+    라우트 템플릿(/api/v1/company/quote/{ticker}) 단위로 처리 시간을 기록하는 ASGI 미들웨어.
+    BaseHTTPMiddleware와 달리 응답 본문을 감싸지 않으므로 SSE 스트리밍에 영향이 없습니다.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+        recorded = False
+
+        def record() -> None:
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            # 라우팅 후 FastAPI가 scope["route"]를 채움 (매칭 실패 시 경로 대신 고정값 → 라벨 폭증 방지)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, status["code"]).observe(
+                time.perf_counter() - started
+            )
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # 예외 또는 클라이언트 연결 종료로 본문이 끝나지 않은 경우
+            record()
+
+
+# --- 외부 API 호출 ---
+
+_UPSTREAM_NAMES = {
+    "financialmodelingprep.com": "fmp",
+    "api.twelvedata.com": "twelvedata",
+}
+_LOWER_SEGMENT = re.compile(r"^[a-z0-9_\-]+$")
+
+
+def _endpoint_label(url: httpx.URL) -> Tuple[str, str]:
+    """(upstream, endpoint). 경로의 티커/ID 부분은 자리표시자로 바꿔 라벨 수를 제한합니다."""
+    upstream = _UPSTREAM_NAMES.get(url.host, url.host)
+    segments = []
+    for segment in url.path.split("/"):
+        if not segment:
+            continue
+        if segment.isdigit():
+            segments.append("{id}")
+        elif not _LOWER_SEGMENT.match(segment):
+            # FMP 엔드포인트 이름은 소문자, 티커는 대문자 (AAPL, BRK-B, 005930.KS)
+            segments.append("{symbol}")
+        else:
+            segments.append(segment)
+    return upstream, "/" + "/".join(segments)
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """httpx 전송 계층을 감싸 호출별 지연시간과 상태 코드(실패 시 예외 이름)를 기록합니다."""
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        upstream, endpoint = _endpoint_label(request.url)
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await self._transport.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        except Exception as exc:
+            status = type(exc).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            UPSTREAM_SECONDS.labels(upstream, endpoint, status).observe(elapsed)
+            add_request_time(f"upstream:{upstream}", elapsed)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+# --- LLM ---
+
+_TURN_LABEL = re.compile(r"\s*\d+$")
+
+
+def llm_call_label(label: str) -> str:
+    """'Turn 3' → 'Turn' (턴 번호마다 라벨이 생기지 않도록)."""
+    return _TURN_LABEL.sub("", label) or label
+
+
+def observe_llm_usage(label: str, model: str, usage: Any) -> None:
+    if not usage:
+        return
+    call = llm_call_label(label)
+    LLM_TOKENS.labels(call, model, "prompt").observe(usage.prompt_tokens or 0)
+    LLM_TOKENS.labels(call, model, "completion").observe(usage.completion_tokens or 0)
+
+
+# --- DB 커넥션 풀 ---
+
+class TimedQueuePool(QueuePool):
+    """QueuePool + 체크아웃 대기 시간 기록 (동기 엔진)."""
+
+    metrics_label = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.labels(self.metrics_label).observe(time.perf_counter() - started)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool + 체크아웃 대기 시간 기록 (비동기 엔진)."""
+
+    metrics_label = "async"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.labels(self.metrics_label).observe(time.perf_counter() - started)
+
+
+def pool_status_family(pools: Dict[str, QueuePool]) -> List[Family]:
+    """engine 라벨별 풀 크기/사용 중/오버플로 게이지."""
+    return [
+        ("db_pool_size", "gauge", "DB 커넥션 풀 크기",
+         [({"engine": name}, pool.size()) for name, pool in pools.items()]),
+        ("db_pool_checked_out", "gauge", "사용 중인 DB 커넥션 수",
+         [({"engine": name}, pool.checkedout()) for name, pool in pools.items()]),
+        ("db_pool_overflow", "gauge", "풀 크기를 넘어 생성된 커넥션 수 (음수면 여유)",
+         [({"engine": name}, pool.overflow()) for name, pool in pools.items()]),
+    ]
@@ -2,7 +2,8 @@
 
 from sqlalchemy import (
     Column, Integer, String, TIMESTAMP, TEXT, ForeignKey, 
-    DECIMAL, BIGINT, JSON, Date, UniqueConstraint, DateTime
+    DECIMAL, BIGINT, JSON, Date, UniqueConstraint, DateTime, Index, LargeBinary,
+    Boolean, Float
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -39,6 +40,12 @@ class ChatHistory(Base):
 
     owner = relationship("User", back_populates="chat_history")
 
+    # 사용자별 최신순 조회 / 키셋 페이지네이션 (WHERE user_id = ? ORDER BY created_at DESC, id DESC)
+    # id까지 포함해 같은 초에 저장된 질문/답변도 인덱스 순서만으로 정렬됨
+    __table_args__ = (
+        Index('ix_chat_history_user_created', 'user_id', 'created_at', 'id'),
+    )
+
 # --- 3. FMP 기업 정보 ---
 class CompanyProfile(Base):
     __tablename__ = "company_profiles"
@@ -181,6 +188,24 @@ class CompanyKeyMetrics(Base):
         UniqueConstraint('ticker', 'period', 'report_date', name='_ckm_ticker_period_date_uc'),
     )
 
+
+# --- 7-1. 파생 지표 (Key Metrics 응답 사전 계산본) ---
+# 평균(avg_pe/avg_pbr/avg_de), YoY 변화율, 밸류에이션 위젯까지 계산된 최종 응답을
+# (ticker, period, row_limit) 단위로 저장합니다. key_metrics 갱신 시 무효화됩니다.
+class CompanyDerivedMetrics(Base):
+    __tablename__ = "company_derived_metrics"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    ticker = Column(String(20), ForeignKey("company_profiles.ticker"), nullable=False)
+    period = Column(String(20), nullable=False, default="annual")
+    row_limit = Column(Integer, nullable=False)
+    payload = Column(JSON, nullable=False)
+    computed_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('ticker', 'period', 'row_limit', name='_cdm_ticker_period_limit_uc'),
+    )
+
 # --- 5. 뉴스 (AI 사전 요약) ---
 class NewsArticle(Base):
     __tablename__ = "news_articles"
@@ -192,6 +217,25 @@ class NewsArticle(Base):
     symbols = Column(TEXT)
     summary = Column(TEXT) # FMP가 제공한 요약본
 
+    symbol_links = relationship("NewsArticleSymbol", back_populates="article", cascade="all, delete-orphan")
+
+
+# --- 5-1. 뉴스 ↔ 종목 매핑 (심볼별 역색인) ---
+# symbols TEXT 컬럼의 LIKE '%TICKER%' 풀스캔(및 "MS" → "MSFT" 오탐)을 대체합니다.
+# (symbol, publishedDate) 인덱스로 정확 일치 + 최신순 정렬을 인덱스만으로 처리합니다.
+class NewsArticleSymbol(Base):
+    __tablename__ = "news_article_symbols"
+
+    article_id = Column(Integer, ForeignKey("news_articles.id", ondelete="CASCADE"), primary_key=True)
+    symbol = Column(String(20), primary_key=True)
+    publishedDate = Column(TIMESTAMP, nullable=False)  # 정렬용 비정규화 컬럼
+
+    article = relationship("NewsArticle", back_populates="symbol_links")
+
+    __table_args__ = (
+        Index('ix_news_symbol_published', 'symbol', 'publishedDate'),
+    )
+
 # --- 6. Twelve Data 차트/지수 ---
 class MarketTimeSeries(Base):
     __tablename__ = "market_time_series"
@@ -285,4 +329,71 @@ class InsiderTrade(Base):
 
     __table_args__ = (
         UniqueConstraint('ticker', 'transaction_date', 'insider_name', 'transaction_type', 'volume', name='_insider_uc'),
-    )
\ No newline at end of file
+    )
+# --- 11. 원천 데이터 버전 (답변 캐시 무효화용) ---
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    ticker = Column(String(20), primary_key=True)  # 뉴스 심볼은 company_profiles에 없을 수 있어 FK 없음
+    dataset = Column(String(40), primary_key=True)  # key_metrics, cash_flows, earnings_calendar, news ...
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, nullable=False)
+
+# --- 12. 실적발표 컨퍼런스 콜 전문 (압축 저장) ---
+class EarningsCallTranscript(Base):
+    __tablename__ = "earnings_call_transcripts"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    ticker = Column(String(20), nullable=False)
+    year = Column(Integer, nullable=False)
+    quarter = Column(Integer, nullable=False)
+    date = Column(DateTime)
+    content_zlib = Column(LargeBinary(length=16777215), nullable=False)  # zlib 압축 전문 (MEDIUMBLOB)
+    content_length = Column(Integer, nullable=False)  # 압축 전 글자 수
+    fetched_at = Column(DateTime, nullable=False)
+
+    passages = relationship(
+        "EarningsCallPassage",
+        back_populates="transcript",
+        cascade="all, delete-orphan",
+        order_by="EarningsCallPassage.seq",
+    )
+
+    __table_args__ = (
+        UniqueConstraint('ticker', 'year', 'quarter', name='_transcript_ticker_year_quarter_uc'),
+    )
+
+
+# --- 12-1. 컨퍼런스 콜 문단 (발언자/Q&A 단위, BM25 검색용) ---
+# 본문은 전문(content_zlib)의 [char_start, char_end) 구간으로만 저장해 중복 저장하지 않습니다.
+class EarningsCallPassage(Base):
+    __tablename__ = "earnings_call_passages"
+
+    transcript_id = Column(Integer, ForeignKey("earnings_call_transcripts.id", ondelete="CASCADE"), primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    speaker = Column(String(255))
+    section = Column(String(10), nullable=False)  # "prepared" (발표) / "qa" (질의응답)
+    char_start = Column(Integer, nullable=False)
+    char_end = Column(Integer, nullable=False)
+    term_freqs = Column(JSON, nullable=False)  # BM25용 단어 빈도 (저장 시점에 계산)
+    token_count = Column(Integer, nullable=False)
+
+    transcript = relationship("EarningsCallTranscript", back_populates="passages")
+
+
+# --- 13. 학습된 기업명 별칭 (LLM 티커 변환 결과 재사용) ---
+class LearnedAlias(Base):
+    __tablename__ = "learned_aliases"
+
+    query_key = Column(String(255), primary_key=True)  # compact_alias(query_text)
+    query_text = Column(String(255), nullable=False)  # 사용자가 처음 입력한 표현
+    ticker = Column(String(20), nullable=False)
+    confidence = Column(Float, nullable=False)
+    source = Column(String(30), nullable=False)  # "llm_translation" / "llm_ticker"
+    llm_calls = Column(Integer, nullable=False, default=1)  # 처음 변환에 쓴 LLM 호출 수
+    hits = Column(Integer, nullable=False, default=0)  # LLM 대신 재사용된 횟수
+    accepts = Column(Integer, nullable=False, default=0)  # 이어진 분석이 정상 완료된 횟수
+    llm_calls_saved = Column(Integer, nullable=False, default=0)
+    promoted = Column(Boolean, nullable=False, default=False)  # 메모리 별칭 인덱스 포함 여부
+    created_at = Column(DateTime, nullable=False)
+    last_used_at = Column(DateTime, nullable=False)
@@ -0,0 +1,115 @@
+# app/password_hasher.py
+# 비밀번호 해싱/검증 전용 프로세스 풀입니다.
+#
+# bcrypt_sha256은 의도적으로 CPU를 많이 쓰는 연산입니다. 기존에는 sync 엔드포인트
+# (signup/login) 안에서 실행되어 FastAPI 공용 스레드풀(AnyIO)을 점유했고,
+# 로그인이 몰리면 같은 스레드풀을 쓰는 get_db / get_current_user 등 다른 요청까지 밀렸습니다.
+#   - 해싱은 별도 크기(PASSWORD_HASH_WORKERS)의 ProcessPoolExecutor에서 실행 (GIL 회피)
+#   - 동시에 풀에 넣는 작업 수를 제한하고 (PASSWORD_HASH_MAX_PENDING), 나머지는 이벤트 루프에서 대기
+#   - 대기/실행 중 개수와 대기 시간을 통계로 제공
+
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app import security
+from app.config import PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_WORKERS
+from app.metrics import register_collector
+
+_executor: Optional[ProcessPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+_stats = {
+    "submitted": 0,
+    "completed": 0,
+    "failed": 0,
+    "waiting": 0,  # 풀 자리를 기다리는 요청 수 (큐 깊이)
+    "running": 0,  # 풀에 들어가 있는 작업 수
+    "max_waiting": 0,
+    "total_wait_ms": 0.0,
+    "total_run_ms": 0.0,
+}
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor, _slots
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        _slots = asyncio.Semaphore(PASSWORD_HASH_MAX_PENDING)
+        print(f"[Password Hasher] 프로세스 풀 시작 (workers={PASSWORD_HASH_WORKERS})")
+    return _executor
+
+
+async def _run(function: Callable[..., Any], *args: Any) -> Any:
+    executor = _get_executor()
+    _stats["submitted"] += 1
+    _stats["waiting"] += 1
+    _stats["max_waiting"] = max(_stats["max_waiting"], _stats["waiting"])
+    queued_at = time.perf_counter()
+    acquired = False
+    try:
+        async with _slots:
+            acquired = True
+            _stats["waiting"] -= 1
+            started_at = time.perf_counter()
+            _stats["total_wait_ms"] += (started_at - queued_at) * 1000
+            _stats["running"] += 1
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+            except Exception:
+                _stats["failed"] += 1
+                raise
+            finally:
+                _stats["running"] -= 1
+                _stats["total_run_ms"] += (time.perf_counter() - started_at) * 1000
+    finally:
+        if not acquired:
+            # 자리를 얻기 전에 요청이 끊긴 경우
+            _stats["waiting"] -= 1
+    _stats["completed"] += 1
+    return result
+
+
+async def hash_password(password: str) -> str:
+    """security.get_password_hash를 전용 프로세스 풀에서 실행합니다."""
+    return await _run(security.get_password_hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """security.verify_password를 전용 프로세스 풀에서 실행합니다."""
+    return await _run(security.verify_password, plain_password, hashed_password)
+
+
+def shutdown_password_hasher() -> None:
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        _slots = None
+
+
+def password_hasher_stats() -> Dict[str, Any]:
+    done = _stats["completed"] + _stats["failed"]
+    return {
+        **{key: round(value, 1) if isinstance(value, float) else value for key, value in _stats.items()},
+        "workers": PASSWORD_HASH_WORKERS,
+        "max_pending": PASSWORD_HASH_MAX_PENDING,
+        "avg_wait_ms": round(_stats["total_wait_ms"] / done, 1) if done else None,
+        "avg_run_ms": round(_stats["total_run_ms"] / done, 1) if done else None,
+    }
+
+
+def _collect_hasher_metrics():
+    yield ("password_hash_waiting", "gauge", "해싱 풀 자리를 기다리는 요청 수 (큐 깊이)", [({}, _stats["waiting"])])
+    yield ("password_hash_running", "gauge", "해싱 풀에서 실행 중인 작업 수", [({}, _stats["running"])])
+    yield ("password_hash_jobs_total", "counter", "해싱/검증 작업 수", [
+        ({"result": "completed"}, _stats["completed"]),
+        ({"result": "failed"}, _stats["failed"]),
+    ])
+    yield ("password_hash_wait_seconds_total", "counter", "해싱 풀 자리 대기 시간 합계",
+           [({}, _stats["total_wait_ms"] / 1000)])
+
+
+register_collector(_collect_hasher_metrics)
@@ -0,0 +1,87 @@
+# app/principal_cache.py
+# 인증된 사용자(principal) 조회 캐시입니다.
+#
+# get_current_user는 요청마다 JWT 해독 후 users 테이블을 조회했습니다.
+# 토큰의 (sub, exp)를 키로 User 컬럼 값을 짧게(PRINCIPAL_CACHE_TTL_SECONDS) 보관하고,
+# 캐시 적중 시에는 요청 세션에 SELECT 없이 붙입니다 (Session.merge(load=False)).
+#   - 토큰 만료 시각을 넘겨서는 보관하지 않음
+#   - User가 ORM으로 수정/삭제되면(after_update / after_delete) 해당 사용자의 항목을 즉시 제거
+#   - 프로세스별 캐시이므로 다른 워커의 수정은 TTL 안에서만 늦게 반영됨
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app import models
+from app.cache import LRUTTLCache
+from app.config import PRINCIPAL_CACHE_MAXSIZE, PRINCIPAL_CACHE_TTL_SECONDS
+
+_cache = LRUTTLCache(PRINCIPAL_CACHE_MAXSIZE)
+_keys_by_user: Dict[int, Set[str]] = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+_COLUMNS = [column.key for column in models.User.__table__.columns]
+
+
+def _cache_key(subject: str, expires_at: Optional[int]) -> str:
+    return f"{subject}|{expires_at}"
+
+
+def get_cached_principal(db: Session, subject: str, expires_at: Optional[int]) -> Optional[models.User]:
+    """캐시된 사용자를 요청 세션에 (DB 조회 없이) 붙여 반환합니다. 없으면 None."""
+    hit, snapshot = _cache.get(_cache_key(subject, expires_at))
+    if not hit:
+        _stats["misses"] += 1
+        return None
+    _stats["hits"] += 1
+    user = models.User(**snapshot)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+def cache_principal(user: models.User, subject: str, expires_at: Optional[int]) -> None:
+    """DB에서 조회한 사용자를 보관합니다. 토큰 만료 시각 이후로는 보관하지 않습니다."""
+    ttl = PRINCIPAL_CACHE_TTL_SECONDS
+    if expires_at is not None:
+        ttl = min(ttl, expires_at - time.time())
+    if ttl <= 0:
+        return
+    key = _cache_key(subject, expires_at)
+    _cache.set(key, {name: getattr(user, name) for name in _COLUMNS}, ttl)
+    with _lock:
+        # 만료/축출된 이전 토큰 키는 정리
+        keys = {k for k in _keys_by_user.get(user.id, ()) if _cache.get(k)[0]}
+        keys.add(key)
+        _keys_by_user[user.id] = keys
+
+
+def invalidate_principal(user_id: int) -> None:
+    """사용자의 모든 토큰에 대한 캐시 항목을 제거합니다."""
+    with _lock:
+        keys = _keys_by_user.pop(user_id, set())
+    for key in keys:
+        _cache.delete(key)
+    if keys:
+        _stats["invalidations"] += 1
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_on_change(mapper, connection, target) -> None:
+    # 아이디/이메일/비밀번호 변경이나 탈퇴가 다음 요청부터 바로 반영되도록
+    invalidate_principal(target.id)
+
+
+def principal_cache_stats() -> Dict[str, Any]:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "size": len(_cache),
+        "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else None,
+    }
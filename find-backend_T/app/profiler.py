@@ -0,0 +1,280 @@
+# app/profiler.py
+# 관리자가 요청한 단일 요청만 프로파일링하는 옵트인 프로파일러입니다.
+#
+# 느린 채팅의 시간이 LLM / FMP / MySQL / 파이썬 CPU(key_metrics 계산, 뷰 빌더) 중 어디에 쓰였는지 보기 위해
+#   - 요청에 X-Profile: <PROFILER_ADMIN_TOKEN> 헤더가 있을 때만 동작
+#     (토큰이 접근 로그/프록시 로그/브라우저 기록에 남지 않도록 쿼리 파라미터로는 받지 않음)
+#   - 샘플링 프로파일러: pyinstrument가 설치되어 있으면 사용 (async 인식), 없으면 내장 스택 샘플러
+#     (내장 샘플러는 이벤트 루프 스레드를 샘플링하므로 동시에 처리 중인 다른 요청도 섞일 수 있음)
+#   - X-Profile-Memory: 1 이면 tracemalloc으로 할당 상위 위치도 기록
+#     (tracemalloc은 프로세스 전역이므로 한 번에 한 요청만, 켜진 동안 다른 요청도 느려짐)
+#   - 시간 분해: DB(query_counter) + 외부 API / LLM / 도구(metrics.add_request_time)
+#   - 결과는 요청 ID(X-Profile-Id 응답 헤더)로 워커 메모리에 최근 PROFILER_MAX_STORED개 보관
+# 토큰이 설정되지 않으면 main.py가 미들웨어를 등록하지 않으므로 오버헤드가 없습니다.
+
+from __future__ import annotations
+
+import hmac
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import PROFILER_ADMIN_TOKEN, PROFILER_MAX_STORED, PROFILER_SAMPLE_INTERVAL_MS
+from app.metrics import start_request_times, stop_request_times
+from app.query_counter import current_query_stats
+
+try:
+    from pyinstrument import Profiler as _Pyinstrument
+except ImportError:  # 선택 의존성
+    _Pyinstrument = None
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOP_N = 30
+
+_profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_profiles_lock = threading.Lock()
+_tracemalloc_lock = threading.Lock()
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """PROFILER_ADMIN_TOKEN과 일치하는지 (상수 시간 비교). 토큰이 설정되지 않았으면 항상 False."""
+    if not PROFILER_ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), PROFILER_ADMIN_TOKEN.encode())
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    if path.startswith(_PROJECT_ROOT):
+        path = os.path.relpath(path, _PROJECT_ROOT)
+    else:
+        path = "/".join(path.replace("\\", "/").split("/")[-2:])
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    pyinstrument가 없을 때 쓰는 내장 샘플러.
+    별도 스레드가 interval마다 대상 스레드의 스택을 읽어 'a;b;c' 형식(flamegraph folded)으로 집계합니다.
+    이벤트 루프가 I/O를 기다리는 동안에는 selector 프레임이 잡히므로 대기 시간도 드러납니다.
+    """
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+        self._started = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self._started
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def report(self) -> Dict[str, Any]:
+        inclusive: Counter = Counter()
+        exclusive: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            exclusive[frames[-1]] += count
+            for label in set(frames):
+                inclusive[label] += count
+        # GIL 전환 때문에 실제 샘플 간격은 interval보다 길 수 있어 측정 시간으로 환산
+        ms_per_sample = self.elapsed * 1000 / self.samples if self.samples else 0.0
+
+        def _rows(counter: Counter) -> List[Dict[str, Any]]:
+            return [
+                {"function": label, "samples": n, "approx_ms": round(n * ms_per_sample, 1)}
+                for label, n in counter.most_common(TOP_N)
+            ]
+
+        return {
+            "profiler": "sampling",
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "top_self": _rows(exclusive),
+            "top_total": _rows(inclusive),
+            "folded": [f"{stack} {n}" for stack, n in self.stacks.most_common(200)],
+        }
+
+
+def _memory_report(start_snapshot: tracemalloc.Snapshot) -> Dict[str, Any]:
+    current, peak = tracemalloc.get_traced_memory()
+    stats = tracemalloc.take_snapshot().compare_to(start_snapshot, "lineno")
+    return {
+        "current_kb": round(current / 1024, 1),
+        "peak_kb": round(peak / 1024, 1),
+        "top_allocations": [
+            {
+                "location": f"{stat.traceback[0].filename.replace(_PROJECT_ROOT + os.sep, '')}:{stat.traceback[0].lineno}",
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "count_diff": stat.count_diff,
+            }
+            for stat in stats[:TOP_N]
+        ],
+    }
+
+
+def _store(profile: Dict[str, Any]) -> None:
+    with _profiles_lock:
+        _profiles[profile["id"]] = profile
+        while len(_profiles) > PROFILER_MAX_STORED:
+            _profiles.popitem(last=False)
+
+
+def get_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    with _profiles_lock:
+        return _profiles.get(profile_id)
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """보관 중인 프로파일 요약 (최신순)."""
+    keys = ("id", "method", "path", "route", "status", "started_at", "wall_ms", "profiler")
+    with _profiles_lock:
+        return [{key: profile.get(key) for key in keys} for profile in reversed(_profiles.values())]
+
+
+def _profile_flags(scope: Dict[str, Any]) -> Tuple[Optional[str], bool]:
+    """(토큰, 메모리 프로파일 여부). 헤더로만 받습니다."""
+    token = None
+    memory = False
+    for name, value in scope.get("headers", []):
+        if name == b"x-profile":
+            token = value.decode("latin-1")
+        elif name == b"x-profile-memory":
+            memory = value.decode("latin-1").lower() in {"1", "true"}
+    return token, memory
+
+
+class ProfilerMiddleware:
+    """X-Profile 토큰이 맞는 요청만 프로파일링하고 결과를 X-Profile-Id로 보관합니다."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token, memory = _profile_flags(scope)
+        if token is None:
+            await self.app(scope, receive, send)
+            return
+        if not is_admin_token(token):
+            # 토큰이 틀리면 프로파일링 없이 평소대로 처리 (존재 여부를 드러내지 않음)
+            print("[Profiler] 잘못된 프로파일 토큰 - 무시")
+            await self.app(scope, receive, send)
+            return
+        await self._profile(scope, receive, send, memory)
+
+    async def _profile(self, scope: Dict[str, Any], receive: Any, send: Any, memory: bool) -> None:
+        profile_id = uuid.uuid4().hex[:12]
+        status = {"code": 500}
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        interval = PROFILER_SAMPLE_INTERVAL_MS / 1000
+        pyinstrument = _Pyinstrument(interval=interval, async_mode="enabled") if _Pyinstrument else None
+        sampler = None if pyinstrument else StackSampler(threading.get_ident(), interval)
+
+        memory_snapshot = None
+        owns_tracemalloc = False
+        memory_note = None
+        if memory:
+            if _tracemalloc_lock.acquire(blocking=False):
+                owns_tracemalloc = not tracemalloc.is_tracing()
+                if owns_tracemalloc:
+                    tracemalloc.start(10)
+                tracemalloc.reset_peak()
+                memory_snapshot = tracemalloc.take_snapshot()
+            else:
+                memory_note = "다른 요청이 tracemalloc을 사용 중이라 메모리 프로파일을 생략했습니다."
+
+        query_stats = current_query_stats()
+        db_count_before = query_stats.count if query_stats else 0
+        db_seconds_before = query_stats.seconds if query_stats else 0.0
+        times, times_token = start_request_times()
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        print(f"[Profiler] 시작 {profile_id} {scope['method']} {scope['path']}")
+        if pyinstrument:
+            pyinstrument.start()
+        else:
+            sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if pyinstrument:
+                pyinstrument.stop()
+            else:
+                sampler.stop()
+            wall = time.perf_counter() - started
+            stop_request_times(times_token)
+
+            memory_report = None
+            if memory_snapshot is not None:
+                try:
+                    memory_report = _memory_report(memory_snapshot)
+                finally:
+                    if owns_tracemalloc:
+                        tracemalloc.stop()
+                    _tracemalloc_lock.release()
+
+            breakdown = {f"{category}_ms": round(seconds * 1000, 1) for category, seconds in sorted(times.items())}
+            if query_stats is not None:
+                breakdown["db_ms"] = round((query_stats.seconds - db_seconds_before) * 1000, 1)
+                breakdown["db_queries"] = query_stats.count - db_count_before
+
+            if pyinstrument:
+                report = {
+                    "profiler": "pyinstrument",
+                    "interval_ms": PROFILER_SAMPLE_INTERVAL_MS,
+                    "text": pyinstrument.output_text(unicode=True, color=False),
+                    "html": pyinstrument.output_html(),
+                }
+            else:
+                report = sampler.report()
+
+            _store({
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(scope.get("route"), "path", None),
+                "status": status["code"],
+                "started_at": started_at.isoformat() + "Z",
+                "wall_ms": round(wall * 1000, 1),
+                # 도구는 병렬로 실행되고 LLM/외부 API 시간을 포함하므로 합계가 wall_ms를 넘을 수 있음
+                "breakdown": breakdown,
+                "memory": memory_report or ({"note": memory_note} if memory_note else None),
+                **report,
+            })
+            print(f"[Profiler] 저장 {profile_id} ({wall * 1000:.0f}ms) - {breakdown}")
@@ -0,0 +1,209 @@
+# app/query_counter.py
+# 요청/도구 호출 단위 SQL 쿼리 카운터와 N+1 감지기입니다.
+#
+# 엔진 이벤트(before/after_cursor_execute)로 실행된 모든 쿼리를 현재 범위(scope)에 기록합니다.
+#   - 범위는 contextvar로 전달: 요청(QueryStatsMiddleware) 안에서 도구 호출(executor)이 하위 범위를 열면
+#     도구의 쿼리는 도구 범위와 요청 범위 양쪽에 집계됨 (asyncio task / to_thread / AsyncSession greenlet 모두 전파)
+#   - 쿼리 수, DB 시간 합계, 같은 모양(파라미터 자리와 IN 목록 길이를 무시한 SQL)별 실행 횟수
+#   - 같은 모양이 N_PLUS_ONE_THRESHOLD번 이상이면 N+1 의심으로 로그 + 지표 기록
+#   - 응답 헤더: X-DB-Queries, X-DB-Time-Ms, X-DB-Max-Repeat
+#     (SSE 스트리밍은 헤더 전송 시점까지의 값이며, 전체 값은 로그/지표에 기록)
+# 스크립트나 점검 코드에서는 track_queries(strict=True)로 N+1이 있으면 NPlusOneDetected를 발생시킬 수 있습니다.
+
+from __future__ import annotations
+
+import contextvars
+import re
+import threading
+import time
+from collections import Counter as ShapeCounter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import N_PLUS_ONE_THRESHOLD, QUERY_STATS_LOG
+from app.metrics import counter, histogram
+
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+DB_QUERIES = histogram(
+    "db_queries_per_scope",
+    "요청/도구 호출당 SQL 쿼리 수",
+    ["kind", "name"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_TIME_SECONDS = histogram(
+    "db_time_per_scope_seconds",
+    "요청/도구 호출당 SQL 실행 시간 합계",
+    ["kind", "name"],
+)
+N_PLUS_ONE_SUSPECTS = counter(
+    "db_n_plus_one_suspects_total",
+    "같은 모양의 SQL이 임계값 이상 반복된 요청/도구 호출 수",
+    ["kind", "name"],
+)
+
+_current: contextvars.ContextVar[Optional["QueryStats"]] = contextvars.ContextVar("query_stats", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+# (%s, %s, ...) → (?)  : IN 목록 / VALUES 한 행
+_PLACEHOLDER_GROUP = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+# (?), (?), ... → (?)... : 다중 VALUES
+_REPEATED_GROUPS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+
+
+def statement_shape(statement: str) -> str:
+    """파라미터 개수와 무관하게 같은 쿼리면 같은 문자열이 되도록 정규화합니다."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _PLACEHOLDER_GROUP.sub("(?)", shape)
+    return _REPEATED_GROUPS.sub("(?)...", shape)
+
+
+class NPlusOneDetected(AssertionError):
+    """track_queries(strict=True) 범위에서 N+1 의심 쿼리가 발견됨."""
+
+
+class QueryStats:
+    """한 범위(요청 또는 도구 호출)의 쿼리 통계. 여러 스레드에서 기록될 수 있어 lock을 사용합니다."""
+
+    def __init__(self, kind: str, name: str, parent: Optional["QueryStats"] = None) -> None:
+        self.kind = kind
+        self.name = name
+        self.parent = parent
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: ShapeCounter = ShapeCounter()
+        self._lock = threading.Lock()
+
+    def record(self, shape: str, seconds: float) -> None:
+        scope: Optional[QueryStats] = self
+        while scope is not None:
+            with scope._lock:
+                scope.count += 1
+                scope.seconds += seconds
+                scope.shapes[shape] += 1
+            scope = scope.parent
+
+    @property
+    def max_repeat(self) -> int:
+        with self._lock:
+            return max(self.shapes.values(), default=0)
+
+    def suspects(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[Tuple[str, int]]:
+        """threshold번 이상 반복된 (모양, 횟수) 목록 (많은 순)."""
+        with self._lock:
+            return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+    def headers(self) -> List[Tuple[bytes, bytes]]:
+        return [
+            (b"x-db-queries", str(self.count).encode()),
+            (b"x-db-time-ms", f"{self.seconds * 1000:.1f}".encode()),
+            (b"x-db-max-repeat", str(self.max_repeat).encode()),
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "queries": self.count,
+            "db_ms": round(self.seconds * 1000, 1),
+            "max_repeat": self.max_repeat,
+            "suspects": [{"statement": shape[:200], "count": n} for shape, n in self.suspects()],
+        }
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def _finish(stats: QueryStats, threshold: int) -> List[Tuple[str, int]]:
+    """범위 종료: 지표 기록, N+1 의심이면 로그."""
+    DB_QUERIES.labels(stats.kind, stats.name).observe(stats.count)
+    DB_TIME_SECONDS.labels(stats.kind, stats.name).observe(stats.seconds)
+    suspects = stats.suspects(threshold)
+    if suspects:
+        N_PLUS_ONE_SUSPECTS.labels(stats.kind, stats.name).inc()
+        print(f"[N+1 의심] {stats.kind}:{stats.name} - 쿼리 {stats.count}개, DB {stats.seconds * 1000:.1f}ms")
+        for shape, n in suspects[:3]:
+            print(f"    x{n}  {shape[:160]}")
+    elif QUERY_STATS_LOG and stats.count:
+        print(f"[Query Count] {stats.kind}:{stats.name} - 쿼리 {stats.count}개, DB {stats.seconds * 1000:.1f}ms")
+    return suspects
+
+
+@contextmanager
+def track_queries(
+    name: str,
+    kind: str = "block",
+    threshold: Optional[int] = None,
+    strict: bool = False,
+) -> Iterator[QueryStats]:
+    """
+    with 블록 안에서 실행된 쿼리를 집계합니다. (바깥 범위가 있으면 그쪽에도 함께 집계)
+    strict=True면 블록 종료 시 N+1 의심 쿼리가 있을 때 NPlusOneDetected를 발생시킵니다.
+    """
+    stats = QueryStats(kind, name, parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        suspects = _finish(stats, threshold if threshold is not None else N_PLUS_ONE_THRESHOLD)
+    if strict and suspects:
+        shape, n = suspects[0]
+        raise NPlusOneDetected(f"{name}: 같은 쿼리가 {n}번 실행됨 - {shape[:200]}")
+
+
+# --- 엔진 이벤트 ---
+
+# 시작 시각은 실행 컨텍스트(문장 1회 실행 동안만 존재)에 저장:
+# 문장이 실패하면 after_cursor_execute가 호출되지 않지만 컨텍스트와 함께 버려지므로 남는 값이 없음
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None and _current.get() is not None:
+        context._query_counter_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current.get()
+    started = getattr(context, "_query_counter_started", None)
+    if stats is None or started is None:
+        return
+    stats.record(statement_shape(statement), time.perf_counter() - started)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """엔진(AsyncEngine이면 .sync_engine)에 쿼리 카운터 이벤트를 연결합니다."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --- HTTP 미들웨어 ---
+
+class QueryStatsMiddleware:
+    """요청마다 쿼리 범위를 열고, 응답 헤더에 쿼리 수/DB 시간/최대 반복 횟수를 추가합니다."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats("request", "unmatched")
+        token = _current.set(stats)
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), *stats.headers()]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            # 라우팅 후 채워지는 라우트 템플릿으로 지표 라벨 지정 (MetricsMiddleware와 동일)
+            stats.name = getattr(scope.get("route"), "path", None) or "unmatched"
+            _finish(stats, N_PLUS_ONE_THRESHOLD)
@@ -0,0 +1,52 @@
+# app/routers/admin.py (운영자용 API)
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import HTMLResponse, PlainTextResponse
+
+from app import profiler
+from app.config import PROFILER_ADMIN_TOKEN
+
+router = APIRouter(
+    prefix="/api/v1/admin",
+    tags=["Admin"]
+)
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """X-Admin-Token 헤더가 PROFILER_ADMIN_TOKEN과 같아야 합니다. 토큰이 설정되지 않았으면 API 자체를 숨깁니다."""
+    if not PROFILER_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiler.is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="관리자 토큰이 올바르지 않습니다.")
+
+
+@router.get("/profiles", dependencies=[Depends(require_admin_token)])
+def list_request_profiles():
+    """
+    이 워커에 보관 중인 요청 프로파일 목록 (최신순).
+    요청에 X-Profile: <토큰> 헤더를 붙이면 응답의 X-Profile-Id로 저장됩니다.
+    """
+    return profiler.list_profiles()
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_admin_token)])
+def get_request_profile(profile_id: str, format: str = "json"):
+    """
+    프로파일 상세.
+    format: json (기본) | html (pyinstrument 결과) | folded (내장 샘플러 스택, flamegraph/speedscope 입력)
+    """
+    profile = profiler.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="프로파일을 찾을 수 없습니다. (다른 워커에서 처리되었거나 보관 개수를 넘어 삭제됨)")
+
+    if format == "html":
+        if "html" not in profile:
+            raise HTTPException(status_code=400, detail="html 형식은 pyinstrument로 수집한 프로파일만 지원합니다.")
+        return HTMLResponse(profile["html"])
+    if format == "folded":
+        if "folded" not in profile:
+            raise HTTPException(status_code=400, detail="folded 형식은 내장 샘플러로 수집한 프로파일만 지원합니다.")
+        return PlainTextResponse("\n".join(profile["folded"]) + "\n")
+    return {key: value for key, value in profile.items() if key != "html"}
@@ -2,23 +2,27 @@
 # 이 파일은 API 경로를 정의하고, '신분증 검사'와 '입력값 검증'만 담당합니다.
 # 실제 핵심 로직은 'app/mcp/service.py'로 분리되었습니다.
 
+import json
+from typing import Optional
+
 import httpx
-from fastapi import APIRouter, Depends, Request, HTTPException, Body
+from fastapi import APIRouter, Depends, Request, HTTPException, Body, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 # --- 1. 우리가 만든 모듈들 임포트 ---
-from app.database import SessionLocal
+from app.database import get_db
 from app.routers.auth import get_current_user # (신분증 검사관)
 from app import models, schemas
 from app.mcp import service # [NEW] MCP 핵심 로직 임포트
+from app.mcp.answer_cache import answer_cache_stats
+from app.cache import cache_stats
+from app.singleflight import single_flight_stats
+from app.services.learned_aliases import learned_alias_stats
+from app.services.memory_service import HISTORY_PAGE_MAX, get_history_page
+from app.principal_cache import principal_cache_stats
 
-# --- 2. DB 세션을 가져오는 함수 (동일) ---
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# --- 2. DB 세션: app.database.get_db (get_current_user와 같은 세션을 공유) ---
 
 # --- 3. httpx 클라이언트를 받아오는 함수 (동일) ---
 def get_httpx_client(request: Request) -> httpx.AsyncClient:
@@ -59,7 +63,9 @@ async def chat_with_agent(
             user_message=message_content,
             current_user=current_user,
             db=db,
-            httpx_client=httpx_client
+            httpx_client=httpx_client,
+            agent_mode=request_body.agent_mode,
+            use_cache=request_body.use_cache,
         )
         
         # 3. ChatResponse 객체 생성
@@ -75,4 +81,88 @@ async def chat_with_agent(
     except Exception as e:
         # service.py에서 발생한 에러를 여기서 최종 처리
         print(f"Chat API 라우터 에러 발생: {e}")
-        raise HTTPException(status_code=500, detail=f"AI 에이전트 처리 중 오류 발생: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"AI 에이전트 처리 중 오류 발생: {e}")
+
+
+# --- 6. [NEW] 스트리밍 채팅 엔드포인트 (Server-Sent Events) ---
+def _format_sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_with_agent_stream(
+    httpx_client: httpx.AsyncClient = Depends(get_httpx_client),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+    request_body: schemas.ChatRequest = Body(...),
+):
+    """
+    [로그인 필요] AI 에이전트와 대화하며 진행 상황을 SSE로 스트리밍합니다.
+    tool_start / tool_finish / widget / token 이벤트를 순서대로 보내고,
+    마지막에 ChatResponse와 같은 내용을 담은 done 이벤트를 보냅니다.
+    (스트리밍을 지원하지 않는 클라이언트는 기존 /chat 을 사용하세요.)
+    """
+    message_content = request_body.message
+    if not message_content:
+        raise HTTPException(
+            status_code=400, 
+            detail="Request body는 반드시 {\"message\": \"당신의 질문\"} 형식이어야 합니다."
+        )
+
+    async def event_stream():
+        try:
+            async for event in service.stream_mcp_agent(
+                user_message=message_content,
+                current_user=current_user,
+                db=db,
+                httpx_client=httpx_client,
+                agent_mode=request_body.agent_mode,
+                use_cache=request_body.use_cache,
+            ):
+                yield _format_sse(event)
+        except Exception as e:
+            # 스트림이 이미 시작되어 HTTP 상태 코드를 바꿀 수 없으므로 error 이벤트로 전달
+            print(f"Chat Stream 라우터 에러 발생: {e}")
+            yield _format_sse({"type": "error", "detail": f"AI 에이전트 처리 중 오류 발생: {e}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# --- 7. [NEW] 대화 기록 조회 (키셋 페이지네이션) ---
+@router.get("/history", response_model=schemas.ChatHistoryPage)
+async def get_agent_history(
+    limit: int = Query(20, ge=1, le=HISTORY_PAGE_MAX),
+    cursor: Optional[str] = Query(None, description="이전 응답의 next_cursor (생략 시 최신 페이지)"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    [로그인 필요] 내 대화 기록을 최신순으로 limit개씩 반환합니다.
+    다음 페이지는 응답의 next_cursor를 cursor로 넘겨 조회합니다.
+    """
+    try:
+        return get_history_page(db, current_user.id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# --- 8. [NEW] 캐시 적중률 확인 엔드포인트 ---
+@router.get("/cache-stats")
+async def get_agent_cache_stats(
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    [로그인 필요] 답변 캐시 / 2단 데이터 캐시 / single-flight / 학습 별칭(절감한 LLM 호출) 통계를 반환합니다.
+    """
+    return {
+        "answer_cache": answer_cache_stats(),
+        "data_cache": cache_stats(),
+        "single_flight": single_flight_stats(),
+        "learned_aliases": learned_alias_stats(db),
+        "principal_cache": principal_cache_stats(),
+    }
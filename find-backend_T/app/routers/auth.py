@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer # 로그인 폼
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import timedelta
 
-from app import models, schemas, security
-from app.database import SessionLocal, engine
+from app import models, schemas, security, password_hasher
+from app.database import get_db
+from app.principal_cache import cache_principal, get_cached_principal
 
 # --- [추가 1] ---
 # "/api/v1/auth/login" 주소에서 토큰을 받아오라고 알려주는 설정
@@ -12,31 +14,35 @@ from app.database import SessionLocal, engine
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 # --- [추가 1 완료] ---
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 router = APIRouter(
     prefix="/api/v1/auth",
     tags=["Authentication"]
 )
 
+# signup/login은 해싱을 await하기 위해 async 엔드포인트이므로,
+# 동기 DB 작업(pymysql)은 이벤트 루프를 막지 않도록 스레드풀에서 실행합니다.
+def _get_user_by_username(db: Session, username: str):
+    return db.query(models.User).filter(models.User.username == username).first()
+
+def _save_user(db: Session, db_user: models.User) -> None:
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+
 @router.post("/signup", response_model=schemas.User)
-def create_user(
+async def create_user(
     user: schemas.UserCreate, 
     db: Session = Depends(get_db)
 ):
 
-    db_user = db.query(models.User).filter(models.User.username == user.username).first()
+    db_user = await run_in_threadpool(_get_user_by_username, db, user.username)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="이미 존재하는 아이디입니다."
         )
-    hashed_password = security.get_password_hash(user.password)
+    # 해싱은 전용 프로세스 풀에서 (공용 스레드풀/이벤트 루프를 막지 않음)
+    hashed_password = await password_hasher.hash_password(user.password)
 
     db_user = models.User(
         username=user.username,
@@ -46,23 +52,21 @@ def create_user(
         email=user.email
     )
     
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await run_in_threadpool(_save_user, db, db_user)
     return db_user
 
 #--- 로그인 API 엔드포인트 ---
 @router.post("/login", response_model=schemas.Token)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ): 
 
 # 1. 유저 확인
-    user = db.query(models.User).filter(models.User.username == form_data.username).first()
+    user = await run_in_threadpool(_get_user_by_username, db, form_data.username)
     
     # 2. 유저가 없거나, 비밀번호가 틀리면 에러
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    if not user or not await password_hasher.verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="아이디 또는 비밀번호가 정확하지 않습니다.",
@@ -79,7 +83,7 @@ def login_for_access_token(
 # "신분증 검사관" 함수 (가장 중요)
 def get_current_user(
     token: str = Depends(oauth2_scheme), # 1. 헤더에서 토큰을 추출
-    db: Session = Depends(get_db)         # 2. DB 세션을 준비
+    db: Session = Depends(get_db)         # 2. DB 세션을 준비 (엔드포인트와 같은 세션)
 ) -> models.User:
     """
     토큰을 검증하고, 유효하면 DB에서 해당 유저 정보를 반환합니다.
@@ -96,16 +100,32 @@ def get_current_user(
     # 4. security.py의 함수로 토큰 검증
     token_data = security.verify_token(token, credentials_exception)
     
-    # 5. 토큰에서 유저 이름을 꺼내 DB에서 실제 유저 조회
+    # 5. 같은 토큰으로 최근에 조회한 유저면 캐시에서 (DB 조회 없이 요청 세션에 연결)
+    user = get_cached_principal(db, token_data.username, token_data.exp)
+    if user is not None:
+        return user
+
+    # 6. 토큰에서 유저 이름을 꺼내 DB에서 실제 유저 조회
     user = db.query(models.User).filter(models.User.username == token_data.username).first()
     
-    # 6. 유저가 DB에 없으면 에러
+    # 7. 유저가 DB에 없으면 에러
     if user is None:
         raise credentials_exception
+    cache_principal(user, token_data.username, token_data.exp)
         
-    # 7. 유효한 유저 정보를 반환
+    # 8. 유효한 유저 정보를 반환
     return user
 
+# 비밀번호 해싱 풀 상태 (대기열 깊이, 평균 대기/실행 시간)
+@router.get("/hasher-stats")
+def get_password_hasher_stats(
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    [로그인 필요] 비밀번호 해싱 전용 프로세스 풀의 대기/실행 통계를 반환합니다.
+    """
+    return password_hasher.password_hasher_stats()
+
 # 현재 사용자 정보 조회 엔드포인트
 @router.get("/me", response_model=schemas.User)
 def get_current_user_info(
@@ -2,10 +2,11 @@
 
 import httpx
 from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import models
-from app.database import SessionLocal
+from app.database import get_async_db, get_db
 from app.services.income_statement_service import fetch_company_income_statements
 from app.services.balance_sheet_service import fetch_company_balance_sheets
 from app.services.cash_flow_service import fetch_company_cash_flows
@@ -27,13 +28,6 @@ router = APIRouter(
 def get_httpx_client(request: Request) -> httpx.AsyncClient:
     return request.app.state.httpx_client
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # 4. 'Stable' API 엔드포인트 테스트 (기업 검색)
 @router.get("/search/{query}")
 async def get_company_stable_search(
@@ -173,7 +167,7 @@ async def get_company_cash_flow(
 async def get_company_key_metrics(
     ticker: str,
     client: httpx.AsyncClient = Depends(get_httpx_client),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     period: str = "annual",
     limit: int = 3,
 ):
@@ -270,7 +264,7 @@ async def get_analyst_consensus_widget(
 async def get_metrics_grid_widget(
     ticker: str,
     client: httpx.AsyncClient = Depends(get_httpx_client),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     widget = await fetch_metrics_grid_widget(ticker, db, client)
     if not widget:
@@ -5,7 +5,7 @@ from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
-from app.database import SessionLocal
+from app.database import get_db
 from app.services.market_service import fetch_stock_quote
 
 router = APIRouter(
@@ -16,13 +16,6 @@ router = APIRouter(
 def get_httpx_client(request: Request) -> httpx.AsyncClient:
     return request.app.state.httpx_client
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # --- 기존의 테스트용 엔드포인트 (이제 위 "도구"를 사용하도록 변경) ---
 @router.get("/quote/{ticker}")
 async def get_market_quote_test(
@@ -1,7 +1,8 @@
 # app/schemas.py
 
+from datetime import datetime
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 
 # --- Token (로그인 응답) ---
 class Token(BaseModel):
@@ -10,6 +11,7 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    exp: Optional[int] = None # 만료 시각 (epoch seconds) - 사용자 조회 캐시 키에 사용
 
 # --- User (사용자) ---
 class UserBase(BaseModel):
@@ -41,6 +43,7 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    exp: Optional[int] = None # 만료 시각 (epoch seconds) - 사용자 조회 캐시 키에 사용
 
 # --- User (사용자) ---
 class UserBase(BaseModel):
@@ -64,11 +67,23 @@ class User(UserBase):
 
 class ChatRequest(BaseModel):
     message: str # 프론트엔드가 보낼 "새 질문"
+    agent_mode: Optional[Literal["react", "plan"]] = None # 생략 시 서버 기본값(AGENT_MODE)
+    use_cache: bool = True # False면 답변 캐시를 건너뛰고 항상 새로 생성
 
 class ChatResponse(BaseModel):
     response: str # 서버가 반환할 "AI의 답변"
     widgets: Optional[List[Dict[str, Any]]] = None # [NEW] 시각화 위젯 데이터
 
+class ChatHistoryMessage(BaseModel):
+    id: int
+    role: str # "user" or "assistant"
+    content: str
+    created_at: Optional[datetime] = None
+
+class ChatHistoryPage(BaseModel):
+    messages: List[ChatHistoryMessage] # 최신순
+    next_cursor: Optional[str] = None # 다음(더 오래된) 페이지 커서, 없으면 마지막 페이지
+
 # --- Dashboard Widgets (High Density) ---
 
 class AnalystCardWidget(BaseModel):
@@ -48,7 +48,7 @@ def verify_token(token: str, credentials_exception) -> TokenData:
         if username is None:
             raise credentials_exception # 유저 이름이 없음
         
-        return TokenData(username=username) # 유효한 토큰
+        return TokenData(username=username, exp=payload.get("exp")) # 유효한 토큰
     
     except JWTError:
         raise credentials_exception # 토큰이 유효하지 않음
\ No newline at end of file
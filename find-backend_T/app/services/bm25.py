@@ -0,0 +1,85 @@
+"""로컬 BM25 어휘 검색 모듈 (외부 검색엔진 없이 문단 단위 검색).
+
+문서(문단)별 단어 빈도는 저장 시점에 계산해 두고,
+검색 시에는 IDF/문서 길이 정규화만 계산합니다.
+"""
+# app/services/bm25.py
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?|[가-힣]+")
+
+# 점수에 기여하지 않는 영어 불용어 (실적발표 콜 문장에 흔한 단어 포함)
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could did do does for from had has have he her his i if in into is it
+its just let me more my no not of on or our out so some that the their them then there these they this those
+to up us was we were what when where which while who will with would you your yeah okay thank thanks
+""".split())
+
+
+def _stem(token: str) -> str:
+    """아주 단순한 어미 정리 (revenues/revenue→revenu, increased/increase→increas)."""
+    if token.endswith("'s"):
+        token = token[:-2]
+    if len(token) > 5 and token.endswith("ies"):
+        token = token[:-3] + "y"
+    else:
+        for suffix in ("ing", "ed", "s"):
+            if len(token) > len(suffix) + 3 and token.endswith(suffix) and not token.endswith("ss"):
+                token = token[: -len(suffix)]
+                break
+    if len(token) > 4 and token.endswith("e"):
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        _stem(token)
+        for token in _TOKEN.findall(text.lower())
+        if token not in STOPWORDS and len(token) > 1
+    ]
+
+
+def term_frequencies(text: str) -> Tuple[Dict[str, int], int]:
+    """(단어 → 빈도, 문서 길이). 저장 시점에 한 번 계산합니다."""
+    tokens = tokenize(text)
+    return dict(Counter(tokens)), len(tokens)
+
+
+class BM25Index:
+    """미리 계산된 단어 빈도로 만든 BM25 인덱스 (Okapi BM25, k1=1.5, b=0.75)."""
+
+    def __init__(self, documents: Sequence[Tuple[Dict[str, int], int]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents = list(documents)
+        self.avg_length = (sum(length for _, length in self.documents) / len(self.documents)) if self.documents else 0.0
+        document_frequency: Counter = Counter()
+        for freqs, _ in self.documents:
+            document_frequency.update(freqs.keys())
+        total = len(self.documents)
+        self.idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[int, float]]:
+        """(문서 index, 점수)를 점수 내림차순으로 반환합니다. 점수 0인 문서는 제외."""
+        terms = [term for term in set(tokenize(query)) if term in self.idf]
+        if not terms or not self.avg_length:
+            return []
+        scores = []
+        for index, (freqs, length) in enumerate(self.documents):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_length)
+            for term in terms:
+                tf = freqs.get(term)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            if score > 0:
+                scores.append((index, score))
+        scores.sort(key=lambda item: (-item[1], item[0]))
+        return scores[:top_k]
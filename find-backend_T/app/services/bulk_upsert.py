@@ -0,0 +1,71 @@
+"""재무제표 테이블 일괄 upsert 헬퍼.
+
+레코드마다 SELECT → UPDATE/INSERT 를 반복하는 대신,
+기존 유니크 제약조건(_cis_/_cbs_/_ccf_/_ckm_ticker_period_date_uc)을 이용해
+MySQL `INSERT ... ON DUPLICATE KEY UPDATE` 한 문장으로 저장합니다.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from sqlalchemy import UniqueConstraint
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+
+
+def _key_columns(model) -> Set[str]:
+    """PK와 유니크 제약조건에 포함된 컬럼 (ON DUPLICATE KEY UPDATE 대상에서 제외)."""
+    table = model.__table__
+    keys = {column.name for column in table.primary_key.columns}
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint):
+            keys.update(column.name for column in constraint.columns)
+    return keys
+
+
+def build_bulk_upsert(
+    model,
+    rows: List[Dict[str, Any]],
+    update_columns: Optional[Sequence[str]] = None,
+):
+    """
+    rows를 저장하는 INSERT ... ON DUPLICATE KEY UPDATE 문을 만듭니다. (rows가 비면 None)
+
+    - 모든 row는 같은 컬럼 집합을 가져야 합니다 (다중 VALUES 구문).
+    - update_columns를 생략하면 키 컬럼을 제외한 전달된 컬럼을 모두 갱신합니다.
+    AsyncSession 경로에서는 이 문장을 직접 await db.execute(...) 합니다.
+    """
+    if not rows:
+        return None
+
+    if update_columns is None:
+        key_columns = _key_columns(model)
+        update_columns = [name for name in rows[0] if name not in key_columns]
+
+    stmt = mysql_insert(model.__table__).values(rows)
+    if update_columns:
+        stmt = stmt.on_duplicate_key_update(
+            {name: stmt.inserted[name] for name in update_columns}
+        )
+    else:
+        # 갱신할 컬럼이 없으면 중복 행은 그대로 둠
+        stmt = stmt.prefix_with("IGNORE")
+    return stmt
+
+
+def bulk_upsert(
+    db: Session,
+    model,
+    rows: List[Dict[str, Any]],
+    update_columns: Optional[Sequence[str]] = None,
+) -> int:
+    """
+    rows를 한 번의 INSERT ... ON DUPLICATE KEY UPDATE 로 저장합니다. (build_bulk_upsert 참고)
+    commit은 호출하는 쪽에서 수행합니다.
+    """
+    stmt = build_bulk_upsert(model, rows, update_columns)
+    if stmt is None:
+        return 0
+    db.execute(stmt)
+    return len(rows)
@@ -11,6 +11,9 @@ from sqlalchemy.orm import Session
 from app import models
 from app.config import FMP_API_KEY, FMP_BASE_URL
 from app.mcp.decorators import register_tool
+from app.services.bulk_upsert import bulk_upsert
+from app.services.data_versions import CASH_FLOWS, bump_data_versions
+from app.singleflight import single_flight
 
 CASH_FLOW_URL = f"{FMP_BASE_URL}/cash-flow-statement"
 CACHE_TTL = timedelta(days=90)  # report_date 기준 3개월
@@ -24,6 +27,62 @@ def _extract_year(value: Any, fallback_date: datetime) -> int:
     return fallback_date.year
 
 
+async def _refresh_cash_flows(
+    ticker: str,
+    normalized_period: str,
+    limit: int,
+    db: Session,
+    client: httpx.AsyncClient,
+) -> None:
+    """FMP에서 현금흐름표를 받아 DB에 upsert 합니다. (single-flight 리더만 실행)"""
+    url = (
+        f"{CASH_FLOW_URL}/{ticker}"
+        f"?period={normalized_period}&limit={limit}&apikey={FMP_API_KEY}"
+    )
+    try:
+        response = await client.get(url)
+        response.raise_for_status()
+        payload = response.json() or []
+
+    except Exception as exc:
+        print(f"fetch_company_cash_flows 호출 실패: {exc}")
+        payload = []
+
+    rows = []
+    for item in payload:
+        date_raw = item.get("date")
+        try:
+            report_date = datetime.fromisoformat(date_raw).date() if date_raw else None
+        except ValueError:
+            report_date = None
+        if not report_date:
+            continue
+
+        rows.append({
+            "ticker": ticker,
+            "period": normalized_period,
+            "report_date": report_date,
+            "report_year": _extract_year(
+                item.get("calendarYear"),
+                datetime.combine(report_date, datetime.min.time()),
+            ),
+            "operating_cash_flow": item.get("netCashProvidedByOperatingActivities") or item.get("operatingCashFlow"),
+            "investing_cash_flow": item.get("netCashUsedForInvestingActivites") or item.get("investmentCashFlow"),
+            "financing_cash_flow": item.get("netCashUsedProvidedByFinancingActivities") or item.get("financingCashFlow"),
+            "capital_expenditure": item.get("capitalExpenditure"),
+            "free_cash_flow": item.get("freeCashFlow"),
+            # SBC, 자사주 매입, 배당도 함께 DB에 영구 저장
+            "stock_based_compensation": item.get("stockBasedCompensation"),
+            "common_stock_repurchased": item.get("commonStockRepurchased"),
+            "dividends_paid": item.get("dividendsPaid"),
+        })
+
+    # 유니크 제약조건 (ticker, period, report_date) 기준 일괄 upsert → 1 statement, 1 commit
+    bulk_upsert(db, models.CompanyCashFlow, rows)
+    bump_data_versions(db, CASH_FLOWS, [ticker])
+    db.commit()
+
+
 @register_tool
 async def fetch_company_cash_flows(
     ticker: str,
@@ -87,78 +146,12 @@ async def fetch_company_cash_flows(
             needs_update = False
 
     if needs_update:
-        url = (
-            f"{CASH_FLOW_URL}/{ticker}"
-            f"?period={normalized_period}&limit={limit}&apikey={FMP_API_KEY}"
+        # 같은 (endpoint, ticker, period) 갱신이 진행 중이면 합류하여 FMP 호출/upsert를 1회로 병합
+        await single_flight(
+            (f"cash-flow?limit={limit}", ticker, normalized_period),
+            lambda: _refresh_cash_flows(ticker, normalized_period, limit, db, client),
+            db=db,
         )
-        try:
-            response = await client.get(url)
-            response.raise_for_status()
-            payload = response.json() or []
-
-        except Exception as exc:
-            print(f"fetch_company_cash_flows 호출 실패: {exc}")
-            payload = []
-
-        for item in payload:
-            date_raw = item.get("date")
-            try:
-                report_date = datetime.fromisoformat(date_raw).date() if date_raw else None
-            except ValueError:
-                report_date = None
-            if not report_date:
-                continue
-
-            # 유니크 제약조건 (ticker, period, report_date)로 기존 레코드 찾기
-            existing = (
-                db.query(models.CompanyCashFlow)
-                .filter_by(
-                    ticker=ticker,
-                    period=normalized_period,
-                    report_date=report_date
-                )
-                .first()
-            )
-
-            if existing:
-                # 기존 레코드 업데이트
-                existing.report_year = _extract_year(
-                    item.get("calendarYear"),
-                    datetime.combine(report_date, datetime.min.time()),
-                )
-                existing.operating_cash_flow = item.get("netCashProvidedByOperatingActivities") or item.get("operatingCashFlow")
-                existing.investing_cash_flow = item.get("netCashUsedForInvestingActivites") or item.get("investmentCashFlow")
-                existing.financing_cash_flow = item.get("netCashUsedProvidedByFinancingActivities") or item.get("financingCashFlow")
-                existing.capital_expenditure = item.get("capitalExpenditure")
-                existing.free_cash_flow = item.get("freeCashFlow")
-                # SBC, 자사주 매입, 배당도 함께 DB에 영구 저장
-                existing.stock_based_compensation = item.get("stockBasedCompensation")
-                existing.common_stock_repurchased = item.get("commonStockRepurchased")
-                existing.dividends_paid = item.get("dividendsPaid")
-            else:
-                # 새 레코드 추가
-                record = models.CompanyCashFlow(
-                    ticker=ticker,
-                    period=normalized_period,
-                    report_date=report_date,
-                    report_year=_extract_year(
-                        item.get("calendarYear"),
-                        datetime.combine(report_date, datetime.min.time()),
-                    ),
-                    operating_cash_flow=item.get("netCashProvidedByOperatingActivities")
-                    or item.get("operatingCashFlow"),
-                    investing_cash_flow=item.get("netCashUsedForInvestingActivites")
-                    or item.get("investmentCashFlow"),
-                    financing_cash_flow=item.get("netCashUsedProvidedByFinancingActivities")
-                    or item.get("financingCashFlow"),
-                    capital_expenditure=item.get("capitalExpenditure"),
-                    free_cash_flow=item.get("freeCashFlow"),
-                    stock_based_compensation=item.get("stockBasedCompensation"),
-                    common_stock_repurchased=item.get("commonStockRepurchased"),
-                    dividends_paid=item.get("dividendsPaid"),
-                )
-                db.add(record)
-        db.commit()
 
     records = (
         db.query(models.CompanyCashFlow)
@@ -0,0 +1,398 @@
+"""기업 별칭(alias) 인덱스 모듈.
+
+company_profiles의 ticker / companyName / k_name 과 자주 쓰는 한글 별칭으로 메모리 인덱스를 만들어
+질문 문장 안에 등장하는 기업이나 검색어를 DB 스캔/LLM 호출 없이 티커로 변환합니다.
+(예: "엔비디아는 왜 떨어졌어?" → NVDA, "마이크로 소프트" → MSFT, "앤비디아"(오타) → NVDA)
+
+조회 순서: 티커 정확 일치 → 별칭 정확 일치(공백/기호 제거 형태 포함) → 접두어 → 오타 허용(trigram + 편집 거리)
+한글은 자모 단위로 분해해 비교하므로 "앤비디아"/"엔비디아"처럼 한 글자 안의 오타도 거리 1로 계산됩니다.
+"""
+# app/services/company_alias_index.py
+import bisect
+import re
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+
+ALIAS_INDEX_REFRESH_SECONDS = 600  # company_profiles 재로딩 주기
+MIN_ALIAS_LENGTH = {"ko": 2, "en": 3}
+
+# "Apple Inc." → "apple" 처럼 회사명 끝의 법인 표기를 제거
+_CORPORATE_SUFFIX = re.compile(
+    r"[\s,]+(inc|incorporated|corp|corporation|co|company|ltd|limited|plc|holdings?|group|n\.?v|s\.?a|ag|se)\.?$"
+)
+# 한글 조사가 바로 붙는 경우("NVDA랑")도 잡도록 \b 대신 ASCII 영숫자 경계를 사용
+_TICKER_TOKEN = re.compile(r"(?<![A-Za-z0-9])(?:[A-Z]{2,5}(?:\.[A-Z]{1,2})?|\d{6}\.[A-Z]{2})(?![A-Za-z0-9])")
+# 질문에 자주 나오는 대문자 약어 (티커와 겹쳐도 기업으로 보지 않음)
+_NON_TICKER_WORDS = {
+    "PER", "PBR", "PEG", "EPS", "ROE", "ROA", "FCF", "CEO", "CFO", "AI", "IPO", "ETF",
+    "USD", "KRW", "GDP", "CPI", "YOY", "QOQ", "FY", "TTM", "EV", "DCF",
+}
+# 한글 별칭 바로 뒤에 붙어도 되는 조사/어미 (+ 띄어 쓰지 않는 경우가 많은 주가/실적 등)
+# 별칭 뒤의 한글이 이 조각들로만 이루어져야 기업명으로 봄 ("메타버스", "인텔리전스" 방지)
+_HANGUL_SUFFIXES = (
+    "이랑", "랑", "하고", "에서", "에게", "한테", "으로", "로", "보다", "처럼", "까지", "부터",
+    "이나", "나", "이야", "야", "이에요", "예요", "이죠", "죠", "이고", "고", "이요", "요",
+    "은", "는", "이", "가", "을", "를", "의", "도", "만", "과", "와", "에",
+    "주가", "주식", "실적", "주",
+)
+
+
+def _is_hangul(char: str) -> bool:
+    return "가" <= char <= "힣"
+
+
+def _is_suffix_run(run: str) -> bool:
+    """run 전체가 _HANGUL_SUFFIXES 조각의 연속인지 ("이랑은" → 이랑+은)."""
+    reachable = [True] + [False] * len(run)
+    for start in range(len(run)):
+        if reachable[start]:
+            for suffix in _HANGUL_SUFFIXES:
+                if run.startswith(suffix, start):
+                    reachable[start + len(suffix)] = True
+    return reachable[len(run)]
+
+
+def _hangul_alias_boundary(text: str, start: int, end: int) -> bool:
+    """
+    한글 별칭이 다른 단어의 일부가 아닌지 확인합니다.
+    앞 글자는 한글이 아니어야 하고 ("소비자"의 "비자", "파인애플"의 "애플" 방지),
+    뒤에 이어지는 한글은 조사/어미여야 합니다.
+    """
+    if start > 0 and _is_hangul(text[start - 1]):
+        return False
+    run_end = end
+    while run_end < len(text) and _is_hangul(text[run_end]):
+        run_end += 1
+    return run_end == end or _is_suffix_run(text[end:run_end])
+
+
+
+# 자주 쓰는 한글/약칭 별칭 (company_profiles에 있는 티커만 등록됨)
+COMMON_NICKNAMES: Dict[str, Tuple[str, ...]] = {
+    "AAPL": ("애플", "apple"),
+    "NVDA": ("엔비디아", "nvidia"),
+    "GOOGL": ("구글", "알파벳", "google"),
+    "MSFT": ("마이크로소프트", "마소"),
+    "AMZN": ("아마존",),
+    "META": ("메타", "페이스북", "facebook"),
+    "TSLA": ("테슬라",),
+    "NFLX": ("넷플릭스",),
+    "AMD": ("에이엠디",),
+    "INTC": ("인텔",),
+    "AVGO": ("브로드컴",),
+    "TSM": ("tsmc", "티에스엠씨", "대만반도체"),
+    "QCOM": ("퀄컴",),
+    "MU": ("마이크론",),
+    "ORCL": ("오라클",),
+    "CRM": ("세일즈포스",),
+    "ADBE": ("어도비",),
+    "PLTR": ("팔란티어",),
+    "KO": ("코카콜라", "코크"),
+    "PEP": ("펩시",),
+    "MCD": ("맥도날드", "맥날"),
+    "SBUX": ("스타벅스", "스벅"),
+    "NKE": ("나이키",),
+    "DIS": ("디즈니",),
+    "JPM": ("제이피모건", "jp모건"),
+    "BRK.B": ("버크셔", "버크셔해서웨이"),
+    "V": ("비자",),
+    "MA": ("마스터카드",),
+    "WMT": ("월마트",),
+    "COST": ("코스트코",),
+    "UBER": ("우버",),
+    "ABNB": ("에어비앤비",),
+    "COIN": ("코인베이스",),
+    "ASML": ("에이에스엠엘",),
+    "ARM": ("암홀딩스",),
+}
+
+# 오타 허용 조회 설정
+FUZZY_MAX_CANDIDATES = 30
+MIN_PREFIX_LENGTH = 2
+
+_CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNGSEONG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_JONGSEONG = ("", *"ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ")
+_NON_ALNUM = re.compile(r"[^0-9a-z가-힣]+")
+
+
+def normalize_alias(name: str) -> str:
+    """소문자 변환 + 앞의 "The"/법인 표기 제거 + 공백 정리."""
+    alias = " ".join(unicodedata.normalize("NFKC", name).lower().split())
+    if alias.startswith("the "):
+        alias = alias[4:]
+    while True:
+        stripped = _CORPORATE_SUFFIX.sub("", alias)
+        if stripped == alias:
+            return alias
+        alias = stripped
+
+
+def compact_alias(name: str) -> str:
+    """공백/기호까지 제거한 비교용 키 ("Coca-Cola Co." → "cocacola", "마이크로 소프트" → "마이크로소프트")."""
+    return _NON_ALNUM.sub("", normalize_alias(name))
+
+
+def decompose_jamo(text: str) -> str:
+    """한글 음절을 초성/중성/종성 자모로 분해합니다 ("엔비" → "ㅇㅔㄴㅂㅣ"). 그 외 문자는 그대로."""
+    out = []
+    for char in text:
+        code = ord(char) - 0xAC00
+        if 0 <= code < 11172:
+            out.append(_CHOSEONG[code // 588])
+            out.append(_JUNGSEONG[(code % 588) // 28])
+            out.append(_JONGSEONG[code % 28])
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    인접 문자 전치를 1회로 치는 편집 거리 (Damerau-Levenshtein, OSA).
+    max_distance를 넘으면 max_distance + 1을 반환합니다 (조기 종료).
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    before_previous: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            cost = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            )
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before_previous[j - 2] + 1)
+            current.append(cost)
+        if min(current) > max_distance:
+            return max_distance + 1
+        before_previous, previous = previous, current
+    return previous[-1]
+
+
+def _is_valid_alias(alias: str) -> bool:
+    is_korean = any("가" <= char <= "힣" for char in alias)
+    return len(alias) >= MIN_ALIAS_LENGTH["ko" if is_korean else "en"]
+
+
+@dataclass
+class AliasMatch:
+    """검색어 하나에 대한 조회 결과."""
+
+    ticker: str
+    alias: str
+    match_type: str  # "ticker" | "exact" | "prefix" | "fuzzy" (search_service: LLM 변환 "llm", 학습 별칭 "learned")
+    score: float
+
+
+class CompanyAliasIndex:
+    """별칭 → 티커 매핑과, 문장 스캔용 첫 글자 버킷 / 접두어·오타 조회용 보조 인덱스를 보관합니다."""
+
+    def __init__(
+        self,
+        rows: List[Tuple[str, str, Optional[str]]],
+        learned: Iterable[Tuple[str, str]] = (),
+    ):
+        self.tickers = set()
+        self.names: Dict[str, str] = {}
+        self.aliases: Dict[str, str] = {}
+        for ticker, company_name, k_name in rows:
+            self.tickers.add(ticker)
+            self.names[ticker] = k_name or company_name
+
+        # 별칭 사전이 먼저 등록되어야 "구글" → GOOGL처럼 대표 티커로 고정됨
+        for ticker, nicknames in COMMON_NICKNAMES.items():
+            if ticker in self.tickers:
+                for nickname in nicknames:
+                    self.aliases.setdefault(normalize_alias(nickname), ticker)
+
+        for ticker, company_name, k_name in rows:
+            for raw in (company_name, k_name):
+                if not raw:
+                    continue
+                for alias in {" ".join(raw.lower().split()), normalize_alias(raw)}:
+                    if _is_valid_alias(alias):
+                        # 같은 별칭이 여러 티커에 있으면 먼저 등록된(티커 알파벳순) 쪽 유지
+                        self.aliases.setdefault(alias, ticker)
+
+        # 승격된 학습 별칭 (app/services/learned_aliases.py) - 정식 명칭/별칭 사전과 겹치면 그쪽이 우선
+        for query_text, ticker in learned:
+            alias = normalize_alias(query_text)
+            if ticker in self.tickers and _is_valid_alias(alias):
+                self.aliases.setdefault(alias, ticker)
+
+        # 첫 글자별로 긴 별칭부터 → 문장의 각 위치에서 최장 일치
+        self._buckets: Dict[str, List[str]] = {}
+        for alias in sorted(self.aliases, key=len, reverse=True):
+            self._buckets.setdefault(alias[0], []).append(alias)
+
+        # 공백/기호 제거 키 → 티커 (정확/접두어 조회), 자모 키 trigram → 키 (오타 조회)
+        self.compact: Dict[str, str] = {}
+        for alias, ticker in self.aliases.items():
+            key = _NON_ALNUM.sub("", alias)
+            if key:
+                self.compact.setdefault(key, ticker)
+        self._sorted_keys = sorted(self.compact)
+        self._jamo: Dict[str, str] = {key: decompose_jamo(key) for key in self._sorted_keys}
+        self._trigram_index: Dict[str, Set[str]] = {}
+        for key, jamo in self._jamo.items():
+            for gram in _trigrams(jamo):
+                self._trigram_index.setdefault(gram, set()).add(key)
+
+    def lookup(self, name: str) -> Optional[str]:
+        """이름(별칭 또는 티커) 하나를 정확히 일치하는 티커로 변환합니다."""
+        if name.upper() in self.tickers:
+            return name.upper()
+        return self.aliases.get(normalize_alias(name)) or self.compact.get(compact_alias(name))
+
+    def prefix_search(self, prefix: str, limit: int = 5) -> List[Tuple[str, str]]:
+        """접두어로 시작하는 (키, 티커) 목록. 짧은 키(정식 명칭에 가까운 것)부터 반환합니다."""
+        key = compact_alias(prefix)
+        if len(key) < MIN_PREFIX_LENGTH:
+            return []
+        start = bisect.bisect_left(self._sorted_keys, key)
+        found = []
+        for candidate in self._sorted_keys[start:]:
+            if not candidate.startswith(key):
+                break
+            found.append(candidate)
+        found.sort(key=len)
+        return [(candidate, self.compact[candidate]) for candidate in found[:limit]]
+
+    def fuzzy_search(self, name: str, limit: int = 5) -> List[Tuple[str, str, float]]:
+        """오타 허용 조회: trigram 후보를 모은 뒤 자모 단위 편집 거리로 확정합니다. (키, 티커, 점수)"""
+        jamo = decompose_jamo(compact_alias(name))
+        if len(jamo) < 4:
+            return []
+        overlap: Dict[str, int] = {}
+        for gram in _trigrams(jamo):
+            for key in self._trigram_index.get(gram, ()):
+                overlap[key] = overlap.get(key, 0) + 1
+        candidates = sorted(overlap, key=lambda key: (-overlap[key], len(key)))[:FUZZY_MAX_CANDIDATES]
+
+        max_distance = max(1, len(jamo) // 4)
+        scored = []
+        for key in candidates:
+            distance = edit_distance(jamo, self._jamo[key], max_distance)
+            if distance <= max_distance:
+                scored.append((key, self.compact[key], 1 - distance / max(len(jamo), len(self._jamo[key]))))
+        scored.sort(key=lambda item: (-item[2], len(item[0])))
+        return scored[:limit]
+
+    def resolve(self, query: str, limit: int = 5) -> List[AliasMatch]:
+        """
+        검색어를 티커 후보 목록으로 변환합니다. (DB/LLM 호출 없음)
+        정확히 일치하면 그 하나만, 아니면 접두어 → 오타 허용 순으로 후보를 모읍니다.
+        """
+        query = query.strip()
+        if not query:
+            return []
+        if query.upper() in self.tickers:
+            return [AliasMatch(query.upper(), query.upper(), "ticker", 1.0)]
+        exact = self.lookup(query)
+        if exact:
+            return [AliasMatch(exact, normalize_alias(query), "exact", 1.0)]
+
+        matches: List[AliasMatch] = []
+        key = compact_alias(query)
+        for alias, ticker in self.prefix_search(query, limit):
+            matches.append(AliasMatch(ticker, alias, "prefix", round(len(key) / len(alias), 3)))
+        if len(matches) < limit:
+            for alias, ticker, score in self.fuzzy_search(query, limit):
+                matches.append(AliasMatch(ticker, alias, "fuzzy", round(score, 3)))
+
+        resolved: List[AliasMatch] = []
+        for match in matches:
+            if all(match.ticker != existing.ticker for existing in resolved):
+                resolved.append(match)
+        return resolved[:limit]
+
+    def find_in_text(self, text: str, limit: int = 3) -> List[str]:
+        """문장에 등장하는 기업의 티커를 등장 순서대로 반환합니다."""
+        hits: List[Tuple[int, str]] = []
+
+        # 1) 대문자 티커 토큰 (NVDA, BRK.B, 005930.KS)
+        for match in _TICKER_TOKEN.finditer(text):
+            token = match.group(0)
+            if token in self.tickers and token not in _NON_TICKER_WORDS:
+                hits.append((match.start(), token))
+
+        # 2) 회사명/한글명 별칭 (조사가 붙어도 매칭되도록 부분 문자열 스캔, 단어 경계 확인)
+        lowered = text.lower()
+        position = 0
+        while position < len(lowered):
+            matched = None
+            for alias in self._buckets.get(lowered[position], ()):
+                if lowered.startswith(alias, position):
+                    # 영문 별칭은 단어 중간에서 시작/끝나지 않아야 함 ("meta" in "metadata" 방지)
+                    end = position + len(alias)
+                    if alias.isascii() and (
+                        (position > 0 and lowered[position - 1].isalnum())
+                        or (end < len(lowered) and lowered[end].isalnum())
+                    ):
+                        continue
+                    # 한글 별칭은 앞이 한글이 아니고 뒤는 조사만 허용 ("메타버스", "소비자" 방지)
+                    if _is_hangul(alias[0]) and _is_hangul(alias[-1]) and not _hangul_alias_boundary(lowered, position, end):
+                        continue
+                    matched = alias
+                    break
+            if matched:
+                hits.append((position, self.aliases[matched]))
+                position += len(matched)
+            else:
+                position += 1
+
+        found: List[str] = []
+        for _, ticker in sorted(hits):
+            if ticker not in found:
+                found.append(ticker)
+        return found[:limit]
+
+
+_index: Optional[CompanyAliasIndex] = None
+_loaded_at = 0.0
+
+
+def invalidate_alias_index() -> None:
+    """company_profiles나 승격된 학습 별칭이 바뀌면 다음 조회 때 다시 만들도록 표시합니다."""
+    global _index
+    _index = None
+
+
+def get_alias_index(db: Session) -> CompanyAliasIndex:
+    """인덱스를 반환합니다. 없거나 오래됐으면 company_profiles에서 다시 만듭니다."""
+    global _index, _loaded_at
+    if _index is None or time.monotonic() - _loaded_at > ALIAS_INDEX_REFRESH_SECONDS:
+        rows = (
+            db.query(
+                models.CompanyProfile.ticker,
+                models.CompanyProfile.companyName,
+                models.CompanyProfile.k_name,
+            )
+            .order_by(models.CompanyProfile.ticker)
+            .all()
+        )
+        learned = (
+            db.query(models.LearnedAlias.query_text, models.LearnedAlias.ticker)
+            .filter(models.LearnedAlias.promoted.is_(True))
+            .order_by(models.LearnedAlias.query_key)
+            .all()
+        )
+        _index = CompanyAliasIndex([tuple(row) for row in rows], [tuple(row) for row in learned])
+        _loaded_at = time.monotonic()
+        print(f"[Alias Index] {len(_index.tickers)}개 기업, 별칭 {len(_index.aliases)}개 로드")
+    return _index
@@ -0,0 +1,72 @@
+"""원천 데이터 버전 관리 모듈.
+
+재무제표/실적/뉴스를 저장하는 서비스가 같은 트랜잭션에서 (ticker, dataset) 버전을 올리고,
+채팅 답변 캐시(app/mcp/answer_cache.py)는 이 버전을 캐시 키에 넣습니다.
+데이터가 바뀌면 키가 달라지므로 이전 답변은 조회되지 않고 TTL에 따라 소멸합니다.
+"""
+# app/services/data_versions.py
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+
+from app import models
+
+KEY_METRICS = "key_metrics"
+CASH_FLOWS = "cash_flows"
+INCOME_STATEMENTS = "income_statements"
+BALANCE_SHEETS = "balance_sheets"
+EARNINGS_CALENDAR = "earnings_calendar"
+NEWS = "news"
+
+
+def build_data_version_bump(dataset: str, tickers: Iterable[str]):
+    """bump_data_versions가 실행하는 INSERT ... ON DUPLICATE KEY UPDATE 문. (티커가 없으면 None)"""
+    unique = sorted({ticker.upper() for ticker in tickers if ticker})
+    if not unique:
+        return None
+    now = datetime.utcnow()
+    table = models.DataVersion.__table__
+    stmt = mysql_insert(table).values([
+        {"ticker": ticker, "dataset": dataset, "version": 1, "updated_at": now}
+        for ticker in unique
+    ])
+    return stmt.on_duplicate_key_update(
+        version=table.c.version + 1,
+        updated_at=stmt.inserted.updated_at,
+    )
+
+
+def bump_data_versions(db: Session, dataset: str, tickers: Iterable[str]) -> None:
+    """
+    tickers의 dataset 버전을 1씩 올립니다. (없으면 1로 생성)
+    한 문장의 INSERT ... ON DUPLICATE KEY UPDATE 로 처리하며, commit은 호출하는 쪽에서 수행합니다.
+    """
+    stmt = build_data_version_bump(dataset, tickers)
+    if stmt is not None:
+        db.execute(stmt)
+
+
+def load_data_versions(
+    db: Session,
+    tickers: Iterable[str],
+    datasets: Iterable[str],
+) -> Dict[Tuple[str, str], int]:
+    """(ticker, dataset) → version. 한 번도 저장되지 않은 조합은 0으로 채웁니다."""
+    tickers = sorted({ticker.upper() for ticker in tickers})
+    datasets = sorted(set(datasets))
+    versions = {(ticker, dataset): 0 for ticker in tickers for dataset in datasets}
+    if not versions:
+        return versions
+    rows = (
+        db.query(models.DataVersion.ticker, models.DataVersion.dataset, models.DataVersion.version)
+        .filter(
+            models.DataVersion.ticker.in_(tickers),
+            models.DataVersion.dataset.in_(datasets),
+        )
+        .all()
+    )
+    for ticker, dataset, version in rows:
+        versions[(ticker, dataset)] = version
+    return versions
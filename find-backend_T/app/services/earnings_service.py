@@ -1,16 +1,93 @@
 """기업 실적(Earnings) 관련 서비스 로직을 정의하는 모듈."""
 # app/services/earnings_service.py
 import httpx, json
-from datetime import datetime, timedelta
+from datetime import datetime
 from sqlalchemy.orm import Session
 
 from typing import Dict, Any, Optional
 from app.config import FMP_API_KEY
 from app import models
+from app.cache import get_cached, set_cached
 from app.mcp.decorators import register_tool
+from app.services import transcript_store
+from app.services.data_versions import EARNINGS_CALENDAR, bump_data_versions
+from app.singleflight import single_flight
 
 FMP_BASE_URL = "https://financialmodelingprep.com/api/v3"
 
+TRANSCRIPT_LATEST_NAMESPACE = "earnings_transcript_latest"
+TRANSCRIPT_MAX_TOP_K = 10
+
+async def _refresh_transcript(
+    ticker: str,
+    db: Session,
+    client: httpx.AsyncClient,
+    year: Optional[int],
+    quarter: Optional[int],
+) -> Optional[Dict[str, int]]:
+    """FMP에서 전문을 받아 압축 저장합니다. 저장한 (year, quarter)를 반환 (없으면 None)."""
+    if year and quarter:
+        url = f"{FMP_BASE_URL}/earning_call_transcript/{ticker}?year={year}&quarter={quarter}&apikey={FMP_API_KEY}"
+    else:
+        # 최신순 조회 (리스트 반환)
+        url = f"{FMP_BASE_URL}/earning_call_transcript/{ticker}?limit=1&apikey={FMP_API_KEY}"
+
+    print(f"[Earnings Service] Transcript FMP 요청: {ticker} (Year: {year}, Q: {quarter})")
+    response = await client.get(url)
+    response.raise_for_status()
+    data = response.json()
+    transcript_data = (data[0] if data else None) if isinstance(data, list) else data
+    if not transcript_data:
+        return None
+
+    try:
+        transcript = transcript_store.store_transcript(db, transcript_data)
+        if transcript is None:
+            return None
+        stored = {"year": transcript.year, "quarter": transcript.quarter}
+        if not (year and quarter):
+            set_cached(db, TRANSCRIPT_LATEST_NAMESPACE, f"{TRANSCRIPT_LATEST_NAMESPACE}_{ticker}", stored)
+        db.commit()
+        return stored
+    except Exception:
+        db.rollback()
+        raise
+
+
+async def _load_transcript(
+    ticker: str,
+    db: Session,
+    client: httpx.AsyncClient,
+    year: Optional[int] = None,
+    quarter: Optional[int] = None,
+) -> Optional[models.EarningsCallTranscript]:
+    """
+    저장된 전문을 우선 사용하고, 없을 때만 FMP를 호출합니다.
+    year/quarter를 생략하면 "최신 분기" 조회 결과를 하루 동안 캐시해 그 분기의 저장본을 씁니다.
+    """
+    ticker = ticker.upper()
+    if year and quarter:
+        target = {"year": int(year), "quarter": int(quarter)}
+    else:
+        target = get_cached(db, TRANSCRIPT_LATEST_NAMESPACE, f"{TRANSCRIPT_LATEST_NAMESPACE}_{ticker}")
+
+    if target:
+        transcript = transcript_store.get_transcript(db, ticker, target["year"], target["quarter"])
+        if transcript is not None:
+            print(f"[Transcript HIT] {ticker} {target['year']}Q{target['quarter']}")
+            return transcript
+
+    # 같은 전문을 동시에 요청하면 FMP 호출/저장을 1회로 병합
+    stored = await single_flight(
+        ("earning_call_transcript", ticker, year, quarter),
+        lambda: _refresh_transcript(ticker, db, client, year, quarter),
+        db=db,
+    )
+    if not stored:
+        return None
+    return transcript_store.get_transcript(db, ticker, stored["year"], stored["quarter"])
+
+
 @register_tool
 async def fetch_earnings_call_transcript(
     ticker: str,
@@ -21,50 +98,67 @@ async def fetch_earnings_call_transcript(
 ) -> Dict[str, Any]:
     """
     특정 티커(ticker)의 실적발표 컨퍼런스 콜 전문(Transcript)을 조회합니다.
-    CEO와 임원진의 구체적인 발언, 질의응답 내용을 확인할 수 있어서 깊이 있는 분석에 필수적입니다.
+    전체 흐름 요약이 필요할 때만 사용하고, 특정 주제(가이던스, AI 수요 등)에 대한 발언은
+    search_earnings_call_transcript로 관련 문단만 조회하세요.
     year, quarter를 생략하면 가장 최신의 분기 데이터를 가져옵니다.
     """
-    # 1. 파라미터 구성
-    if year and quarter:
-        url = f"{FMP_BASE_URL}/earning_call_transcript/{ticker}?year={year}&quarter={quarter}&apikey={FMP_API_KEY}"
-    else:
-        # 최신순 조회 (리스트 반환)
-        url = f"{FMP_BASE_URL}/earning_call_transcript/{ticker}?limit=1&apikey={FMP_API_KEY}"
-
-    print(f"[Earnings Service] Transcript 요청: {ticker} (Year: {year}, Q: {quarter})")
-    
     try:
-        response = await client.get(url)
-        response.raise_for_status()
-        data = response.json()
-        
-        if not data:
-            return {"error": "해당 기간의 Transcript를 찾을 수 없습니다."}
-
-        # 리스트로 오는 경우 처리
-        if isinstance(data, list):
-            if not data:
-                 return {"error": "Transcript 데이터가 비어있습니다."}
-            transcript_data = data[0]
-        else:
-            transcript_data = data
-
-        # 2. 결과 반환 (너무 길 수 있으므로 핵심 메타데이터와 내용은 앞부분 + 요약 요청용으로 전체 반환)
-        # 주의: 전체 텍스트가 매우 길 수 있으므로, 프롬프트에서 잘라서 쓰거나 요약할 필요가 있음.
-        # 여기서는 원본을 다 넘겨주고 LLM이 처리하도록 함 (Token limit 주의 필요하지만 gpt-4o-mini 등은 128k context라 괜찮음)
-        
-        return {
-            "symbol": transcript_data.get("symbol"),
-            "quarter": transcript_data.get("quarter"),
-            "year": transcript_data.get("year"),
-            "date": transcript_data.get("date"),
-            "content": transcript_data.get("content") # 전체 텍스트
-        }
-
+        transcript = await _load_transcript(ticker, db, client, year, quarter)
     except Exception as e:
         print(f"fetch_earnings_call_transcript 에러: {e}")
         return {"error": f"Transcript 조회 실패: {str(e)}"}
 
+    if transcript is None:
+        return {"error": "해당 기간의 Transcript를 찾을 수 없습니다."}
+
+    # 전문은 도구 응답 압축 단계(app/mcp/compaction.py)에서 예산에 맞게 잘림
+    return {
+        "symbol": transcript.ticker,
+        "quarter": transcript.quarter,
+        "year": transcript.year,
+        "date": str(transcript.date) if transcript.date else None,
+        "content": transcript_store.transcript_content(transcript),  # 전체 텍스트
+    }
+
+
+@register_tool
+async def search_earnings_call_transcript(
+    ticker: str,
+    query: str,
+    db: Session,
+    client: httpx.AsyncClient,
+    year: int = None,
+    quarter: int = None,
+    top_k: int = 5,
+) -> Dict[str, Any]:
+    """
+    실적발표 컨퍼런스 콜에서 질문과 관련된 발언 문단(top_k개)만 검색합니다.
+    CEO/CFO 발언, 가이던스, 애널리스트 Q&A 등 특정 주제를 물을 때 전문 대신 사용하세요.
+    query는 전문이 영어이므로 영어 키워드로 작성합니다 (예: "data center demand guidance").
+    year, quarter를 생략하면 가장 최신의 분기 데이터를 검색합니다.
+    """
+    top_k = max(1, min(int(top_k or 5), TRANSCRIPT_MAX_TOP_K))
+    try:
+        transcript = await _load_transcript(ticker, db, client, year, quarter)
+    except Exception as e:
+        print(f"search_earnings_call_transcript 에러: {e}")
+        return {"error": f"Transcript 조회 실패: {str(e)}"}
+
+    if transcript is None:
+        return {"error": "해당 기간의 Transcript를 찾을 수 없습니다."}
+
+    passages = transcript_store.search_passages(transcript, query, top_k=top_k)
+    return {
+        "symbol": transcript.ticker,
+        "quarter": transcript.quarter,
+        "year": transcript.year,
+        "date": str(transcript.date) if transcript.date else None,
+        "query": query,
+        "total_passages": transcript_store.passage_count(transcript),
+        "passages": passages,
+        "note": None if passages else "관련 문단이 없습니다. 다른 영어 키워드로 다시 검색하세요.",
+    }
+
 
 @register_tool
 async def fetch_earnings_calendar(
@@ -79,14 +173,7 @@ async def fetch_earnings_calendar(
     cache_key = f"earnings_calendar_{ticker}"
     now = datetime.utcnow()
 
-    cache_hit = (
-        db.query(models.ApiCache)
-        .filter(
-            models.ApiCache.cache_key == cache_key,
-            models.ApiCache.expires_at > now,
-        )
-        .first()
-    )
+    cache_hit = get_cached(db, "earnings_calendar", cache_key)
 
     if not cache_hit:
         print(f"[{ticker}] Earnings Cache MISS -> FMP Fetching...")
@@ -136,13 +223,8 @@ async def fetch_earnings_calendar(
                     # Insert new
                     db.add(models.EarningsCalendar(**new_data))
 
-            db.merge(
-                models.ApiCache(
-                    cache_key=cache_key,
-                    data={"refreshed_at": now.isoformat()},
-                    expires_at=now + timedelta(hours=24),
-                )
-            )
+            set_cached(db, "earnings_calendar", cache_key, {"refreshed_at": now.isoformat()})
+            bump_data_versions(db, EARNINGS_CALENDAR, [ticker])
             db.commit()
         except Exception as e:
             db.rollback()
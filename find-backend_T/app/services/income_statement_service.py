@@ -11,6 +11,9 @@ from sqlalchemy.orm import Session
 from app import models
 from app.config import FMP_API_KEY, FMP_BASE_URL
 from app.mcp.decorators import register_tool
+from app.services.bulk_upsert import bulk_upsert
+from app.services.data_versions import INCOME_STATEMENTS, bump_data_versions
+from app.singleflight import single_flight
 
 INCOME_STATEMENT_URL = f"{FMP_BASE_URL}/income-statement"
 CACHE_TTL = timedelta(days=90)  # report_date 기준 3개월
@@ -24,6 +27,58 @@ def _extract_year(value: Any, fallback_date: datetime) -> int:
     return fallback_date.year
 
 
+async def _refresh_income_statements(
+    ticker: str,
+    normalized_period: str,
+    limit: int,
+    db: Session,
+    client: httpx.AsyncClient,
+) -> None:
+    """FMP에서 손익계산서를 받아 DB에 upsert 합니다. (single-flight 리더만 실행)"""
+    url = (
+        f"{INCOME_STATEMENT_URL}/{ticker}"
+        f"?period={normalized_period}&limit={limit}&apikey={FMP_API_KEY}"
+    )
+    try:
+        response = await client.get(url)
+        response.raise_for_status()
+        payload = response.json() or []
+    except Exception as exc:
+        print(f"fetch_company_income_statements 호출 실패: {exc}")
+        payload = []
+
+    rows = []
+    for item in payload:
+        date_raw = item.get("date")
+        try:
+            report_date = datetime.fromisoformat(date_raw).date() if date_raw else None
+        except ValueError:
+            report_date = None
+        if not report_date:
+            continue
+
+        rows.append({
+            "ticker": ticker,
+            "period": normalized_period,
+            "report_date": report_date,
+            "report_year": _extract_year(item.get("calendarYear"), datetime.combine(report_date, datetime.min.time())),
+            "revenue": item.get("revenue"),
+            "cost_of_revenue": item.get("costOfRevenue"),
+            "gross_profit": item.get("grossProfit"),
+            "operating_income": item.get("operatingIncome"),
+            "net_income": item.get("netIncome"),
+            "eps": item.get("eps"),
+            "diluted_eps": item.get("epsdiluted"),
+            "operating_expenses": item.get("operatingExpenses"),
+            "ebitda": item.get("ebitda"),
+        })
+
+    # 유니크 제약조건 (ticker, period, report_date) 기준 일괄 upsert → 1 statement, 1 commit
+    bulk_upsert(db, models.CompanyIncomeStatement, rows)
+    bump_data_versions(db, INCOME_STATEMENTS, [ticker])
+    db.commit()
+
+
 @register_tool
 async def fetch_company_income_statements(
     ticker: str,
@@ -79,69 +134,12 @@ async def fetch_company_income_statements(
             needs_update = False
 
     if needs_update:
-        url = (
-            f"{INCOME_STATEMENT_URL}/{ticker}"
-            f"?period={normalized_period}&limit={limit}&apikey={FMP_API_KEY}"
+        # 같은 (endpoint, ticker, period) 갱신이 진행 중이면 합류하여 FMP 호출/upsert를 1회로 병합
+        await single_flight(
+            (f"income-statement?limit={limit}", ticker, normalized_period),
+            lambda: _refresh_income_statements(ticker, normalized_period, limit, db, client),
+            db=db,
         )
-        try:
-            response = await client.get(url)
-            response.raise_for_status()
-            payload = response.json() or []
-        except Exception as exc:
-            print(f"fetch_company_income_statements 호출 실패: {exc}")
-            payload = []
-
-        for item in payload:
-            date_raw = item.get("date")
-            try:
-                report_date = datetime.fromisoformat(date_raw).date() if date_raw else None
-            except ValueError:
-                report_date = None
-            if not report_date:
-                continue
-
-            # 유니크 제약조건 (ticker, period, report_date)로 기존 레코드 찾기
-            existing = (
-                db.query(models.CompanyIncomeStatement)
-                .filter_by(
-                    ticker=ticker,
-                    period=normalized_period,
-                    report_date=report_date
-                )
-                .first()
-            )
-
-            if existing:
-                # 기존 레코드 업데이트
-                existing.report_year = _extract_year(item.get("calendarYear"), datetime.combine(report_date, datetime.min.time()))
-                existing.revenue = item.get("revenue")
-                existing.cost_of_revenue = item.get("costOfRevenue")
-                existing.gross_profit = item.get("grossProfit")
-                existing.operating_income = item.get("operatingIncome")
-                existing.net_income = item.get("netIncome")
-                existing.eps = item.get("eps")
-                existing.diluted_eps = item.get("epsdiluted")
-                existing.operating_expenses = item.get("operatingExpenses")
-                existing.ebitda = item.get("ebitda")
-            else:
-                # 새 레코드 추가
-                record = models.CompanyIncomeStatement(
-                    ticker=ticker,
-                    period=normalized_period,
-                    report_date=report_date,
-                    report_year=_extract_year(item.get("calendarYear"), datetime.combine(report_date, datetime.min.time())),
-                    revenue=item.get("revenue"),
-                    cost_of_revenue=item.get("costOfRevenue"),
-                    gross_profit=item.get("grossProfit"),
-                    operating_income=item.get("operatingIncome"),
-                    net_income=item.get("netIncome"),
-                    eps=item.get("eps"),
-                    diluted_eps=item.get("epsdiluted"),
-                    operating_expenses=item.get("operatingExpenses"),
-                    ebitda=item.get("ebitda"),
-                )
-                db.add(record)
-        db.commit()
 
     records = (
         db.query(models.CompanyIncomeStatement)
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 
 from app.config import FMP_API_KEY
 from app import models
+from app.cache import get_cached, set_cached
 from app.mcp.decorators import register_tool
 
 
@@ -26,17 +27,10 @@ async def fetch_insider_trades(
     cache_key = f"insider_trades_{ticker}"
     now = datetime.utcnow()
 
-    cache_hit = (
-        db.query(models.ApiCache)
-        .filter(
-            models.ApiCache.cache_key == cache_key,
-            models.ApiCache.expires_at > now,
-        )
-        .first()
-    )
+    cache_hit = get_cached(db, "insider_trades", cache_key)
 
     if not cache_hit:
-        print(f"[Cache MISS] FMP API 호출: insider-trading/{ticker}")
+        print(f"FMP API 호출: insider-trading/{ticker}")
         url = f"https://financialmodelingprep.com/api/v4/insider-trading?symbol={ticker}&limit={limit}&apikey={FMP_API_KEY}"
         try:
             response = await client.get(url)
@@ -54,13 +48,7 @@ async def fetch_insider_trades(
                     )
                 )
 
-            db.merge(
-                models.ApiCache(
-                    cache_key=cache_key,
-                    data={"refreshed_at": now.isoformat()},
-                    expires_at=now + timedelta(hours=24),
-                )
-            )
+            set_cached(db, "insider_trades", cache_key, {"refreshed_at": now.isoformat()})
             db.commit()
         except Exception as e:
             db.rollback()
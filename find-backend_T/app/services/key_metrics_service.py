@@ -3,15 +3,19 @@
 from __future__ import annotations
 
 import asyncio
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
 
 from app import models
 from app.config import FMP_API_KEY, FMP_BASE_URL
+from app.database import AnySession, db_commit, db_execute, db_rollback, sync_session_for
 from app.mcp.decorators import register_tool
+from app.services.bulk_upsert import build_bulk_upsert
+from app.services.data_versions import KEY_METRICS, build_data_version_bump
+from app.singleflight import single_flight
 from app.services.profile_service import fetch_company_profile
 
 # FMP v3 API (프리미엄)
@@ -45,10 +49,588 @@ def _get_int_metric(*values: Any) -> Optional[int]:
     return None
 
 
+def _derive_key_metrics_row(
+    ticker: str,
+    normalized_period: str,
+    date_str: str,
+    payload: Dict[str, Any],
+    quote_data: Dict[str, Any],
+    estimates_map: Dict[int, Dict[str, Any]],
+    balance_sheet: Optional[Dict[str, Any]],
+) -> Optional[Dict[str, Any]]:
+    """
+    한 기간(date_str)의 FMP 병합 데이터로 company_key_metrics 저장용 row를 계산합니다.
+
+    DB/API 접근 없이 미리 로드한 quote, estimates, 대차대조표 스냅샷만 사용하는 순수 함수입니다.
+    날짜/연도 파싱에 실패하면 None을 반환합니다.
+    """
+    try:
+        report_date = datetime.fromisoformat(date_str).date()
+    except ValueError:
+        print(f"[Warning] Invalid date format for {ticker}: {date_str}")
+        return None
+
+    # report_year 안전하게 파싱
+    raw_year = payload.get("calendarYear") or date_str[:4]
+    try:
+        report_year_val = int(raw_year)
+    except (ValueError, TypeError):
+        print(f"[Warning] Invalid report_year for {ticker} ({date_str}): {raw_year}")
+        return None
+
+    # --- 필드 매핑 및 데이터 정제 ---
+
+    # 1. Valuation Ratios
+    # [중요] 현재 주가와 주식 수 먼저 가져오기 (계산에 필요)
+    current_price = _get_metric(quote_data.get("price"))
+    shares_outstanding = _get_metric(
+        quote_data.get("sharesOutstanding"),
+        payload.get("numberOfShares")
+    )
+
+    # [FIX] PER - 직접 계산 우선 (FMP 값은 주가 타이밍 불일치 가능)
+    pe_ratio_fmp = _get_metric(
+        payload.get("peRatio"), 
+        payload.get("priceEarningsRatio")
+    )
+
+    # TTM EPS (더 최신 데이터)
+    current_eps = _get_metric(
+        quote_data.get("eps"),  # TTM EPS (우선순위 높음)
+        payload.get("netIncomePerShare")
+    )
+
+    pe_ratio = None
+    if current_price and current_eps and current_eps > 0:
+        # 직접 계산: PER = Price / EPS
+        pe_ratio = current_price / current_eps
+
+        if pe_ratio_fmp:
+            diff_pct = abs((pe_ratio - pe_ratio_fmp) / pe_ratio_fmp * 100)
+            if diff_pct > 10:
+                print(f"[PER Warning] {ticker} {report_date}: Calculated {pe_ratio:.2f} vs FMP {pe_ratio_fmp:.2f} (Diff {diff_pct:.1f}%)")
+                print(f"  - Price: ${current_price:.2f}, EPS: ${current_eps:.2f}")
+        else:
+            print(f"[PER Calculated] {ticker} {report_date}: {pe_ratio:.2f} (Price ${current_price:.2f} / EPS ${current_eps:.2f})")
+    else:
+        # Fallback: FMP 값 사용
+        pe_ratio = pe_ratio_fmp
+        if pe_ratio:
+            print(f"[PER Fallback] {ticker} {report_date}: Using FMP {pe_ratio:.2f} (Missing Price or EPS)")
+
+    # [NEW] Forward PE & PEG 계산
+    forward_pe = _get_metric(
+        payload.get("forwardPE"),
+        payload.get("peRatioForward"),
+        payload.get("priceEarningsRatio"),
+    )
+    peg_ratio = _get_metric(
+        payload.get("priceEarningsToGrowthRatio"),
+        payload.get("pegRatio"),
+        payload.get("pegRatioTTM"),
+    )
+
+    # [수정] 정확한 연도 매칭을 통한 예상 EPS 조회
+    # Forward PE는 통상 '다음 회계연도' 기준
+    target_year = report_year_val + 1
+    next_year_est = estimates_map.get(target_year)
+
+    estimated_eps_next = None
+    if next_year_est:
+        estimated_eps_next = _get_metric(
+            next_year_est.get("estimatedEpsAvg"),
+            next_year_est.get("estimatedEps")
+        )
+
+    # Forward PE 계산 (데이터가 없을 때만)
+    if forward_pe is None and current_price and estimated_eps_next and estimated_eps_next > 0:
+        # Forward PE = Price / Estimated EPS (Next Year)
+        forward_pe = current_price / estimated_eps_next
+
+    # PEG Ratio 계산 (데이터가 없을 때만)
+    # PEG = PE / Growth Rate
+    # Growth Rate = ((Estimated EPS(Next) - Current EPS) / Current EPS) * 100
+    current_eps = _get_metric(payload.get("netIncomePerShare"), quote_data.get("eps"))
+
+    if peg_ratio is None and pe_ratio and current_eps and estimated_eps_next:
+        try:
+            if abs(current_eps) > 0.01: # 0으로 나누기 방지
+                growth_rate = ((estimated_eps_next - current_eps) / abs(current_eps)) * 100
+                # [Wall Street Standard] PEG = Forward PE / Growth Rate
+                metric_pe = forward_pe if forward_pe and forward_pe > 0 else pe_ratio
+                if growth_rate > 0 and metric_pe:
+                    calc_peg = metric_pe / growth_rate
+                    # [Safety Check] PEG < 0.1 is usually a data error (implies >400% growth for PE 40)
+                    if calc_peg > 0.1:
+                        peg_ratio = calc_peg
+                    else:
+                        print(f"[Warning] PEG {calc_peg} too low, discarding.")
+        except Exception:
+            pass
+
+    price_to_sales_ratio = _get_metric(
+        payload.get("priceToSalesRatio"),
+        payload.get("priceToSalesRatioTTM"),
+    )
+
+    # [FIX] PBR - Balance Sheet에서 직접 계산 (FMP 값은 Equity 부정확)
+    # PBR = Price / Book Value Per Share
+    # Book Value Per Share = Total Equity / Shares Outstanding
+    price_to_book_ratio_fmp = _get_metric(
+        payload.get("priceToBookRatio"),
+        payload.get("priceBookValueRatio"),
+        payload.get("pbRatio"),
+    )
+
+    price_to_book_ratio = None
+    # 루프 전에 미리 로드한 Balance Sheet 스냅샷 사용 (D/E, Current Ratio와 공유)
+    try:
+        if balance_sheet and balance_sheet["total_equity"] and shares_outstanding and current_price:
+            # Book Value Per Share 계산
+            book_value_per_share = balance_sheet["total_equity"] / shares_outstanding
+
+            # PBR 계산
+            if book_value_per_share > 0:
+                price_to_book_ratio = current_price / book_value_per_share
+
+                if price_to_book_ratio_fmp:
+                    diff_pct = abs((price_to_book_ratio - price_to_book_ratio_fmp) / price_to_book_ratio_fmp * 100)
+                    if diff_pct > 10:
+                        print(f"[PBR Warning] {ticker} {report_date}: Calculated {price_to_book_ratio:.2f} vs FMP {price_to_book_ratio_fmp:.2f} (Diff {diff_pct:.1f}%)")
+                        print(f"  - Price: ${current_price:.2f}, BPS: ${book_value_per_share:.2f} (Equity: ${balance_sheet['total_equity']:.2f}B / Shares: {shares_outstanding:.2f}B)")
+                else:
+                    print(f"[PBR Calculated] {ticker} {report_date}: {price_to_book_ratio:.2f} (Price ${current_price:.2f} / BPS ${book_value_per_share:.2f})")
+        else:
+            # Fallback: FMP 값 사용
+            price_to_book_ratio = price_to_book_ratio_fmp
+            if price_to_book_ratio:
+                print(f"[PBR Fallback] {ticker} {report_date}: Using FMP {price_to_book_ratio:.2f} (Missing Balance Sheet or Shares)")
+    except Exception as e:
+        print(f"[PBR Error] {ticker} {report_date}: {e}")
+        price_to_book_ratio = price_to_book_ratio_fmp
+
+    enterprise_value_to_ebitda = _get_metric(
+        payload.get("enterpriseValueOverEBITDA"),
+        payload.get("enterpriseValueEbitdaRatio"),
+    )
+
+    # 2. Profitability & Returns
+    return_on_equity = _get_metric(
+        payload.get("returnOnEquity"),
+        payload.get("returnOnEquityTTM"),
+        payload.get("roe"),
+    )
+    return_on_assets = _get_metric(
+        payload.get("returnOnAssets"), 
+        payload.get("returnOnAssetsTTM")
+    )
+
+    # 3. Liquidity & Health
+    # [FIX] D/E Ratio - Balance Sheet에서 직접 계산 (FMP 값은 부정확)
+    # 
+    # [중요] 부채비율 계산 기준:
+    # - 총부채 기준 (Total Liabilities / Total Equity)
+    # - 유동부채 + 비유동부채 (매입채무, 차입금, 미지급금 등 모든 부채 포함)
+    # - 이자부담부채(차입금)만 계산하는 방식과는 다름
+    debt_to_equity = None
+
+    # Balance Sheet에서 Total Liabilities / Total Equity 계산
+    try:
+        if balance_sheet:
+            total_liabilities = balance_sheet["total_liabilities"]
+            total_equity = balance_sheet["total_equity"]
+
+            # D/E = Total Liabilities / Total Equity (총부채 기준)
+            # [금융 전문가 검증] 음의 자기자본 처리
+            if total_equity and total_liabilities is not None:
+                if total_equity > 0:
+                    debt_to_equity = total_liabilities / total_equity
+                elif total_equity < 0:
+                    # 음의 자기자본: 부채가 자산을 초과 (재무 위기 신호)
+                    debt_to_equity = None  # 의미 없는 값이므로 None 처리
+                    print(f"[D/E Warning] {ticker} {report_date}: Negative Equity ({total_equity}B) - 부채가 자산 초과!")
+                else:  # total_equity == 0
+                    debt_to_equity = None
+                    print(f"[D/E Warning] {ticker} {report_date}: Zero Equity - D/E 계산 불가")
+
+                # [추가 정보] 차입금 기준 부채비율도 계산 (참고용)
+                long_term_debt = balance_sheet["long_term_debt"] or 0
+                short_term_debt = balance_sheet["short_term_debt"] or 0
+                total_debt = long_term_debt + short_term_debt
+                debt_only_ratio = total_debt / total_equity if total_debt > 0 else 0
+
+                print(f"[D/E Calculated] {ticker} {report_date}:")
+                print(f"  - 총부채 기준: {total_liabilities:.2f}B / {total_equity:.2f}B = {debt_to_equity:.4f} (Total Liabilities)")
+                print(f"  - 차입금 기준: {total_debt:.2f}B / {total_equity:.2f}B = {debt_only_ratio:.4f} (Interest-Bearing Debt Only)")
+            else:
+                print(f"[D/E Warning] {ticker} {report_date}: Equity is zero or missing")
+        else:
+            # Fallback: FMP API 값 (신뢰도 낮음)
+            debt_to_equity = _get_metric(
+                payload.get("debtToEquity"),
+                payload.get("debtEquityRatio"),
+                payload.get("debtEquityTTM"),
+            )
+            if debt_to_equity:
+                print(f"[D/E Fallback] {ticker} {report_date}: Using FMP value {debt_to_equity:.4f} (BS not found)")
+    except Exception as e:
+        print(f"[D/E Error] {ticker} {report_date}: {e}")
+        # Final Fallback
+        debt_to_equity = _get_metric(
+            payload.get("debtToEquity"),
+            payload.get("debtEquityRatio"),
+            payload.get("debtEquityTTM"),
+        )
+
+    # [FIX] Current Ratio - Balance Sheet에서 직접 계산
+    current_ratio = None
+
+    try:
+        if balance_sheet:
+            current_assets = balance_sheet["total_current_assets"]
+            current_liabilities = balance_sheet["total_current_liabilities"]
+
+            # Current Ratio = Current Assets / Current Liabilities
+            if current_liabilities and current_liabilities > 0 and current_assets is not None:
+                current_ratio = current_assets / current_liabilities
+                print(f"[CR Calculated] {ticker} {report_date}: {current_assets:.2f}B / {current_liabilities:.2f}B = {current_ratio:.4f}")
+            else:
+                # Fallback: FMP API 값
+                current_ratio = _get_metric(
+                    payload.get("currentRatio"), 
+                    payload.get("currentRatioTTM")
+                )
+        else:
+            # Fallback: FMP API 값
+            current_ratio = _get_metric(
+                payload.get("currentRatio"), 
+                payload.get("currentRatioTTM")
+            )
+    except Exception as e:
+        print(f"[CR Error] {ticker} {report_date}: {e}")
+        current_ratio = _get_metric(
+            payload.get("currentRatio"), 
+            payload.get("currentRatioTTM")
+        )
+
+    # 4. Per Share Metrics
+    revenue_per_share = _get_metric(payload.get("revenuePerShare"))
+    net_income_per_share = _get_metric(payload.get("netIncomePerShare"))
+    book_value_per_share = _get_metric(payload.get("bookValuePerShare"))
+    free_cash_flow_per_share = _get_metric(
+        payload.get("freeCashFlowPerShare")
+    )
+    dividend_yield = _get_metric(payload.get("dividendYield"))
+
+    # 5. Market Data (Integer conversion)
+    # [NEW] Quote 데이터 fallback 추가
+    shares_outstanding = _get_int_metric(
+        payload.get("weightedAverageSharesOutstanding"),
+        payload.get("sharesOutstanding"),
+        payload.get("commonStockSharesOutstanding"),
+        payload.get("weightedAverageShsOut"),
+        quote_data.get("sharesOutstanding") # Fallback
+    )
+    market_cap = _get_int_metric(
+        payload.get("marketCap"),
+        quote_data.get("marketCap") # Fallback
+    )
+
+    row = {
+        "ticker": ticker,
+        "period": normalized_period,
+        "report_date": report_date,
+        "report_year": report_year_val,
+        "pe_ratio": pe_ratio,
+        "forward_pe": forward_pe,
+        "peg_ratio": peg_ratio,
+        "enterprise_value_to_ebitda": enterprise_value_to_ebitda,
+        "price_to_book_ratio": price_to_book_ratio,
+        "return_on_equity": return_on_equity,
+        "return_on_assets": return_on_assets,
+        "debt_to_equity": debt_to_equity,
+        "current_ratio": current_ratio,
+        "dividend_yield": dividend_yield,
+        "book_value_per_share": book_value_per_share,
+        "free_cash_flow_per_share": free_cash_flow_per_share,
+        "shares_outstanding": shares_outstanding,
+        "market_cap": market_cap,
+        "revenue_per_share": revenue_per_share,
+        "net_income_per_share": net_income_per_share,
+        "price_to_sales_ratio": price_to_sales_ratio,
+    }
+    de_str = f"{debt_to_equity:.4f}" if debt_to_equity is not None else "None"
+    cr_str = f"{current_ratio:.4f}" if current_ratio is not None else "None"
+    print(f"[Key Metrics] Prepared {ticker} {report_date}: D/E={de_str}, CR={cr_str}")
+    return row
+
+
+async def _load_balance_sheets(
+    db: AnySession,
+    ticker: str,
+    normalized_period: str,
+    report_dates: List[date],
+) -> Dict[str, Dict[str, Any]]:
+    """(ticker, period)의 대차대조표를 한 번의 쿼리로 읽어 'YYYY-MM-DD' → 스냅샷 dict로 반환합니다."""
+    if not report_dates:
+        return {}
+    result = await db_execute(db, select(models.CompanyBalanceSheet).where(
+        models.CompanyBalanceSheet.ticker == ticker,
+        models.CompanyBalanceSheet.period == normalized_period,
+        models.CompanyBalanceSheet.report_date.in_(report_dates),
+    ))
+    records = result.scalars().all()
+    return {
+        record.report_date.isoformat(): {
+            "total_equity": record.total_equity,
+            "total_liabilities": record.total_liabilities,
+            "total_current_assets": record.total_current_assets,
+            "total_current_liabilities": record.total_current_liabilities,
+            "long_term_debt": record.long_term_debt,
+            "short_term_debt": record.short_term_debt,
+        }
+        for record in records
+    }
+
+
+async def _preload_balance_sheets(
+    ticker: str,
+    normalized_period: str,
+    date_strs: List[str],
+    limit: int,
+    db: AnySession,
+    client: httpx.AsyncClient,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Key Metrics 계산에 필요한 대차대조표를 미리 로드합니다.
+
+    누락되었거나 Equity가 비어 있는 기간이 있으면 fetch_company_balance_sheets를
+    루프 전에 1회만 호출한 뒤 다시 로드합니다.
+    """
+    report_dates = []
+    for date_str in date_strs:
+        try:
+            report_dates.append(datetime.fromisoformat(date_str).date())
+        except ValueError:
+            continue
+
+    balance_sheets = await _load_balance_sheets(db, ticker, normalized_period, report_dates)
+    missing = [
+        d for d in report_dates
+        if not (balance_sheets.get(d.isoformat()) or {}).get("total_equity")
+    ]
+    if not missing:
+        return balance_sheets
+
+    print(f"[D/E] Balance Sheet missing/incomplete for {ticker} ({len(missing)}개 기간), fetching from API once...")
+    from app.services.balance_sheet_service import fetch_company_balance_sheets
+    # balance_sheet_service는 아직 동기 Session만 받음 (캐시 MISS 경로에서만 실행)
+    with sync_session_for(db) as sync_db:
+        try:
+            # fetch_company_balance_sheets 내부에서 이미 commit
+            await fetch_company_balance_sheets(ticker, sync_db, client, normalized_period, limit=limit)
+        except Exception as fetch_error:
+            print(f"[D/E] Failed to fetch Balance Sheet: {fetch_error}")
+            # 에러 발생 시 세션 롤백하여 다음 처리 가능하도록
+            sync_db.rollback()
+            return balance_sheets
+
+    # 다른 세션이 커밋한 행이 보이도록 현재 트랜잭션(REPEATABLE READ 스냅샷) 종료
+    await db_commit(db)
+    return await _load_balance_sheets(db, ticker, normalized_period, report_dates)
+
+
+async def _refresh_key_metrics(
+    ticker: str,
+    normalized_period: str,
+    limit: int,
+    db: AnySession,
+    client: httpx.AsyncClient,
+    cache_enabled: bool = True,
+) -> None:
+    """FMP 4개 API를 병렬 호출해 Key Metrics를 계산하고 DB에 upsert 합니다. (single-flight 리더만 실행)"""
+    merged_data: Dict[str, Dict[str, Any]] = {}
+
+    print(f"[Cache MISS] FMP API 4개 동시 호출: key-metrics, ratios, quote, estimates ({ticker})")
+
+    # --- 3. [핵심] 4개의 API를 병렬 호출 ---
+    try:
+        # 1) /key-metrics 호출
+        url_metrics = (
+            f"{KEY_METRICS_URL}/{ticker}"
+            f"?period={normalized_period}&limit={limit}&apikey={FMP_API_KEY}"
+        )
+        # 2) /financial-ratios 호출
+        url_ratios = (
+            f"{FINANCIAL_RATIOS_URL}/{ticker}"
+            f"?period={normalized_period}&limit={limit}&apikey={FMP_API_KEY}"
+        )
+        # 3) /quote 호출 (현재 주가, 주식 수)
+        url_quote = f"{QUOTE_URL}/{ticker}?apikey={FMP_API_KEY}"
+        
+        # 4) /analyst-estimates 호출 (미래 EPS -> Forward PE, PEG 계산용)
+        # [수정] limit=30으로 늘려서 전체 연도 데이터를 가져옴 (정확한 매칭 위해)
+        url_estimates = f"{ESTIMATES_URL}/{ticker}?period=annual&limit=30&apikey={FMP_API_KEY}"
+
+        # asyncio.gather로 병렬 실행
+        responses = await asyncio.gather(
+            client.get(url_metrics),
+            client.get(url_ratios),
+            client.get(url_quote),
+            client.get(url_estimates),
+            return_exceptions=True
+        )
+
+        # 응답 처리
+        resp_metrics, resp_ratios, resp_quote, resp_estimates = responses
+
+        metrics_data = []
+        if isinstance(resp_metrics, httpx.Response) and resp_metrics.status_code == 200:
+            metrics_data = resp_metrics.json() or []
+        
+        ratios_data = []
+        if isinstance(resp_ratios, httpx.Response) and resp_ratios.status_code == 200:
+            ratios_data = resp_ratios.json() or []
+            
+        quote_data = {}
+        if isinstance(resp_quote, httpx.Response) and resp_quote.status_code == 200:
+            q_list = resp_quote.json()
+            if q_list and isinstance(q_list, list):
+                quote_data = q_list[0]
+        
+        estimates_map = {}
+        if isinstance(resp_estimates, httpx.Response) and resp_estimates.status_code == 200:
+            e_list = resp_estimates.json()
+            if e_list and isinstance(e_list, list):
+                for est in e_list:
+                    # date: "2025-09-27" -> year: 2025
+                    est_date = est.get("date")
+                    if est_date:
+                        try:
+                            y = int(est_date.split("-")[0])
+                            estimates_map[y] = est
+                        except (ValueError, IndexError):
+                            pass
+
+        # 3) 'date'를 기준으로 두 API 응답을 딕셔너리로 병합 (Safe Merge)
+        # metrics_data를 기본으로 설정
+        for item in metrics_data:
+            date = item.get("date")
+            if date:
+                merged_data[date] = item.copy()
+
+        # ratios_data를 병합
+        for item in ratios_data:
+            date = item.get("date")
+            if not date:
+                continue
+
+            if date not in merged_data:
+                merged_data[date] = item.copy()
+            else:
+                # Safe Merge
+                for key, value in item.items():
+                    if value is not None:
+                        merged_data[date][key] = value
+
+        # 4) PBR/D/E/Current Ratio 계산용 Balance Sheet를 한 번에 로드
+        #    (없거나 Equity가 빠진 기간이 있으면 루프 전에 1회만 API 보강)
+        balance_sheets = await _preload_balance_sheets(
+            ticker, normalized_period, list(merged_data.keys()), limit, db, client
+        )
+
+        # 5) DB에 UPSERT (행을 모아 한 번에 저장)
+        rows: List[Dict[str, Any]] = []
+        for date_str, payload in merged_data.items():
+            try:
+                row = _derive_key_metrics_row(
+                    ticker,
+                    normalized_period,
+                    date_str,
+                    payload,
+                    quote_data,
+                    estimates_map,
+                    balance_sheets.get(date_str[:10]),
+                )
+                if row:
+                    rows.append(row)
+            except Exception as e:
+                print(f"[Error] Failed to process key metrics record for {ticker} ({date_str}): {e}")
+                continue
+
+        # 변경사항 커밋
+        if cache_enabled:
+            # 유니크 제약조건 (ticker, period, report_date) 기준 일괄 upsert → 1 statement, 1 commit
+            upsert = build_bulk_upsert(models.CompanyKeyMetrics, rows)
+            if upsert is not None:
+                await db_execute(db, upsert)
+            # 원천 데이터가 바뀌었으므로 사전 계산본 무효화 (다음 조회 시 재계산)
+            await invalidate_derived_metrics(db, ticker, normalized_period)
+            await db_execute(db, build_data_version_bump(KEY_METRICS, [ticker]))
+            await db_commit(db)  # key_metrics 데이터를 DB에 확정
+            print(f"[Key Metrics] DB commit successful for {ticker} ({len(rows)} records)")
+        else:
+            print(f"[Key Metrics] Skipped DB save (cache_enabled=False) for {ticker}")
+    except Exception as e:
+        await db_rollback(db)
+        print(f"fetch_company_key_metrics API/DB 에러: {e}")
+        # API 호출이 실패해도, DB에 있는 기존 데이터라도 반환
+
+
+async def _load_derived_metrics(
+    db: AnySession,
+    ticker: str,
+    normalized_period: str,
+    limit: int,
+) -> Optional[Dict[str, Any]]:
+    """유효기간(CACHE_TTL) 안의 사전 계산본이 있으면 payload를 반환합니다."""
+    result = await db_execute(db, select(models.CompanyDerivedMetrics).filter_by(
+        ticker=ticker, period=normalized_period, row_limit=limit
+    ))
+    derived = result.scalars().first()
+    if derived and derived.computed_at > datetime.utcnow() - CACHE_TTL:
+        return derived.payload
+    return None
+
+
+async def _store_derived_metrics(
+    db: AnySession,
+    ticker: str,
+    normalized_period: str,
+    limit: int,
+    result: Dict[str, Any],
+) -> None:
+    """최종 응답을 company_derived_metrics에 upsert 합니다. (데이터가 없으면 저장하지 않음)"""
+    if not result.get("history"):
+        return
+    try:
+        await db_execute(db, build_bulk_upsert(models.CompanyDerivedMetrics, [{
+            "ticker": ticker,
+            "period": normalized_period,
+            "row_limit": limit,
+            "payload": result,
+            "computed_at": datetime.utcnow(),
+        }]))
+        await db_commit(db)
+    except Exception as e:
+        await db_rollback(db)
+        print(f"[Derived Metrics] 저장 실패 ({ticker}): {e}")
+
+
+async def invalidate_derived_metrics(db: AnySession, ticker: str, normalized_period: str) -> None:
+    """(ticker, period)의 모든 row_limit 사전 계산본을 삭제합니다. commit은 호출하는 쪽에서 수행합니다."""
+    await db_execute(
+        db,
+        delete(models.CompanyDerivedMetrics)
+        .filter_by(ticker=ticker, period=normalized_period)
+        .execution_options(synchronize_session=False),
+    )
+
+
 @register_tool
 async def fetch_company_key_metrics(
     ticker: str,
-    db: Session,
+    db: AnySession,
     client: httpx.AsyncClient,
     period: str = "annual",
     limit: int = 5,
@@ -76,13 +658,23 @@ async def fetch_company_key_metrics(
     max_limit = 20 if normalized_period == "quarter" else 8
     limit = max(1, min(limit, max_limit))
 
-    # --- 0. 프로필 보강 [수정됨] ---
+    # --- 0. 사전 계산된 파생 지표 (단일 인덱스 SELECT) ---
+    derived = await _load_derived_metrics(db, ticker, normalized_period, limit)
+    if derived is not None:
+        print(f"[Cache HIT] 파생 지표 테이블에서 Key Metrics ({ticker}) 조회")
+        return derived
+
+    # --- 1. 프로필 보강 [수정됨] ---
     # profile_service가 commit을 하므로, 우리는 DB에서 조회만 합니다.
-    db_profile = db.query(models.CompanyProfile).filter_by(ticker=ticker).first()
+    db_profile = (
+        await db_execute(db, select(models.CompanyProfile.ticker).filter_by(ticker=ticker))
+    ).first()
 
     if not db_profile:
         # DB에 없으면, profile_service를 '선행 호출'하여 DB에 생성시킴
-        profile_result = await fetch_company_profile(ticker=ticker, db=db, client=client)
+        # (profile_service는 아직 동기 Session만 받음 - 티커당 최초 1회 경로)
+        with sync_session_for(db) as sync_db:
+            profile_result = await fetch_company_profile(ticker=ticker, db=sync_db, client=client)
 
         if not profile_result:
             # 선행 호출(API)까지 실패하면, key_metrics 저장이 불가능하므로 포기
@@ -93,22 +685,24 @@ async def fetch_company_key_metrics(
                 "summary": "회사 프로필 정보를 확보하지 못해 PER 데이터를 저장/조회할 수 없습니다.",
             }
 
-        # 선행 호출이 성공했으므로, db_profile을 다시 조회 (필수는 아니지만 안전함)
-        db_profile = db.query(models.CompanyProfile).filter_by(ticker=ticker).first()
+        # 선행 호출이 다른 세션에서 커밋했을 수 있으므로 현재 스냅샷 종료
+        await db_commit(db)
 
     # [수정] cache_enabled는 Foreign Key와 관계 없음
     cache_enabled = True
 
     # --- 2. [핵심] 캐시 전략 (24시간 TTL) ---
     latest_in_db = (
-        db.query(models.CompanyKeyMetrics)
-        .filter_by(ticker=ticker, period=normalized_period)
-        .order_by(models.CompanyKeyMetrics.report_date.desc())
-        .first()
-    )
+        await db_execute(
+            db,
+            select(models.CompanyKeyMetrics)
+            .filter_by(ticker=ticker, period=normalized_period)
+            .order_by(models.CompanyKeyMetrics.report_date.desc())
+            .limit(1),
+        )
+    ).scalars().first()
 
     needs_update = True
-    merged_data: Dict[str, Dict[str, Any]] = {}
     
     if latest_in_db and latest_in_db.created_at:
         if latest_in_db.created_at > datetime.utcnow() - CACHE_TTL:
@@ -116,490 +710,37 @@ async def fetch_company_key_metrics(
             print(f"[Cache HIT] DB에서 Key Metrics ({ticker}) 조회")
 
     if needs_update:
-        print(f"[Cache MISS] FMP API 4개 동시 호출: key-metrics, ratios, quote, estimates ({ticker})")
-
-        # --- 3. [핵심] 4개의 API를 병렬 호출 ---
-        try:
-            # 1) /key-metrics 호출
-            url_metrics = (
-                f"{KEY_METRICS_URL}/{ticker}"
-                f"?period={normalized_period}&limit={limit}&apikey={FMP_API_KEY}"
-            )
-            # 2) /financial-ratios 호출
-            url_ratios = (
-                f"{FINANCIAL_RATIOS_URL}/{ticker}"
-                f"?period={normalized_period}&limit={limit}&apikey={FMP_API_KEY}"
-            )
-            # 3) /quote 호출 (현재 주가, 주식 수)
-            url_quote = f"{QUOTE_URL}/{ticker}?apikey={FMP_API_KEY}"
-            
-            # 4) /analyst-estimates 호출 (미래 EPS -> Forward PE, PEG 계산용)
-            # [수정] limit=30으로 늘려서 전체 연도 데이터를 가져옴 (정확한 매칭 위해)
-            url_estimates = f"{ESTIMATES_URL}/{ticker}?period=annual&limit=30&apikey={FMP_API_KEY}"
-
-            # asyncio.gather로 병렬 실행
-            responses = await asyncio.gather(
-                client.get(url_metrics),
-                client.get(url_ratios),
-                client.get(url_quote),
-                client.get(url_estimates),
-                return_exceptions=True
-            )
-
-            # 응답 처리
-            resp_metrics, resp_ratios, resp_quote, resp_estimates = responses
-
-            metrics_data = []
-            if isinstance(resp_metrics, httpx.Response) and resp_metrics.status_code == 200:
-                metrics_data = resp_metrics.json() or []
-            
-            ratios_data = []
-            if isinstance(resp_ratios, httpx.Response) and resp_ratios.status_code == 200:
-                ratios_data = resp_ratios.json() or []
-                
-            quote_data = {}
-            if isinstance(resp_quote, httpx.Response) and resp_quote.status_code == 200:
-                q_list = resp_quote.json()
-                if q_list and isinstance(q_list, list):
-                    quote_data = q_list[0]
-            
-            estimates_map = {}
-            if isinstance(resp_estimates, httpx.Response) and resp_estimates.status_code == 200:
-                e_list = resp_estimates.json()
-                if e_list and isinstance(e_list, list):
-                    for est in e_list:
-                        # date: "2025-09-27" -> year: 2025
-                        est_date = est.get("date")
-                        if est_date:
-                            try:
-                                y = int(est_date.split("-")[0])
-                                estimates_map[y] = est
-                            except (ValueError, IndexError):
-                                pass
-
-            # 3) 'date'를 기준으로 두 API 응답을 딕셔너리로 병합 (Safe Merge)
-            # metrics_data를 기본으로 설정
-            for item in metrics_data:
-                date = item.get("date")
-                if date:
-                    merged_data[date] = item.copy()
-
-            # ratios_data를 병합
-            for item in ratios_data:
-                date = item.get("date")
-                if not date:
-                    continue
-
-                if date not in merged_data:
-                    merged_data[date] = item.copy()
-                else:
-                    # Safe Merge
-                    for key, value in item.items():
-                        if value is not None:
-                            merged_data[date][key] = value
-
-            # 4) DB에 UPSERT
-            for date_str, payload in merged_data.items():
-                try:
-                    try:
-                        report_date = datetime.fromisoformat(date_str).date()
-                    except ValueError:
-                        print(f"[Warning] Invalid date format for {ticker}: {date_str}")
-                        continue
-
-                    # report_year 안전하게 파싱
-                    raw_year = payload.get("calendarYear") or date_str[:4]
-                    try:
-                        report_year_val = int(raw_year)
-                    except (ValueError, TypeError):
-                        print(f"[Warning] Invalid report_year for {ticker} ({date_str}): {raw_year}")
-                        continue
-
-                    # 기존 레코드 조회
-                    existing_record = db.query(models.CompanyKeyMetrics).filter_by(
-                        ticker=ticker,
-                        period=normalized_period,
-                        report_date=report_date
-                    ).first()
-
-                    # --- 필드 매핑 및 데이터 정제 ---
-                    
-                    # 1. Valuation Ratios
-                    # [중요] 현재 주가와 주식 수 먼저 가져오기 (계산에 필요)
-                    current_price = _get_metric(quote_data.get("price"))
-                    shares_outstanding = _get_metric(
-                        quote_data.get("sharesOutstanding"),
-                        payload.get("numberOfShares")
-                    )
-                    
-                    # [FIX] PER - 직접 계산 우선 (FMP 값은 주가 타이밍 불일치 가능)
-                    pe_ratio_fmp = _get_metric(
-                        payload.get("peRatio"), 
-                        payload.get("priceEarningsRatio")
-                    )
-                    
-                    # TTM EPS (더 최신 데이터)
-                    current_eps = _get_metric(
-                        quote_data.get("eps"),  # TTM EPS (우선순위 높음)
-                        payload.get("netIncomePerShare")
-                    )
-                    
-                    pe_ratio = None
-                    if current_price and current_eps and current_eps > 0:
-                        # 직접 계산: PER = Price / EPS
-                        pe_ratio = current_price / current_eps
-                        
-                        if pe_ratio_fmp:
-                            diff_pct = abs((pe_ratio - pe_ratio_fmp) / pe_ratio_fmp * 100)
-                            if diff_pct > 10:
-                                print(f"[PER Warning] {ticker} {report_date}: Calculated {pe_ratio:.2f} vs FMP {pe_ratio_fmp:.2f} (Diff {diff_pct:.1f}%)")
-                                print(f"  - Price: ${current_price:.2f}, EPS: ${current_eps:.2f}")
-                        else:
-                            print(f"[PER Calculated] {ticker} {report_date}: {pe_ratio:.2f} (Price ${current_price:.2f} / EPS ${current_eps:.2f})")
-                    else:
-                        # Fallback: FMP 값 사용
-                        pe_ratio = pe_ratio_fmp
-                        if pe_ratio:
-                            print(f"[PER Fallback] {ticker} {report_date}: Using FMP {pe_ratio:.2f} (Missing Price or EPS)")
-                    
-                    # [NEW] Forward PE & PEG 계산
-                    forward_pe = _get_metric(
-                        payload.get("forwardPE"),
-                        payload.get("peRatioForward"),
-                        payload.get("priceEarningsRatio"),
-                    )
-                    peg_ratio = _get_metric(
-                        payload.get("priceEarningsToGrowthRatio"),
-                        payload.get("pegRatio"),
-                        payload.get("pegRatioTTM"),
-                    )
-                    
-                    # [수정] 정확한 연도 매칭을 통한 예상 EPS 조회
-                    # Forward PE는 통상 '다음 회계연도' 기준
-                    target_year = report_year_val + 1
-                    next_year_est = estimates_map.get(target_year)
-                    
-                    estimated_eps_next = None
-                    if next_year_est:
-                        estimated_eps_next = _get_metric(
-                            next_year_est.get("estimatedEpsAvg"),
-                            next_year_est.get("estimatedEps")
-                        )
-
-                    # Forward PE 계산 (데이터가 없을 때만)
-                    if forward_pe is None and current_price and estimated_eps_next and estimated_eps_next > 0:
-                        # Forward PE = Price / Estimated EPS (Next Year)
-                        forward_pe = current_price / estimated_eps_next
-                    
-                    # PEG Ratio 계산 (데이터가 없을 때만)
-                    # PEG = PE / Growth Rate
-                    # Growth Rate = ((Estimated EPS(Next) - Current EPS) / Current EPS) * 100
-                    current_eps = _get_metric(payload.get("netIncomePerShare"), quote_data.get("eps"))
-                    
-                    if peg_ratio is None and pe_ratio and current_eps and estimated_eps_next:
-                        try:
-                            if abs(current_eps) > 0.01: # 0으로 나누기 방지
-                                growth_rate = ((estimated_eps_next - current_eps) / abs(current_eps)) * 100
-                                # [Wall Street Standard] PEG = Forward PE / Growth Rate
-                                metric_pe = forward_pe if forward_pe and forward_pe > 0 else pe_ratio
-                                if growth_rate > 0 and metric_pe:
-                                    calc_peg = metric_pe / growth_rate
-                                    # [Safety Check] PEG < 0.1 is usually a data error (implies >400% growth for PE 40)
-                                    if calc_peg > 0.1:
-                                        peg_ratio = calc_peg
-                                    else:
-                                        print(f"[Warning] PEG {calc_peg} too low, discarding.")
-                        except Exception:
-                            pass
+        # 같은 (endpoint, ticker, period) 갱신이 진행 중이면 합류하여 FMP 호출/upsert를 1회로 병합
+        await single_flight(
+            (f"key-metrics?limit={limit}", ticker, normalized_period),
+            lambda: _refresh_key_metrics(ticker, normalized_period, limit, db, client, cache_enabled),
+            db=db,
+        )
+
+    # --- 4. 최종 응답 계산 후 파생 지표 테이블에 저장 ---
+    final_result = await _build_key_metrics_result(db, ticker, normalized_period, limit)
+    await _store_derived_metrics(db, ticker, normalized_period, limit, final_result)
+    return final_result
 
-                    price_to_sales_ratio = _get_metric(
-                        payload.get("priceToSalesRatio"),
-                        payload.get("priceToSalesRatioTTM"),
-                    )
-                    
-                    # [FIX] PBR - Balance Sheet에서 직접 계산 (FMP 값은 Equity 부정확)
-                    # PBR = Price / Book Value Per Share
-                    # Book Value Per Share = Total Equity / Shares Outstanding
-                    price_to_book_ratio_fmp = _get_metric(
-                        payload.get("priceToBookRatio"),
-                        payload.get("priceBookValueRatio"),
-                        payload.get("pbRatio"),
-                    )
-                    
-                    price_to_book_ratio = None
-                    # D/E Ratio 계산에서 이미 Balance Sheet를 가져왔으므로 재사용
-                    try:
-                        balance_sheet = db.query(models.CompanyBalanceSheet).filter_by(
-                            ticker=ticker,
-                            period=normalized_period,
-                            report_date=report_date
-                        ).first()
-                        
-                        if balance_sheet and balance_sheet.total_equity and shares_outstanding and current_price:
-                            # Book Value Per Share 계산
-                            book_value_per_share = balance_sheet.total_equity / shares_outstanding
-                            
-                            # PBR 계산
-                            if book_value_per_share > 0:
-                                price_to_book_ratio = current_price / book_value_per_share
-                                
-                                if price_to_book_ratio_fmp:
-                                    diff_pct = abs((price_to_book_ratio - price_to_book_ratio_fmp) / price_to_book_ratio_fmp * 100)
-                                    if diff_pct > 10:
-                                        print(f"[PBR Warning] {ticker} {report_date}: Calculated {price_to_book_ratio:.2f} vs FMP {price_to_book_ratio_fmp:.2f} (Diff {diff_pct:.1f}%)")
-                                        print(f"  - Price: ${current_price:.2f}, BPS: ${book_value_per_share:.2f} (Equity: ${balance_sheet.total_equity:.2f}B / Shares: {shares_outstanding:.2f}B)")
-                                else:
-                                    print(f"[PBR Calculated] {ticker} {report_date}: {price_to_book_ratio:.2f} (Price ${current_price:.2f} / BPS ${book_value_per_share:.2f})")
-                        else:
-                            # Fallback: FMP 값 사용
-                            price_to_book_ratio = price_to_book_ratio_fmp
-                            if price_to_book_ratio:
-                                print(f"[PBR Fallback] {ticker} {report_date}: Using FMP {price_to_book_ratio:.2f} (Missing Balance Sheet or Shares)")
-                    except Exception as e:
-                        print(f"[PBR Error] {ticker} {report_date}: {e}")
-                        price_to_book_ratio = price_to_book_ratio_fmp
-                    
-                    enterprise_value_to_ebitda = _get_metric(
-                        payload.get("enterpriseValueOverEBITDA"),
-                        payload.get("enterpriseValueEbitdaRatio"),
-                    )
-
-                    # 2. Profitability & Returns
-                    return_on_equity = _get_metric(
-                        payload.get("returnOnEquity"),
-                        payload.get("returnOnEquityTTM"),
-                        payload.get("roe"),
-                    )
-                    return_on_assets = _get_metric(
-                        payload.get("returnOnAssets"), 
-                        payload.get("returnOnAssetsTTM")
-                    )
-                    
-                    # 3. Liquidity & Health
-                    # [FIX] D/E Ratio - Balance Sheet에서 직접 계산 (FMP 값은 부정확)
-                    # 
-                    # [중요] 부채비율 계산 기준:
-                    # - 총부채 기준 (Total Liabilities / Total Equity)
-                    # - 유동부채 + 비유동부채 (매입채무, 차입금, 미지급금 등 모든 부채 포함)
-                    # - 이자부담부채(차입금)만 계산하는 방식과는 다름
-                    debt_to_equity = None
-                    
-                    # Balance Sheet에서 Total Liabilities / Total Equity 계산
-                    try:
-                        balance_sheet = db.query(models.CompanyBalanceSheet).filter_by(
-                            ticker=ticker,
-                            period=normalized_period,
-                            report_date=report_date
-                        ).first()
-                        
-                        # [FIX] Balance Sheet가 없거나 Equity 데이터가 없으면 자동으로 fetch
-                        need_fetch = False
-                        if not balance_sheet:
-                            need_fetch = True
-                            print(f"[D/E] Balance Sheet not found for {ticker} {report_date}, fetching from API...")
-                        elif not balance_sheet.total_equity or balance_sheet.total_equity == 0:
-                            need_fetch = True
-                            print(f"[D/E] Balance Sheet exists but Equity is missing for {ticker} {report_date}, re-fetching...")
-                        
-                        if need_fetch:
-                            from app.services.balance_sheet_service import fetch_company_balance_sheets
-                            try:
-                                # Balance Sheet 가져오기 (같은 period로)
-                                # fetch_company_balance_sheets 내부에서 이미 commit하므로 여기서는 commit 불필요
-                                await fetch_company_balance_sheets(ticker, db, client, normalized_period, limit=5)
-                                
-                                # 다시 조회
-                                balance_sheet = db.query(models.CompanyBalanceSheet).filter_by(
-                                    ticker=ticker,
-                                    period=normalized_period,
-                                    report_date=report_date
-                                ).first()
-                                
-                                if balance_sheet and balance_sheet.total_equity:
-                                    print(f"[D/E] Balance Sheet fetched successfully for {ticker} {report_date}")
-                                else:
-                                    print(f"[D/E] Balance Sheet still missing Equity after fetch for {ticker} {report_date}")
-                            except Exception as fetch_error:
-                                print(f"[D/E] Failed to fetch Balance Sheet: {fetch_error}")
-                                # 에러 발생 시 세션 롤백하여 다음 처리 가능하도록
-                                db.rollback()
-                        
-                        if balance_sheet:
-                            total_liabilities = balance_sheet.total_liabilities
-                            total_equity = balance_sheet.total_equity
-                            
-                            # D/E = Total Liabilities / Total Equity (총부채 기준)
-                            # [금융 전문가 검증] 음의 자기자본 처리
-                            if total_equity and total_liabilities is not None:
-                                if total_equity > 0:
-                                    debt_to_equity = total_liabilities / total_equity
-                                elif total_equity < 0:
-                                    # 음의 자기자본: 부채가 자산을 초과 (재무 위기 신호)
-                                    debt_to_equity = None  # 의미 없는 값이므로 None 처리
-                                    print(f"[D/E Warning] {ticker} {report_date}: Negative Equity ({total_equity}B) - 부채가 자산 초과!")
-                                else:  # total_equity == 0
-                                    debt_to_equity = None
-                                    print(f"[D/E Warning] {ticker} {report_date}: Zero Equity - D/E 계산 불가")
-                                
-                                # [추가 정보] 차입금 기준 부채비율도 계산 (참고용)
-                                long_term_debt = balance_sheet.long_term_debt or 0
-                                short_term_debt = balance_sheet.short_term_debt or 0
-                                total_debt = long_term_debt + short_term_debt
-                                debt_only_ratio = total_debt / total_equity if total_debt > 0 else 0
-                                
-                                print(f"[D/E Calculated] {ticker} {report_date}:")
-                                print(f"  - 총부채 기준: {total_liabilities:.2f}B / {total_equity:.2f}B = {debt_to_equity:.4f} (Total Liabilities)")
-                                print(f"  - 차입금 기준: {total_debt:.2f}B / {total_equity:.2f}B = {debt_only_ratio:.4f} (Interest-Bearing Debt Only)")
-                            else:
-                                print(f"[D/E Warning] {ticker} {report_date}: Equity is zero or missing")
-                        else:
-                            # Fallback: FMP API 값 (신뢰도 낮음)
-                            debt_to_equity = _get_metric(
-                                payload.get("debtToEquity"),
-                                payload.get("debtEquityRatio"),
-                                payload.get("debtEquityTTM"),
-                            )
-                            if debt_to_equity:
-                                print(f"[D/E Fallback] {ticker} {report_date}: Using FMP value {debt_to_equity:.4f} (BS not found)")
-                    except Exception as e:
-                        print(f"[D/E Error] {ticker} {report_date}: {e}")
-                        # Final Fallback
-                        debt_to_equity = _get_metric(
-                            payload.get("debtToEquity"),
-                            payload.get("debtEquityRatio"),
-                            payload.get("debtEquityTTM"),
-                        )
-                    
-                    # [FIX] Current Ratio - Balance Sheet에서 직접 계산
-                    current_ratio = None
-                    
-                    try:
-                        if balance_sheet:
-                            current_assets = balance_sheet.total_current_assets
-                            current_liabilities = balance_sheet.total_current_liabilities
-                            
-                            # Current Ratio = Current Assets / Current Liabilities
-                            if current_liabilities and current_liabilities > 0 and current_assets is not None:
-                                current_ratio = current_assets / current_liabilities
-                                print(f"[CR Calculated] {ticker} {report_date}: {current_assets:.2f}B / {current_liabilities:.2f}B = {current_ratio:.4f}")
-                            else:
-                                # Fallback: FMP API 값
-                                current_ratio = _get_metric(
-                                    payload.get("currentRatio"), 
-                                    payload.get("currentRatioTTM")
-                                )
-                        else:
-                            # Fallback: FMP API 값
-                            current_ratio = _get_metric(
-                                payload.get("currentRatio"), 
-                                payload.get("currentRatioTTM")
-                            )
-                    except Exception as e:
-                        print(f"[CR Error] {ticker} {report_date}: {e}")
-                        current_ratio = _get_metric(
-                            payload.get("currentRatio"), 
-                            payload.get("currentRatioTTM")
-                        )
-                    
-                    # 4. Per Share Metrics
-                    revenue_per_share = _get_metric(payload.get("revenuePerShare"))
-                    net_income_per_share = _get_metric(payload.get("netIncomePerShare"))
-                    book_value_per_share = _get_metric(payload.get("bookValuePerShare"))
-                    free_cash_flow_per_share = _get_metric(
-                        payload.get("freeCashFlowPerShare")
-                    )
-                    dividend_yield = _get_metric(payload.get("dividendYield"))
-
-                    # 5. Market Data (Integer conversion)
-                    # [NEW] Quote 데이터 fallback 추가
-                    shares_outstanding = _get_int_metric(
-                        payload.get("weightedAverageSharesOutstanding"),
-                        payload.get("sharesOutstanding"),
-                        payload.get("commonStockSharesOutstanding"),
-                        payload.get("weightedAverageShsOut"),
-                        quote_data.get("sharesOutstanding") # Fallback
-                    )
-                    market_cap = _get_int_metric(
-                        payload.get("marketCap"),
-                        quote_data.get("marketCap") # Fallback
-                    )
-
-                    if existing_record:
-                        # 기존 레코드 업데이트
-                        existing_record.report_year = report_year_val
-                        existing_record.pe_ratio = pe_ratio
-                        existing_record.forward_pe = forward_pe
-                        existing_record.peg_ratio = peg_ratio
-                        existing_record.enterprise_value_to_ebitda = enterprise_value_to_ebitda
-                        existing_record.price_to_book_ratio = price_to_book_ratio
-                        existing_record.return_on_equity = return_on_equity
-                        existing_record.return_on_assets = return_on_assets
-                        existing_record.debt_to_equity = debt_to_equity
-                        existing_record.current_ratio = current_ratio
-                        de_str = f"{debt_to_equity:.4f}" if debt_to_equity is not None else "None"
-                        cr_str = f"{current_ratio:.4f}" if current_ratio is not None else "None"
-                        print(f"[Key Metrics] Updated {ticker} {report_date}: D/E={de_str}, CR={cr_str}")
-                        existing_record.dividend_yield = dividend_yield
-                        existing_record.book_value_per_share = book_value_per_share
-                        existing_record.free_cash_flow_per_share = free_cash_flow_per_share
-                        existing_record.shares_outstanding = shares_outstanding
-                        existing_record.market_cap = market_cap
-                        existing_record.revenue_per_share = revenue_per_share
-                        existing_record.net_income_per_share = net_income_per_share
-                        existing_record.price_to_sales_ratio = price_to_sales_ratio
-                    else:
-                        # 새 레코드 추가
-                        new_record = models.CompanyKeyMetrics(
-                            ticker=ticker,
-                            period=normalized_period,
-                            report_date=report_date,
-                            report_year=report_year_val,
-                            pe_ratio=pe_ratio,
-                            forward_pe=forward_pe,
-                            peg_ratio=peg_ratio,
-                            enterprise_value_to_ebitda=enterprise_value_to_ebitda,
-                            price_to_book_ratio=price_to_book_ratio,
-                            return_on_equity=return_on_equity,
-                            return_on_assets=return_on_assets,
-                            debt_to_equity=debt_to_equity,
-                            current_ratio=current_ratio,
-                            dividend_yield=dividend_yield,
-                            book_value_per_share=book_value_per_share,
-                            free_cash_flow_per_share=free_cash_flow_per_share,
-                            shares_outstanding=shares_outstanding,
-                            market_cap=market_cap,
-                            revenue_per_share=revenue_per_share,
-                            net_income_per_share=net_income_per_share,
-                            price_to_sales_ratio=price_to_sales_ratio,
-                        )
-                        db.add(new_record)
-                        de_str = f"{debt_to_equity:.4f}" if debt_to_equity is not None else "None"
-                        cr_str = f"{current_ratio:.4f}" if current_ratio is not None else "None"
-                        print(f"[Key Metrics] Created {ticker} {report_date}: D/E={de_str}, CR={cr_str}")
-                except Exception as e:
-                    print(f"[Error] Failed to process key metrics record for {ticker} ({date_str}): {e}")
-                    continue
-
-            # 변경사항 커밋
-            if cache_enabled:
-                db.commit()  # key_metrics 데이터를 DB에 확정
-                print(f"[Key Metrics] DB commit successful for {ticker} ({len(merged_data)} records)")
-            else:
-                print(f"[Key Metrics] Skipped DB save (cache_enabled=False) for {ticker}")
-        except Exception as e:
-            db.rollback()
-            print(f"fetch_company_key_metrics API/DB 에러: {e}")
-            # API 호출이 실패해도, DB에 있는 기존 데이터라도 반환
 
+async def _build_key_metrics_result(
+    db: AnySession,
+    ticker: str,
+    normalized_period: str,
+    limit: int,
+) -> Dict[str, Any]:
+    """DB의 key_metrics 행으로 평균/YoY/밸류에이션 위젯을 계산해 최종 응답을 만듭니다."""
     # --- 4. [핵심] "순수 데이터"만 반환 ---
     # (AI가 분석/요약할 수 있도록 '가공되지 않은' DB 데이터를 반환)
     final_records = (
-        db.query(models.CompanyKeyMetrics)
-        .filter_by(ticker=ticker, period=normalized_period)
-        .order_by(models.CompanyKeyMetrics.report_date.desc())
-        .limit(limit)
-        .all()
-    )
+        await db_execute(
+            db,
+            select(models.CompanyKeyMetrics)
+            .filter_by(ticker=ticker, period=normalized_period)
+            .order_by(models.CompanyKeyMetrics.report_date.desc())
+            .limit(limit),
+        )
+    ).scalars().all()
 
     # ... (records = db.query(...) 로직은 동일) ...
     payload = [
@@ -665,20 +806,6 @@ async def fetch_company_key_metrics(
         for r in final_records
     ]
 
-    latest_cash_flow = (
-        db.query(models.CompanyCashFlow)
-        .filter_by(ticker=ticker, period=normalized_period)
-        .order_by(models.CompanyCashFlow.report_date.desc())
-        .first()
-    )
-    cash_flow_context = None
-    if latest_cash_flow:
-        cash_flow_context = {
-            "report_date": latest_cash_flow.report_date.isoformat(),
-            "common_stock_repurchased": latest_cash_flow.common_stock_repurchased,
-            "dividends_paid": latest_cash_flow.dividends_paid,
-        }
-
     # --- 5. [NEW] Calculate 5-Year Averages (For Valuation Context) ---
     # 전체 데이터로 평균 계산 (5개 사용)
     avg_metrics = {}
@@ -763,13 +890,6 @@ async def fetch_company_key_metrics(
     return final_result
 
 
-
-
-
-    final_result["records"] = payload
-    return final_result
-
-
 def _describe_market_cap(value: float) -> str:
     tiers = [
         (200_000_000_000, "Mega Cap (>$200B)"),
@@ -826,7 +946,7 @@ def _format_market_cap_usd(value: float) -> str:
 @register_tool
 async def fetch_metrics_grid_widget(
     ticker: str,
-    db: Session,
+    db: AnySession,
     client: httpx.AsyncClient
 ) -> dict:
     """
@@ -0,0 +1,149 @@
+"""학습된 기업명 별칭(learned_aliases) 관리 모듈.
+
+별칭 인덱스에 없는 기업명을 LLM(번역/티커 변환)으로 찾으면 그 결과를 저장해 두고,
+같은 표현이 다시 들어오면 LLM 호출 없이 재사용합니다.
+재사용(hits)과 수락(accepts: 해당 티커로 분석이 정상 완료됨)이 LEARNED_ALIAS_PROMOTE_COUNT에 도달하면
+promoted로 표시되어 메모리 별칭 인덱스에 포함됩니다 (의도 라우터도 DB 조회 없이 인식).
+"""
+# app/services/learned_aliases.py
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import LEARNED_ALIAS_PROMOTE_COUNT
+from app.services.company_alias_index import compact_alias
+
+# 변환 방식별 초기 신뢰도 (번역 후 별칭 인덱스에서 확인된 쪽이 더 신뢰할 만함)
+SOURCE_CONFIDENCE = {"llm_translation": 0.8, "llm_ticker": 0.6}
+ACCEPT_CONFIDENCE_STEP = 0.1
+
+# search_company_by_name 결과 항목에 붙는 표식 (LLM에는 보내지 않음, app/mcp/compaction.py)
+LEARNED_ALIAS_FIELD = "learned_alias"
+
+_stats = {"lookups": 0, "hits": 0, "llm_resolutions": 0, "llm_calls_saved": 0, "promotions": 0}
+
+
+def lookup_learned_alias(db: Session, query: str) -> Optional[models.LearnedAlias]:
+    key = compact_alias(query)
+    if not key:
+        return None
+    _stats["lookups"] += 1
+    return db.get(models.LearnedAlias, key)
+
+
+def remember_alias(db: Session, query: str, ticker: str, source: str, llm_calls: int) -> Optional[str]:
+    """LLM 변환 결과를 저장합니다 (이미 있으면 덮어씀). commit은 호출하는 쪽에서 수행. 저장한 키를 반환."""
+    key = compact_alias(query)
+    if not key:
+        return None
+    now = datetime.utcnow()
+    table = models.LearnedAlias.__table__
+    stmt = mysql_insert(table).values(
+        query_key=key[:255],
+        query_text=query.strip()[:255],
+        ticker=ticker,
+        confidence=SOURCE_CONFIDENCE.get(source, 0.5),
+        source=source,
+        llm_calls=llm_calls,
+        hits=0,
+        accepts=0,
+        llm_calls_saved=0,
+        promoted=False,
+        created_at=now,
+        last_used_at=now,
+    )
+    stmt = stmt.on_duplicate_key_update(
+        ticker=stmt.inserted.ticker,
+        confidence=stmt.inserted.confidence,
+        source=stmt.inserted.source,
+        llm_calls=stmt.inserted.llm_calls,
+        last_used_at=stmt.inserted.last_used_at,
+    )
+    db.execute(stmt)
+    _stats["llm_resolutions"] += 1
+    print(f"[Learned Alias] 저장: '{query}' → {ticker} ({source}, LLM {llm_calls}회)")
+    return key[:255]
+
+
+def _promote(db: Session, keys: List[str]) -> int:
+    promoted = (
+        db.query(models.LearnedAlias)
+        .filter(
+            models.LearnedAlias.query_key.in_(keys),
+            models.LearnedAlias.promoted.is_(False),
+            models.LearnedAlias.hits + models.LearnedAlias.accepts >= LEARNED_ALIAS_PROMOTE_COUNT,
+        )
+        .update({models.LearnedAlias.promoted: True}, synchronize_session=False)
+    )
+    if promoted:
+        _stats["promotions"] += promoted
+        print(f"[Learned Alias] 별칭 인덱스로 승격: {promoted}개")
+    return promoted
+
+
+def record_alias_hit(db: Session, alias: models.LearnedAlias) -> int:
+    """
+    LLM 대신 학습 별칭을 재사용했음을 기록합니다. (commit은 호출하는 쪽에서 수행)
+    승격된 별칭 수를 반환합니다 (0보다 크면 호출 측이 커밋 후 별칭 인덱스를 무효화).
+    """
+    _stats["hits"] += 1
+    _stats["llm_calls_saved"] += alias.llm_calls
+    table = models.LearnedAlias
+    db.query(table).filter(table.query_key == alias.query_key).update(
+        {
+            table.hits: table.hits + 1,
+            table.llm_calls_saved: table.llm_calls_saved + table.llm_calls,
+            table.last_used_at: datetime.utcnow(),
+        },
+        synchronize_session=False,
+    )
+    return _promote(db, [alias.query_key])
+
+
+def accept_learned_aliases(db: Session, keys: Iterable[str]) -> int:
+    """
+    학습 별칭으로 찾은 티커로 답변까지 정상 완료된 경우 수락으로 기록하고 신뢰도를 올립니다.
+    (commit은 호출하는 쪽에서 수행) 승격된 별칭 수를 반환합니다.
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return 0
+    table = models.LearnedAlias
+    db.query(table).filter(table.query_key.in_(keys)).update(
+        {
+            table.accepts: table.accepts + 1,
+            table.confidence: func.least(1.0, table.confidence + ACCEPT_CONFIDENCE_STEP),
+        },
+        synchronize_session=False,
+    )
+    return _promote(db, keys)
+
+
+def learned_alias_keys(response: Any) -> List[str]:
+    """search_company_by_name 응답에서 학습 별칭으로 찾은 항목의 키를 모읍니다."""
+    if not isinstance(response, list):
+        return []
+    return [
+        item[LEARNED_ALIAS_FIELD]
+        for item in response
+        if isinstance(item, dict) and item.get(LEARNED_ALIAS_FIELD)
+    ]
+
+
+def learned_alias_stats(db: Session) -> Dict[str, Any]:
+    """프로세스 내 통계 + 누적(DB) 절감 LLM 호출 수."""
+    total_saved, total_aliases, total_promoted = db.query(
+        func.coalesce(func.sum(models.LearnedAlias.llm_calls_saved), 0),
+        func.count(models.LearnedAlias.query_key),
+        func.coalesce(func.sum(models.LearnedAlias.promoted), 0),
+    ).one()
+    return {
+        **_stats,
+        "total_llm_calls_saved": int(total_saved),
+        "aliases": int(total_aliases),
+        "promoted": int(total_promoted),
+    }
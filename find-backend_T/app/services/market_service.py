@@ -1,10 +1,11 @@
 # app/services/market_service.py
 import httpx, json
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from datetime import datetime
 from app.config import FMP_API_KEY, FMP_BASE_URL
-from app import models
+from app.cache import get_cached, set_cached
 from app.mcp.decorators import register_tool
+from app.singleflight import single_flight
 
 @register_tool
 async def fetch_stock_quote(ticker: str, db: Session, client: httpx.AsyncClient) -> dict:
@@ -13,17 +14,21 @@ async def fetch_stock_quote(ticker: str, db: Session, client: httpx.AsyncClient)
     FMP Quote API를 사용하여 실시간 가격과 시가총액을 가져옵니다.
     """
     cache_key = f"fmp_quote_{ticker}"
-    now = datetime.now()
-    db_cache = db.query(models.ApiCache).filter(
-        models.ApiCache.cache_key == cache_key,
-        models.ApiCache.expires_at > now
-    ).first()
+    cached_quote = get_cached(db, "fmp_quote", cache_key)
+    if cached_quote:
+        return cached_quote
+
+    # 동시 MISS는 하나의 FMP 호출 결과(quote dict)를 공유
+    return await single_flight(
+        ("quote", ticker, None),
+        lambda: _refresh_stock_quote(ticker, cache_key, db, client),
+    )
 
-    if db_cache:
-        print(f"[Cache HIT] {cache_key}")
-        return db_cache.data
 
-    print(f"[Cache MISS] FMP API 호출: /quote/{ticker}")
+async def _refresh_stock_quote(ticker: str, cache_key: str, db: Session, client: httpx.AsyncClient) -> dict:
+    """FMP /quote 호출 후 캐시에 저장합니다. (single-flight 리더만 실행)"""
+    now = datetime.now()
+    print(f"FMP API 호출: /quote/{ticker}")
     url = f"{FMP_BASE_URL}/quote/{ticker}?apikey={FMP_API_KEY}"
     
     try:
@@ -56,9 +61,7 @@ async def fetch_stock_quote(ticker: str, db: Session, client: httpx.AsyncClient)
             "marketCap": int(quote.get("marketCap", 0)) # [NEW] 시가총액 추가
         }
         
-        expires = now + timedelta(minutes=5)
-        cache_entry = models.ApiCache(cache_key=cache_key, data=quote_data, expires_at=expires)
-        db.merge(cache_entry)
+        set_cached(db, "fmp_quote", cache_key, quote_data)  # 5분
         db.commit()
         return quote_data
     except httpx.HTTPStatusError as e:
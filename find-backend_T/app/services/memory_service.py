@@ -1,18 +1,88 @@
 """대화 메모리 관리용 서비스 모듈."""
 # app/services/memory_service.py
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 from app import models
 from app.mcp.decorators import register_tool
 
+HISTORY_PAGE_MAX = 100
+
+
+def load_recent_messages(db: Session, user_id: int, limit: int) -> List[models.ChatHistory]:
+    """
+    사용자의 최근 메시지 limit개를 최신순으로 반환합니다.
+    (user_id, created_at, id) 인덱스를 역방향으로 limit개만 읽으므로 전체 대화 수와 무관합니다.
+    """
+    return (
+        db.query(models.ChatHistory)
+        .filter(models.ChatHistory.user_id == user_id)
+        .order_by(models.ChatHistory.created_at.desc(), models.ChatHistory.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def encode_history_cursor(message: models.ChatHistory) -> str:
+    raw = f"{message.created_at.isoformat()}|{message.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, int]:
+    """커서를 (created_at, id)로 복원합니다. 형식이 잘못되면 ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, message_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(message_id)
+    except Exception:
+        raise ValueError(f"잘못된 cursor입니다: {cursor}")
+
+
+def get_history_page(
+    db: Session,
+    user_id: int,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    대화 기록을 최신순으로 한 페이지씩 반환합니다 (키셋 페이지네이션).
+    OFFSET 대신 마지막으로 받은 메시지의 (created_at, id) 다음부터 읽으므로
+    몇 번째 페이지든 같은 비용으로 조회됩니다.
+    """
+    limit = max(1, min(limit, HISTORY_PAGE_MAX))
+    query = db.query(models.ChatHistory).filter(models.ChatHistory.user_id == user_id)
+    if cursor:
+        created_at, message_id = decode_history_cursor(cursor)
+        query = query.filter(
+            or_(
+                models.ChatHistory.created_at < created_at,
+                and_(models.ChatHistory.created_at == created_at, models.ChatHistory.id < message_id),
+            )
+        )
+    # 다음 페이지 존재 여부를 알기 위해 1개 더 읽음
+    rows = (
+        query.order_by(models.ChatHistory.created_at.desc(), models.ChatHistory.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "messages": [
+            {"id": msg.id, "role": msg.role, "content": msg.content, "created_at": msg.created_at}
+            for msg in rows
+        ],
+        "next_cursor": encode_history_cursor(rows[-1]) if has_more else None,
+    }
+
+
 @register_tool
 async def get_chat_history(user_id: int, db: Session, limit: int = 5) -> list:
     """
     지정된 사용자(user_id)의 최근 대화 이력을 limit 개수만큼 조회합니다.
     """
-    db_history = db.query(models.ChatHistory)\
-                   .filter(models.ChatHistory.user_id == user_id)\
-                   .order_by(models.ChatHistory.created_at.desc())\
-                   .limit(limit * 2) \
-                   .all()
+    db_history = load_recent_messages(db, user_id, limit * 2)
     return [{"role": msg.role, "content": msg.content} for msg in reversed(db_history)]
-
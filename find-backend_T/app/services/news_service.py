@@ -4,11 +4,130 @@ from sqlalchemy.orm import Session
 from app.config import FMP_API_KEY
 from app import models
 from app.mcp.decorators import register_tool
+from app.services.bulk_upsert import bulk_upsert
+from app.services.data_versions import NEWS, bump_data_versions
 
 FMP_BASE_URL = "https://financialmodelingprep.com/api/v3"
+NEWS_INGEST_BATCH_SIZE = 100  # url IN (...) 조회 1회당 기사 수
+
+
+def _split_symbols(raw) -> list:
+    """FMP symbols 값("AAPL,MSFT" 등)을 정규화된 심볼 리스트로 변환합니다."""
+    if not raw:
+        return []
+    symbols = []
+    for part in str(raw).split(","):
+        symbol = part.strip().upper()
+        if symbol and symbol not in symbols:
+            symbols.append(symbol)
+    return symbols
+
+
+def _symbol_links(symbols: list, published_date) -> list:
+    """news_article_symbols 매핑 행 생성 (기사 저장 시 함께 INSERT)."""
+    return [
+        models.NewsArticleSymbol(symbol=symbol, publishedDate=published_date)
+        for symbol in symbols
+    ]
+
+
+def _enrich_summary(item: dict) -> str:
+    # [Source Injection] AI가 출처를 알 수 있도록 summary에 site 정보 주입
+    site = item.get("site", "Unknown")
+    text = item.get("text") or ""
+    return f"[{site}] {text}"
+
+
+def _store_news_batch(db: Session, items: list, ticker: str = None) -> tuple:
+    """
+    FMP 뉴스 목록을 배치 단위로 저장합니다. (commit은 호출하는 쪽에서 수행)
+
+    - 기존 URL 확인: 배치당 `url IN (...)` 쿼리 1회
+    - 신규 기사: 매핑(news_article_symbols)과 함께 INSERT
+    - 이미 다른 티커로 저장된 기사: symbols를 병합하고 누락된 매핑만 INSERT IGNORE
+    - ticker가 주어지면 (티커별 뉴스 조회) 모든 기사를 해당 티커에도 연결
+    반환값: (신규 저장 건수, 심볼 병합 건수)
+    """
+    # 배치 내 중복 URL은 심볼만 합침
+    incoming = {}
+    for item in items:
+        url = item.get("url")
+        if not url:
+            continue
+        symbols = _split_symbols(item.get("symbols") or item.get("symbol"))
+        if ticker and ticker.upper() not in symbols:
+            symbols.append(ticker.upper())
+        entry = incoming.get(url)
+        if entry:
+            entry["symbols"] += [s for s in symbols if s not in entry["symbols"]]
+            continue
+        incoming[url] = {"item": item, "symbols": symbols}
+
+    if not incoming:
+        return 0, 0
+
+    existing_by_url = {
+        article.url: article
+        for article in db.query(models.NewsArticle)
+        .filter(models.NewsArticle.url.in_(list(incoming.keys())))
+        .all()
+    }
+
+    created = 0
+    merged = 0
+    missing_links = []
+    touched_symbols = set()
+    for url, entry in incoming.items():
+        item, symbols = entry["item"], entry["symbols"]
+        existing = existing_by_url.get(url)
+        if existing is None:
+            db.add(models.NewsArticle(
+                url=url,
+                title=item.get("title") or "",
+                publishedDate=item.get("publishedDate"),
+                symbols=",".join(symbols) or None,
+                summary=_enrich_summary(item), # DB에도 출처 포함된 텍스트 저장
+                symbol_links=_symbol_links(symbols, item.get("publishedDate")),
+            ))
+            touched_symbols.update(symbols)
+            created += 1
+            continue
+
+        current = _split_symbols(existing.symbols)
+        added = [s for s in symbols if s not in current]
+        if not added:
+            continue
+        existing.symbols = ",".join(current + added)
+        missing_links.extend(
+            {"article_id": existing.id, "symbol": symbol, "publishedDate": existing.publishedDate}
+            for symbol in added
+        )
+        touched_symbols.update(added)
+        merged += 1
+
+    # 매핑이 이미 있으면 무시 (INSERT IGNORE)
+    bulk_upsert(db, models.NewsArticleSymbol, missing_links, update_columns=[])
+    # 새 기사가 연결된 심볼의 뉴스 버전 증가 (채팅 답변 캐시 무효화)
+    bump_data_versions(db, NEWS, touched_symbols)
+    return created, merged
+
+
+def _query_news_by_symbol(db: Session, ticker: str, limit: int) -> list:
+    """
+    news_article_symbols의 (symbol, publishedDate) 인덱스로 정확 일치 + 최신순 조회합니다.
+    (symbols LIKE '%TICKER%' 풀스캔 및 "MS" → "MSFT" 오탐 제거)
+    """
+    return (
+        db.query(models.NewsArticle)
+        .join(models.NewsArticleSymbol, models.NewsArticleSymbol.article_id == models.NewsArticle.id)
+        .filter(models.NewsArticleSymbol.symbol == ticker.upper())
+        .order_by(models.NewsArticleSymbol.publishedDate.desc())
+        .limit(limit)
+        .all()
+    )
 
 @register_tool
-async def search_summarized_news(ticker: str, db: Session) -> list:
+async def search_summarized_news(ticker: str, db: Session, client: httpx.AsyncClient) -> list:
     """
     특정 티커(ticker)와 연관된 요약 뉴스 목록을 조회합니다.
     Smart Caching: DB 뉴스가 6시간 이내면 DB 사용, 아니면 API 호출 후 DB 저장.
@@ -18,10 +137,8 @@ async def search_summarized_news(ticker: str, db: Session) -> list:
     print(f"[News Service] 뉴스 조회 시작 ({ticker})")
     
     # Step 1: DB에서 최신 뉴스 확인
-    latest_news = db.query(models.NewsArticle)\
-                    .filter(models.NewsArticle.symbols.like(f"%{ticker}%"))\
-                    .order_by(models.NewsArticle.publishedDate.desc())\
-                    .first()
+    latest = _query_news_by_symbol(db, ticker, limit=1)
+    latest_news = latest[0] if latest else None
     
     # Step 2: 신선도 체크 (6시간)
     needs_refresh = True
@@ -42,10 +159,7 @@ async def search_summarized_news(ticker: str, db: Session) -> list:
     
     # Step 3: 신선하면 DB에서 가져오기
     if not needs_refresh:
-        db_news = db.query(models.NewsArticle)\
-                    .filter(models.NewsArticle.symbols.like(f"%{ticker}%"))\
-                    .order_by(models.NewsArticle.publishedDate.desc())\
-                    .limit(20).all()
+        db_news = _query_news_by_symbol(db, ticker, limit=20)
         
         result = []
         for n in db_news:
@@ -66,50 +180,30 @@ async def search_summarized_news(ticker: str, db: Session) -> list:
     api_news = []
     try:
         url = f"{FMP_BASE_URL}/stock_news?tickers={ticker}&limit=20&apikey={FMP_API_KEY}"
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(url, timeout=5.0)
-            if resp.status_code == 200:
-                api_data = resp.json() or []
-                print(f"[News Service] API에서 {len(api_data)}개 뉴스 수신")
-                
-                # Step 5: DB에 저장 (중복 체크)
-                for item in api_data:
-                    # 반환용 리스트에 추가
-                    site = item.get("site", "Unknown")
-                    text = item.get("text", "")
-                    # [Source Injection] AI가 출처를 알 수 있도록 summary에 site 정보 주입
-                    enriched_summary = f"[{site}] {text}"
-
-                    api_news.append({
-                        "title": item.get("title"),
-                        "summary": enriched_summary,
-                        "url": item.get("url"),
-                        "publishedDate": item.get("publishedDate")
-                    })
-                    
-                    # DB에 저장 (중복 체크)
-                    exists = db.query(models.NewsArticle).filter_by(url=item.get("url")).first()
-                    if not exists:
-                        new_article = models.NewsArticle(
-                            url=item.get("url"),
-                            title=item.get("title") or "",
-                            publishedDate=item.get("publishedDate"),
-                            symbols=ticker,  # 현재 ticker 저장
-                            summary=enriched_summary # DB에도 출처 포함된 텍스트 저장
-                        )
-                        db.add(new_article)
-                
-                db.commit()
-                print(f"[News Service] DB에 신규 뉴스 저장 완료")
-                
+        # 앱 공용(풀링된) httpx 클라이언트 재사용
+        resp = await client.get(url, timeout=5.0)
+        if resp.status_code == 200:
+            api_data = resp.json() or []
+            print(f"[News Service] API에서 {len(api_data)}개 뉴스 수신")
+
+            # Step 5: DB에 저장 (배치 중복 체크 + 심볼 병합)
+            for item in api_data:
+                api_news.append({
+                    "title": item.get("title"),
+                    "summary": _enrich_summary(item),
+                    "url": item.get("url"),
+                    "publishedDate": item.get("publishedDate")
+                })
+
+            created, merged = _store_news_batch(db, api_data, ticker=ticker)
+            db.commit()
+            print(f"[News Service] DB에 신규 뉴스 {created}건 저장, {merged}건 심볼 병합 완료")
+
     except Exception as e:
         print(f"[News Service] API 호출 실패: {e}")
         db.rollback()
         # Fallback: DB에서라도 가져오기
-        db_news = db.query(models.NewsArticle)\
-                    .filter(models.NewsArticle.symbols.like(f"%{ticker}%"))\
-                    .order_by(models.NewsArticle.publishedDate.desc())\
-                    .limit(20).all()
+        db_news = _query_news_by_symbol(db, ticker, limit=20)
         
         for n in db_news:
             p_date = n.publishedDate
@@ -131,29 +225,15 @@ async def fetch_and_store_latest_news(db: Session, client: httpx.AsyncClient):
     try:
         response = await client.get(url)
         response.raise_for_status()
-        data = response.json()
+        data = response.json() or []
         count = 0
-        for item in data:
-            exists = db.query(models.NewsArticle).filter_by(url=item.get("url")).first()
-            if not exists:
-                # title과 summary가 None이거나 빈 문자열인 경우 처리
-                title = item.get("title") or ""
-                site = item.get("site", "Unknown")
-                text = item.get("text") or ""
-                enriched_summary = f"[{site}] {text}"
-                
-                new_article = models.NewsArticle(
-                    url=item.get("url"),
-                    title=title,
-                    publishedDate=item.get("publishedDate"),
-                    symbols=item.get("symbols"),
-                    summary=enriched_summary
-                )
-                db.add(new_article)
-                count += 1
+        merged_count = 0
+        for i in range(0, len(data), NEWS_INGEST_BATCH_SIZE):
+            created, merged = _store_news_batch(db, data[i:i + NEWS_INGEST_BATCH_SIZE])
+            count += created
+            merged_count += merged
         db.commit()
-        print(f"[Celery Task] 뉴스 {count}건 신규 저장 완료.")
+        print(f"[Celery Task] 뉴스 {count}건 신규 저장, {merged_count}건 심볼 병합 완료.")
     except Exception as e:
         db.rollback()
         print(f"[Celery Task] 뉴스 수집 중 에러: {e}") 
-
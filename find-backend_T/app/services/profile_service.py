@@ -10,6 +10,7 @@ from datetime import datetime, timedelta
 from app.config import FMP_API_KEY, FMP_BASE_URL, STABLE_FMP_BASE_URL
 from app import models
 from app.mcp.decorators import register_tool
+from app.services.company_alias_index import invalidate_alias_index
 # from app.services.translation_service import translate_company_profile  # [주석 처리]
 
 
@@ -105,6 +106,7 @@ async def fetch_company_profile(
                 # --- [핵심] 독립적인 서비스로 작동하도록 즉시 commit ---
                 db.commit()
                 # --- [수정 완료] ---
+                invalidate_alias_index()  # 새 기업/이름 변경을 별칭 인덱스에 반영
 
                 db.refresh(profile_record)  # [NEW] 커밋된 객체를 다시 읽어옴
                 db_profile = profile_record  # [NEW] db_profile 변수를 갱신
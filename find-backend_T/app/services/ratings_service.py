@@ -1,251 +1,245 @@
 # app/services/ratings_service.py  -- 에널리스트 평가가
 import httpx, json
-from datetime import datetime, timedelta
+from datetime import datetime
 from sqlalchemy.orm import Session
 
 from app.config import FMP_API_KEY
 from app import models
+from app.cache import get_cached, set_cached
 from app.mcp.decorators import register_tool
+from app.singleflight import single_flight
 
 FMP_BASE_URL = "https://financialmodelingprep.com/api/v3"
 
 
-@register_tool
-async def fetch_analyst_ratings(
+async def _refresh_analyst_ratings(
     ticker: str,
+    cache_key: str,
+    limit: int,
     db: Session,
     client: httpx.AsyncClient,
-    limit: int = 10,
-) -> list:
-    """
-    특정 티커(ticker)의 최신 애널리스트 평가 정보(투자의견, 목표주가)를 조회합니다.
-    """
-    cache_key = f"analyst_ratings_{ticker}"
+) -> None:
+    """FMP 추천/목표주가 API를 호출해 애널리스트 평가를 DB에 upsert 합니다. (single-flight 리더만 실행)"""
     now = datetime.utcnow()
 
-    cache_hit = (
-        db.query(models.ApiCache)
-        .filter(
-            models.ApiCache.cache_key == cache_key,
-            models.ApiCache.expires_at > now,
-        )
-        .first()
-    )
-
-    # [디버깅] 캐시 상태 확인
-    if cache_hit:
-        print(f"[Cache HIT] 애널리스트 평가 캐시 존재 (만료: {cache_hit.expires_at}), DB에서 조회만 수행: {ticker}")
-    else:
-        print(f"[Cache MISS] 캐시 없음, API 호출 필요: {ticker}")
-
-    if not cache_hit:
-        print(f"[Cache MISS] FMP API 호출: analyst-stock-recommendations & price-target-consensus/{ticker}")
-        
-        # 1. analyst-stock-recommendations (집계 통계)
-        recommendations_urls = [
-            f"https://financialmodelingprep.com/stable/analyst-stock-recommendations/{ticker}?limit={limit}&apikey={FMP_API_KEY}",
-            f"{FMP_BASE_URL}/analyst-stock-recommendations/{ticker}?limit={limit}&apikey={FMP_API_KEY}",
-        ]
-        recommendations_data = None
-        for api_url in recommendations_urls:
-            try:
-                response = await client.get(api_url)
-                if response.status_code == 404:
-                    continue
-                response.raise_for_status()
-                recommendations_data = response.json()
-                print(f"[Info] analyst-stock-recommendations API 응답 성공: {api_url}")
-                break
-            except httpx.HTTPStatusError as exc:
-                if exc.response.status_code == 404:
-                    continue
-                print(f"[Warning] HTTP 에러 ({api_url}): {exc.response.status_code}")
-            except Exception as exc:
-                print(f"[Warning] 예외 ({api_url}): {exc}")
-        
-        # 2. price-target-consensus (목표주가)
-        # [수정] v3 엔드포인트가 데이터를 반환하지 않는 경우가 있어 v4로 변경
-        price_target_urls = [
-            f"https://financialmodelingprep.com/api/v4/price-target-consensus?symbol={ticker}&apikey={FMP_API_KEY}",
-            f"{FMP_BASE_URL.replace('v3', 'v4')}/price-target-consensus?symbol={ticker}&apikey={FMP_API_KEY}",
-        ]
-        price_target_data = None
-        for api_url in price_target_urls:
-            try:
-                response = await client.get(api_url)
-                if response.status_code == 404:
-                    continue
-                response.raise_for_status()
-                price_target_data = response.json()
-                print(f"[Info] price-target-consensus API 응답 성공: {api_url}")
-                break
-            except httpx.HTTPStatusError as exc:
-                if exc.response.status_code == 404:
-                    continue
-                print(f"[Warning] HTTP 에러 ({api_url}): {exc.response.status_code}")
-            except Exception as exc:
-                print(f"[Warning] 예외 ({api_url}): {exc}")
-        
-        # 3. 두 데이터 병합 (date 기준)
-        if recommendations_data is None:
-            print(f"[Error] analyst-stock-recommendations API 실패: {ticker}")
-            recommendations_data = []
-        
-        # [수정] v4 price-target-consensus는 날짜가 없는 스냅샷이므로,
-        # 최신(첫 번째) 추천 데이터에만 현재 컨센서스 목표주가를 매핑합니다.
-        current_consensus_target = None
-        if price_target_data and isinstance(price_target_data, list) and len(price_target_data) > 0:
-            # v4 응답 예: [{'symbol': 'AAPL', 'targetConsensus': 286.11, ...}]
-            current_consensus_target = price_target_data[0].get("targetConsensus")
+    print(f"FMP API 호출: analyst-stock-recommendations & price-target-consensus/{ticker}")
+    
+    # 1. analyst-stock-recommendations (집계 통계)
+    recommendations_urls = [
+        f"https://financialmodelingprep.com/stable/analyst-stock-recommendations/{ticker}?limit={limit}&apikey={FMP_API_KEY}",
+        f"{FMP_BASE_URL}/analyst-stock-recommendations/{ticker}?limit={limit}&apikey={FMP_API_KEY}",
+    ]
+    recommendations_data = None
+    for api_url in recommendations_urls:
+        try:
+            response = await client.get(api_url)
+            if response.status_code == 404:
+                continue
+            response.raise_for_status()
+            recommendations_data = response.json()
+            print(f"[Info] analyst-stock-recommendations API 응답 성공: {api_url}")
+            break
+        except httpx.HTTPStatusError as exc:
+            if exc.response.status_code == 404:
+                continue
+            print(f"[Warning] HTTP 에러 ({api_url}): {exc.response.status_code}")
+        except Exception as exc:
+            print(f"[Warning] 예외 ({api_url}): {exc}")
+    
+    # 2. price-target-consensus (목표주가)
+    # [수정] v3 엔드포인트가 데이터를 반환하지 않는 경우가 있어 v4로 변경
+    price_target_urls = [
+        f"https://financialmodelingprep.com/api/v4/price-target-consensus?symbol={ticker}&apikey={FMP_API_KEY}",
+        f"{FMP_BASE_URL.replace('v3', 'v4')}/price-target-consensus?symbol={ticker}&apikey={FMP_API_KEY}",
+    ]
+    price_target_data = None
+    for api_url in price_target_urls:
+        try:
+            response = await client.get(api_url)
+            if response.status_code == 404:
+                continue
+            response.raise_for_status()
+            price_target_data = response.json()
+            print(f"[Info] price-target-consensus API 응답 성공: {api_url}")
+            break
+        except httpx.HTTPStatusError as exc:
+            if exc.response.status_code == 404:
+                continue
+            print(f"[Warning] HTTP 에러 ({api_url}): {exc.response.status_code}")
+        except Exception as exc:
+            print(f"[Warning] 예외 ({api_url}): {exc}")
+    
+    # 3. 두 데이터 병합 (date 기준)
+    if recommendations_data is None:
+        print(f"[Error] analyst-stock-recommendations API 실패: {ticker}")
+        recommendations_data = []
+    
+    # [수정] v4 price-target-consensus는 날짜가 없는 스냅샷이므로,
+    # 최신(첫 번째) 추천 데이터에만 현재 컨센서스 목표주가를 매핑합니다.
+    current_consensus_target = None
+    if price_target_data and isinstance(price_target_data, list) and len(price_target_data) > 0:
+        # v4 응답 예: [{'symbol': 'AAPL', 'targetConsensus': 286.11, ...}]
+        current_consensus_target = price_target_data[0].get("targetConsensus")
+    
+    data = []
+    for idx, rec_item in enumerate(recommendations_data):
+        merged_item = rec_item.copy()
         
-        data = []
-        for idx, rec_item in enumerate(recommendations_data):
-            merged_item = rec_item.copy()
+        # 최신 데이터(첫 번째 항목)에만 현재 목표주가 적용
+        if idx == 0 and current_consensus_target:
+            merged_item["price_target"] = current_consensus_target
+        else:
+            # 과거 데이터는 v3가 동작하지 않으므로 None (혹은 v3 데이터가 있다면 매핑 가능하지만 현재는 생략)
+            merged_item["price_target"] = None
             
-            # 최신 데이터(첫 번째 항목)에만 현재 목표주가 적용
-            if idx == 0 and current_consensus_target:
-                merged_item["price_target"] = current_consensus_target
-            else:
-                # 과거 데이터는 v3가 동작하지 않으므로 None (혹은 v3 데이터가 있다면 매핑 가능하지만 현재는 생략)
-                merged_item["price_target"] = None
-                
-            data.append(merged_item)
+        data.append(merged_item)
+    
+    try:
         
-        try:
-            
-            if not data or not isinstance(data, list):
-                print(f"[Warning] 애널리스트 평가 데이터가 비어있거나 형식이 잘못됨: {ticker}")
-                # 빈 데이터라도 캐시를 저장하여 24시간 동안 재호출 방지
-                db.merge(
-                    models.ApiCache(
-                        cache_key=cache_key,
-                        data={"refreshed_at": now.isoformat(), "empty": True},
-                        expires_at=now + timedelta(hours=24),
-                    )
-                )
-                db.commit()
+        if not data or not isinstance(data, list):
+            print(f"[Warning] 애널리스트 평가 데이터가 비어있거나 형식이 잘못됨: {ticker}")
+            # 빈 데이터라도 캐시를 저장하여 24시간 동안 재호출 방지
+            set_cached(db, "analyst_ratings", cache_key, {"refreshed_at": now.isoformat(), "empty": True})
+            db.commit()
+        else:
+            print(f"[Info] 애널리스트 평가 데이터 {len(data)}건 수신: {ticker}")
+            # [디버깅] 첫 번째 항목의 키 확인
+            if len(data) > 0:
+                print(f"[Debug] 첫 번째 항목 키: {list(data[0].keys())}")
+                print(f"[Debug] 첫 번째 항목 샘플: {json.dumps(data[0], indent=2, ensure_ascii=False, default=str)}")
             else:
-                print(f"[Info] 애널리스트 평가 데이터 {len(data)}건 수신: {ticker}")
-                # [디버깅] 첫 번째 항목의 키 확인
-                if len(data) > 0:
-                    print(f"[Debug] 첫 번째 항목 키: {list(data[0].keys())}")
-                    print(f"[Debug] 첫 번째 항목 샘플: {json.dumps(data[0], indent=2, ensure_ascii=False, default=str)}")
-                else:
-                    print(f"[Warning] 데이터가 비어있습니다: {ticker}")
-                
-                saved_count = 0
-                for item in data:
-                    try:
-                        # date 파싱 (문자열을 Date로 변환)
-                        date_str = item.get("date")
-                        if not date_str:
-                            print(f"[Warning] date가 없는 항목 건너뜀: {item}")
-                            continue
-                        
-                        # ISO 형식 또는 YYYY-MM-DD 형식 파싱
-                        if isinstance(date_str, str):
-                            from datetime import datetime as dt
+                print(f"[Warning] 데이터가 비어있습니다: {ticker}")
+            
+            saved_count = 0
+            for item in data:
+                try:
+                    # date 파싱 (문자열을 Date로 변환)
+                    date_str = item.get("date")
+                    if not date_str:
+                        print(f"[Warning] date가 없는 항목 건너뜀: {item}")
+                        continue
+                    
+                    # ISO 형식 또는 YYYY-MM-DD 형식 파싱
+                    if isinstance(date_str, str):
+                        from datetime import datetime as dt
+                        try:
+                            rating_date = dt.fromisoformat(date_str.replace("Z", "+00:00")).date()
+                        except ValueError:
                             try:
-                                rating_date = dt.fromisoformat(date_str.replace("Z", "+00:00")).date()
+                                rating_date = dt.strptime(date_str, "%Y-%m-%d").date()
                             except ValueError:
-                                try:
-                                    rating_date = dt.strptime(date_str, "%Y-%m-%d").date()
-                                except ValueError:
-                                    print(f"[Warning] 날짜 파싱 실패: {date_str}, 건너뜀")
-                                    continue
-                        else:
-                            rating_date = date_str
-                        
-                        # company_profiles에 ticker가 있는지 확인 (Foreign Key 제약조건)
-                        ticker_symbol = item.get("symbol") or ticker
-                        db_profile = db.query(models.CompanyProfile).filter_by(ticker=ticker_symbol).first()
-                        if not db_profile:
-                            print(f"[Warning] company_profiles에 {ticker_symbol}가 없어서 건너뜀 (FK 제약조건)")
-                            continue
-                        
-                        # [수정] FMP API는 집계 통계 데이터를 제공함
-                        # 필드명: analystRatingsStrongBuy, analystRatingsbuy, analystRatingsHold, etc.
-                        # None 체크를 위해 int() 변환 사용
-                        strong_buy = int(item.get("analystRatingsStrongBuy") or 0)
-                        buy = int(item.get("analystRatingsbuy") or 0)  # 소문자 'b' 주의!
-                        hold = int(item.get("analystRatingsHold") or 0)
-                        sell = int(item.get("analystRatingsSell") or 0)
-                        strong_sell = int(item.get("analystRatingsStrongSell") or 0)
-                        
-                        # price_target 추출 (병합된 데이터에서)
-                        price_target = item.get("price_target")
-                        if price_target:
-                            try:
-                                price_target = float(price_target)
-                            except (ValueError, TypeError):
-                                price_target = None
-                        else:
+                                print(f"[Warning] 날짜 파싱 실패: {date_str}, 건너뜀")
+                                continue
+                    else:
+                        rating_date = date_str
+                    
+                    # company_profiles에 ticker가 있는지 확인 (Foreign Key 제약조건)
+                    ticker_symbol = item.get("symbol") or ticker
+                    db_profile = db.query(models.CompanyProfile).filter_by(ticker=ticker_symbol).first()
+                    if not db_profile:
+                        print(f"[Warning] company_profiles에 {ticker_symbol}가 없어서 건너뜀 (FK 제약조건)")
+                        continue
+                    
+                    # [수정] FMP API는 집계 통계 데이터를 제공함
+                    # 필드명: analystRatingsStrongBuy, analystRatingsbuy, analystRatingsHold, etc.
+                    # None 체크를 위해 int() 변환 사용
+                    strong_buy = int(item.get("analystRatingsStrongBuy") or 0)
+                    buy = int(item.get("analystRatingsbuy") or 0)  # 소문자 'b' 주의!
+                    hold = int(item.get("analystRatingsHold") or 0)
+                    sell = int(item.get("analystRatingsSell") or 0)
+                    strong_sell = int(item.get("analystRatingsStrongSell") or 0)
+                    
+                    # price_target 추출 (병합된 데이터에서)
+                    price_target = item.get("price_target")
+                    if price_target:
+                        try:
+                            price_target = float(price_target)
+                        except (ValueError, TypeError):
                             price_target = None
-                        
-                        # [디버깅] 필드값 확인 (첫 번째 항목만 상세 로그)
-                        if saved_count == 0:
-                            print(f"[Debug] API 응답 필드: {list(item.keys())}")
-                            print(f"[Debug] 원본 값 - StrongBuy: {item.get('analystRatingsStrongBuy')}, Buy: {item.get('analystRatingsbuy')}, Hold: {item.get('analystRatingsHold')}")
-                            print(f"[Debug] 변환 후 - StrongBuy: {strong_buy}, Buy: {buy}, Hold: {hold}, Sell: {sell}, StrongSell: {strong_sell}")
-                            print(f"[Debug] Price Target: {price_target}")
-                        
-                        # ticker와 date로 기존 레코드 확인 (집계 데이터이므로 날짜별로 하나만 존재)
-                        exists = (
-                            db.query(models.AnalystRating)
-                            .filter_by(
-                                ticker=ticker_symbol,
-                                date=rating_date,
-                            )
-                            .first()
+                    else:
+                        price_target = None
+                    
+                    # [디버깅] 필드값 확인 (첫 번째 항목만 상세 로그)
+                    if saved_count == 0:
+                        print(f"[Debug] API 응답 필드: {list(item.keys())}")
+                        print(f"[Debug] 원본 값 - StrongBuy: {item.get('analystRatingsStrongBuy')}, Buy: {item.get('analystRatingsbuy')}, Hold: {item.get('analystRatingsHold')}")
+                        print(f"[Debug] 변환 후 - StrongBuy: {strong_buy}, Buy: {buy}, Hold: {hold}, Sell: {sell}, StrongSell: {strong_sell}")
+                        print(f"[Debug] Price Target: {price_target}")
+                    
+                    # ticker와 date로 기존 레코드 확인 (집계 데이터이므로 날짜별로 하나만 존재)
+                    exists = (
+                        db.query(models.AnalystRating)
+                        .filter_by(
+                            ticker=ticker_symbol,
+                            date=rating_date,
                         )
-                        if exists:
-                            # 기존 레코드 업데이트
-                            print(f"[Debug] 기존 레코드 업데이트: {ticker_symbol} {rating_date}")
-                            exists.analyst_ratings_strong_buy = strong_buy
-                            exists.analyst_ratings_buy = buy
-                            exists.analyst_ratings_hold = hold
-                            exists.analyst_ratings_sell = sell
-                            exists.analyst_ratings_strong_sell = strong_sell
-                            exists.price_target = price_target  # 목표주가도 업데이트
-                            saved_count += 1
-                        else:
-                            # 새 레코드 추가
-                            print(f"[Debug] 새 레코드 추가: {ticker_symbol} {rating_date} - StrongBuy: {strong_buy}, Buy: {buy}, Hold: {hold}")
-                            new_record = models.AnalystRating(
-                                ticker=ticker_symbol,
-                                date=rating_date,
-                                analyst_ratings_strong_buy=strong_buy,
-                                analyst_ratings_buy=buy,
-                                analyst_ratings_hold=hold,
-                                analyst_ratings_sell=sell,
-                                analyst_ratings_strong_sell=strong_sell,
-                                # 개별 평가 필드는 NULL (집계 데이터만 저장)
-                                analyst_firm=None,
-                                rating=None,
-                                price_target=price_target,  # price-target-consensus에서 가져온 값
-                            )
-                            db.add(new_record)
-                            saved_count += 1
-                    except Exception as item_exc:
-                        print(f"[Error] 항목 저장 중 오류 (건너뜀): {item_exc}, 항목: {item}")
-                        import traceback
-                        traceback.print_exc()
-                        continue
-
-                print(f"[Info] 애널리스트 평가 {saved_count}건 저장 완료: {ticker}")
-                db.merge(
-                    models.ApiCache(
-                        cache_key=cache_key,
-                        data={"refreshed_at": now.isoformat()},
-                        expires_at=now + timedelta(hours=24),
+                        .first()
                     )
-                )
-                db.commit()
-        except Exception as e:
-            db.rollback()
-            print(f"fetch_analyst_ratings 에러: {e}")
-            import traceback
-            traceback.print_exc()
+                    if exists:
+                        # 기존 레코드 업데이트
+                        print(f"[Debug] 기존 레코드 업데이트: {ticker_symbol} {rating_date}")
+                        exists.analyst_ratings_strong_buy = strong_buy
+                        exists.analyst_ratings_buy = buy
+                        exists.analyst_ratings_hold = hold
+                        exists.analyst_ratings_sell = sell
+                        exists.analyst_ratings_strong_sell = strong_sell
+                        exists.price_target = price_target  # 목표주가도 업데이트
+                        saved_count += 1
+                    else:
+                        # 새 레코드 추가
+                        print(f"[Debug] 새 레코드 추가: {ticker_symbol} {rating_date} - StrongBuy: {strong_buy}, Buy: {buy}, Hold: {hold}")
+                        new_record = models.AnalystRating(
+                            ticker=ticker_symbol,
+                            date=rating_date,
+                            analyst_ratings_strong_buy=strong_buy,
+                            analyst_ratings_buy=buy,
+                            analyst_ratings_hold=hold,
+                            analyst_ratings_sell=sell,
+                            analyst_ratings_strong_sell=strong_sell,
+                            # 개별 평가 필드는 NULL (집계 데이터만 저장)
+                            analyst_firm=None,
+                            rating=None,
+                            price_target=price_target,  # price-target-consensus에서 가져온 값
+                        )
+                        db.add(new_record)
+                        saved_count += 1
+                except Exception as item_exc:
+                    print(f"[Error] 항목 저장 중 오류 (건너뜀): {item_exc}, 항목: {item}")
+                    import traceback
+                    traceback.print_exc()
+                    continue
+
+            print(f"[Info] 애널리스트 평가 {saved_count}건 저장 완료: {ticker}")
+            set_cached(db, "analyst_ratings", cache_key, {"refreshed_at": now.isoformat()})
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"fetch_analyst_ratings 에러: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+@register_tool
+async def fetch_analyst_ratings(
+    ticker: str,
+    db: Session,
+    client: httpx.AsyncClient,
+    limit: int = 10,
+) -> list:
+    """
+    특정 티커(ticker)의 최신 애널리스트 평가 정보(투자의견, 목표주가)를 조회합니다.
+    """
+    cache_key = f"analyst_ratings_{ticker}"
+
+    cache_hit = get_cached(db, "analyst_ratings", cache_key)
+
+    if not cache_hit:
+        # 같은 티커 갱신이 진행 중이면 합류하여 FMP 호출/upsert를 1회로 병합
+        await single_flight(
+            (f"analyst-ratings?limit={limit}", ticker, None),
+            lambda: _refresh_analyst_ratings(ticker, cache_key, limit, db, client),
+            db=db,
+        )
 
     final_ratings = (
         db.query(models.AnalystRating)
@@ -1,18 +1,25 @@
 """기업 검색 관련 서비스 모듈."""
 # app/services/search_service.py
-import asyncio
 import httpx
 import json
-from typing import Optional
+from typing import List, Optional
 from sqlalchemy.orm import Session
-from openai import OpenAI
 
-from app.config import FMP_API_KEY, OPENAI_API_KEY
+from app.config import FMP_API_KEY
 from app import models
+from app.llm_client import chat_completion
 from app.mcp.decorators import register_tool
+from app.services.company_alias_index import AliasMatch, get_alias_index, invalidate_alias_index
+from app.services.learned_aliases import (
+    LEARNED_ALIAS_FIELD,
+    lookup_learned_alias,
+    record_alias_hit,
+    remember_alias,
+)
 
 FMP_BASE_URL = "https://financialmodelingprep.com/api/v3"
-_openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# 티커 변환/번역은 짧은 응답이므로 채팅 턴보다 짧은 타임아웃을 적용
+NAME_RESOLUTION_TIMEOUT = 15.0
 
 
 def _is_korean(text: str) -> bool:
@@ -23,25 +30,19 @@ def _is_korean(text: str) -> bool:
 async def _company_name_to_ticker(company_name: str) -> Optional[str]:
     """회사명(한글/영어)을 티커 심볼로 직접 변환합니다."""
     try:
-        def _call_openai() -> str:
-            response = _openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a financial data expert. Convert company names (Korean or English) to stock ticker symbols. Return ONLY the ticker symbol in uppercase (e.g., AAPL, GOOGL, MSFT), nothing else. If unsure, return the most common ticker.",
-                    },
-                    {"role": "user", "content": f"Convert this company name to ticker symbol: {company_name}"},
-                ],
-                temperature=0,
-            )
-            # [토큰 사용량 로깅] 티커 변환 API 호출
-            if hasattr(response, 'usage') and response.usage:
-                usage = response.usage
-                print(f"[Token Usage] 티커 변환 API - Prompt: {usage.prompt_tokens}, Completion: {usage.completion_tokens}, Total: {usage.total_tokens}")
-            return response.choices[0].message.content or ""
-
-        ticker = await asyncio.to_thread(_call_openai)
+        response = await chat_completion(
+            [
+                {
+                    "role": "system",
+                    "content": "You are a financial data expert. Convert company names (Korean or English) to stock ticker symbols. Return ONLY the ticker symbol in uppercase (e.g., AAPL, GOOGL, MSFT), nothing else. If unsure, return the most common ticker.",
+                },
+                {"role": "user", "content": f"Convert this company name to ticker symbol: {company_name}"},
+            ],
+            label="티커 변환 API",
+            timeout=NAME_RESOLUTION_TIMEOUT,
+            temperature=0,
+        )
+        ticker = response.choices[0].message.content or ""
         ticker = ticker.strip().upper()
         # 티커 형식 검증 (대문자 알파벳만, 1-5자)
         if ticker and ticker.isalpha() and 1 <= len(ticker) <= 5:
@@ -58,25 +59,19 @@ async def _company_name_to_ticker(company_name: str) -> Optional[str]:
 async def _translate_to_english(korean_name: str) -> str:
     """한글 회사명을 영어로 변환합니다. (Fallback용)"""
     try:
-        def _call_openai() -> str:
-            response = _openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a translator. Translate Korean company names to English. Return ONLY the English name, nothing else.",
-                    },
-                    {"role": "user", "content": f"Translate this Korean company name to English: {korean_name}"},
-                ],
-                temperature=0,
-            )
-            # [토큰 사용량 로깅] 번역 API 호출
-            if hasattr(response, 'usage') and response.usage:
-                usage = response.usage
-                print(f"[Token Usage] 번역 API - Prompt: {usage.prompt_tokens}, Completion: {usage.completion_tokens}, Total: {usage.total_tokens}")
-            return response.choices[0].message.content or korean_name
-
-        english_name = await asyncio.to_thread(_call_openai)
+        response = await chat_completion(
+            [
+                {
+                    "role": "system",
+                    "content": "You are a translator. Translate Korean company names to English. Return ONLY the English name, nothing else.",
+                },
+                {"role": "user", "content": f"Translate this Korean company name to English: {korean_name}"},
+            ],
+            label="번역 API",
+            timeout=NAME_RESOLUTION_TIMEOUT,
+            temperature=0,
+        )
+        english_name = response.choices[0].message.content or korean_name
         english_name = english_name.strip()
         print(f"[Translation] '{korean_name}' → '{english_name}'")
         return english_name
@@ -85,25 +80,22 @@ async def _translate_to_english(korean_name: str) -> str:
         return korean_name
 
 
-@register_tool
-async def search_company_by_name(query: str, db: Session, client: httpx.AsyncClient) -> list:
-    """
-    회사 이름(query)으로 티커 심볼을 검색합니다.
-    한글 회사명도 지원합니다 (예: "애플" → "AAPL", "구글" → "GOOGL").
-    """
-    # 1. DB에서 먼저 검색 (한글명, 영문명, 티커 모두 시도)
-    from sqlalchemy import or_
-    db_results = db.query(models.CompanyProfile).filter(
-        or_(
-            models.CompanyProfile.companyName.like(f"%{query}%"),
-            models.CompanyProfile.k_name.like(f"%{query}%"),
-            models.CompanyProfile.ticker.like(f"%{query}%")
-        )
-    ).limit(5).all()
-    
-    if db_results:
-        print(f"[Search] DB에서 {len(db_results)}개 결과 찾음")
-        return [{
+NEXT_STEP_HINT = "Ticker found. NOW YOU MUST CALL 'fetch_company_key_metrics' (Valuation) OR 'fetch_earnings_surprises' (Earnings). DO NOT ANSWER YET."
+
+
+def _profiles_for(db: Session, matches: List[AliasMatch], learned_key: Optional[str] = None) -> list:
+    """조회된 티커의 프로필을 기본키로만 읽어 결과 형식으로 만듭니다 (조회 순서 유지)."""
+    tickers = [match.ticker for match in matches]
+    profiles = {
+        r.ticker: r
+        for r in db.query(models.CompanyProfile).filter(models.CompanyProfile.ticker.in_(tickers)).all()
+    }
+    results = []
+    for match in matches:
+        r = profiles.get(match.ticker)
+        if r is None:
+            continue
+        item = {
             "ticker": r.ticker,
             "companyName": r.companyName,
             "k_name": r.k_name,
@@ -111,38 +103,74 @@ async def search_company_by_name(query: str, db: Session, client: httpx.AsyncCli
             "sector": r.sector,
             "website": r.website,
             "logo_url": r.logo_url,
-            "next_step_hint": "Ticker found. NOW YOU MUST CALL 'fetch_company_key_metrics' (Valuation) OR 'fetch_earnings_surprises' (Earnings). DO NOT ANSWER YET."
-        } for r in db_results]
-    
-    # 2. [NEW] DB 검색 실패 시, 한글이면 번역 후 재시도
-    print(f"[Search] DB에 '{query}' 검색 결과 없음")
-    
-    # 한글 감지 (간단한 방법: 한글 유니코드 범위 체크)
-    if any('\uac00' <= char <= '\ud7a3' for char in query):
+            "match_type": match.match_type,
+            "next_step_hint": NEXT_STEP_HINT,
+        }
+        if learned_key:
+            # 답변까지 정상 완료되면 수락으로 기록 (app/mcp/service.py)
+            item[LEARNED_ALIAS_FIELD] = learned_key
+        results.append(item)
+    return results
+
+
+def _learn(db: Session, query: str, ticker: str, source: str, llm_calls: int) -> Optional[str]:
+    """LLM 변환 결과를 학습 별칭으로 저장합니다. 저장 실패는 검색 결과에 영향을 주지 않습니다."""
+    try:
+        key = remember_alias(db, query, ticker, source, llm_calls)
+        db.commit()
+        return key
+    except Exception as e:
+        db.rollback()
+        print(f"[Learned Alias] 저장 실패: {e}")
+        return None
+
+
+@register_tool
+async def search_company_by_name(query: str, db: Session, client: httpx.AsyncClient) -> list:
+    """
+    회사 이름(query)으로 티커 심볼을 검색합니다.
+    한글 회사명도 지원합니다 (예: "애플" → "AAPL", "구글" → "GOOGL").
+    """
+    # 1. 메모리 별칭 인덱스 (티커/영문명/한글명/별칭, 접두어, 오타 허용) - DB 스캔/LLM 호출 없음
+    index = get_alias_index(db)
+    matches = index.resolve(query, limit=5)
+    if matches:
+        print(f"[Search] 별칭 인덱스에서 {len(matches)}개 결과 찾음 ({matches[0].match_type})")
+        return _profiles_for(db, matches)
+
+    print(f"[Search] 별칭 인덱스에 '{query}' 검색 결과 없음")
+
+    # 2. 이전에 LLM으로 찾아 둔 학습 별칭 (기본키 조회 1회, LLM 호출 없음)
+    learned = lookup_learned_alias(db, query)
+    if learned is not None and learned.ticker in index.tickers:
+        print(f"[Search] 학습 별칭 재사용: '{query}' → {learned.ticker} (LLM {learned.llm_calls}회 절약)")
+        key, ticker = learned.query_key, learned.ticker
+        try:
+            promoted = record_alias_hit(db, learned)
+            db.commit()
+            if promoted:
+                invalidate_alias_index()
+        except Exception as e:
+            db.rollback()
+            print(f"[Learned Alias] 사용 기록 실패: {e}")
+        return _profiles_for(db, [AliasMatch(ticker, query, "learned", 1.0)], learned_key=key)
+
+    # 3. 인덱스에 없는 한글명이면 번역 후 재시도
+    if _is_korean(query):
         print(f"[Search] 한글 감지, 번역 시도: '{query}'")
-        translated_query = await translate_korean_to_english(query)
-        
-        # 번역된 이름으로 재검색
-        db_results_translated = db.query(models.CompanyProfile).filter(
-            or_(
-                models.CompanyProfile.companyName.like(f"%{translated_query}%"),
-                models.CompanyProfile.ticker.like(f"%{translated_query}%")
-            )
-        ).limit(5).all()
-        
-        if db_results_translated:
-            print(f"[Search] 번역 후 DB에서 {len(db_results_translated)}개 결과 찾음")
-            return [{
-                "ticker": r.ticker,
-                "companyName": r.companyName,
-                "k_name": r.k_name,
-                "industry": r.industry,
-                "sector": r.sector,
-                "website": r.website,
-                "logo_url": r.logo_url,
-                "next_step_hint": "Ticker found. NOW YOU MUST CALL 'fetch_company_key_metrics' (Valuation) OR 'fetch_earnings_surprises' (Earnings). DO NOT ANSWER YET."
-            } for r in db_results_translated]
-    
-    # 3. 최종 실패
+        translated_query = await _translate_to_english(query)
+        matches = index.resolve(translated_query, limit=5)
+        if matches:
+            print(f"[Search] 번역 후 별칭 인덱스에서 {len(matches)}개 결과 찾음")
+            key = _learn(db, query, matches[0].ticker, "llm_translation", llm_calls=1)
+            return _profiles_for(db, matches[:1], learned_key=key) + _profiles_for(db, matches[1:])
+
+        # 4. 번역명으로도 못 찾으면 티커를 직접 물어봄 (DB에 있는 기업만 인정)
+        ticker = await _company_name_to_ticker(query)
+        if ticker and ticker in index.tickers:
+            key = _learn(db, query, ticker, "llm_ticker", llm_calls=2)
+            return _profiles_for(db, [AliasMatch(ticker, query, "llm", 1.0)], learned_key=key)
+
+    # 5. 최종 실패
     print(f"[Search] 최종 검색 실패: '{query}'")
     return []
@@ -1,12 +1,11 @@
 # app/services/timeseries_service.py
 import httpx
 import json
-from datetime import datetime, timedelta
 from typing import Dict, Any, List
 
 from sqlalchemy.orm import Session
 from app.config import FMP_API_KEY, FMP_BASE_URL
-from app import models
+from app.cache import get_cached, set_cached
 from app.mcp.decorators import register_tool
 
 @register_tool
@@ -34,21 +33,16 @@ async def fetch_market_time_series(
     """
     # 1. 캐시 키 생성 (ticker 기준, 1시간 유효)
     cache_key = f"fmp_historical_analysis_v1:{ticker}"
-    now = datetime.now()
     
-    # 2. 캐시 조회
-    cached_data = db.query(models.ApiCache).filter(
-        models.ApiCache.cache_key == cache_key,
-        models.ApiCache.expires_at > now
-    ).first()
+    # 2. 캐시 조회 (메모리 → api_cache)
+    cached_data = get_cached(db, "price_history", cache_key)
 
     history_data = []
 
     if cached_data:
-        print(f"[Cache HIT] 주가 데이터 분석 캐시 사용: {ticker}")
-        history_data = cached_data.data  # JSON으로 저장된 리스트
+        history_data = cached_data  # JSON으로 저장된 리스트
     else:
-        print(f"[Cache MISS] FMP API 호출: /historical-price-full/{ticker} (60일)")
+        print(f"FMP API 호출: /historical-price-full/{ticker} (60일)")
         # 최근 60일(약 2달) 데이터 요청 -> 1주/1달 변동폭 계산에 충분
         url = f"{FMP_BASE_URL}/historical-price-full/{ticker}?timeseries=70&apikey={FMP_API_KEY}"
         
@@ -63,22 +57,8 @@ async def fetch_market_time_series(
             if not history_data:
                 return {"error": f"데이터를 찾을 수 없습니다: {ticker}"}
 
-            # 캐시 저장 (1시간 = 60분)
-            expires_at = now + timedelta(minutes=60)
-            
-            # 기존 캐시가 있으면 업데이트, 없으면 생성 (upsert 로직)
-            existing_cache = db.query(models.ApiCache).filter(models.ApiCache.cache_key == cache_key).first()
-            if existing_cache:
-                existing_cache.data = history_data
-                existing_cache.expires_at = expires_at
-            else:
-                new_cache = models.ApiCache(
-                    cache_key=cache_key,
-                    data=history_data,
-                    expires_at=expires_at
-                )
-                db.add(new_cache)
-            
+            # 캐시 저장 (1시간 = 60분, merge로 upsert)
+            set_cached(db, "price_history", cache_key, history_data)
             db.commit()
             
         except Exception as e:
@@ -0,0 +1,201 @@
+"""실적발표 컨퍼런스 콜 전문 저장소 + 문단 검색 모듈."""
+# app/services/transcript_store.py
+#
+# - 전문은 (ticker, year, quarter)당 1건, zlib 압축으로 저장 (FMP 재호출 없음)
+# - 저장 시 "발언자: 내용" 줄 단위로 문단을 나누고, 긴 발언은 PASSAGE_MAX_WORDS 단위로 분할
+# - 문단별 BM25 단어 빈도를 함께 저장하고, 검색 시에는 전문 압축 해제 + 점수 계산만 수행
+#   (같은 전문의 인덱스는 메모리 LRU에 보관)
+import re
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.cache import LRUTTLCache
+from app.services.bm25 import BM25Index, term_frequencies
+
+# 문단 하나의 최대 단어 수 (top-k 문단만 보내므로 너무 길면 토큰 절감 효과가 줄어듦)
+PASSAGE_MAX_WORDS = 220
+# 이보다 짧은 발언("Thank you.", "Next question.")은 앞 문단에 붙이지 않고 인덱스에서 제외
+PASSAGE_MIN_WORDS = 8
+
+INDEX_CACHE_SIZE = 64
+INDEX_CACHE_TTL_SECONDS = 6 * 3600
+
+# "Tim Cook: ...", "Operator: ..." 형태의 발언 시작 줄
+_SPEAKER_LINE = re.compile(r"^([A-Z][A-Za-z0-9.,'&\- ]{1,80}?):\s+")
+# Operator가 질의응답 시작을 알리는 문구
+_QA_START = re.compile(r"question[- ]and[- ]answer|q\s*&\s*a|first question|open (?:up )?the (?:call|line)s? (?:for|to) questions", re.IGNORECASE)
+_WORD = re.compile(r"\S+")
+
+_index_cache = LRUTTLCache(INDEX_CACHE_SIZE)
+
+
+def compress_content(content: str) -> bytes:
+    return zlib.compress(content.encode("utf-8"), 6)
+
+
+def decompress_content(blob: bytes) -> str:
+    return zlib.decompress(blob).decode("utf-8")
+
+
+def _chunk_turn(content: str, start: int, end: int) -> List[Tuple[int, int]]:
+    """긴 발언을 단어 경계 기준 PASSAGE_MAX_WORDS 단위 구간으로 나눕니다."""
+    words = list(_WORD.finditer(content, start, end))
+    if len(words) <= PASSAGE_MAX_WORDS:
+        return [(start, end)]
+    spans = []
+    for i in range(0, len(words), PASSAGE_MAX_WORDS):
+        chunk = words[i:i + PASSAGE_MAX_WORDS]
+        spans.append((chunk[0].start(), chunk[-1].end()))
+    return spans
+
+
+def split_passages(content: str) -> List[Dict[str, Any]]:
+    """
+    전문을 발언자 단위 문단 목록으로 나눕니다.
+    반환: [{"speaker", "section", "char_start", "char_end"}] (구간은 content 기준 글자 위치)
+    """
+    turns: List[Tuple[Optional[str], int, int]] = []
+    speaker: Optional[str] = None
+    turn_start = 0
+    offset = 0
+    for line in content.splitlines(keepends=True):
+        match = _SPEAKER_LINE.match(line)
+        if match:
+            if offset > turn_start:
+                turns.append((speaker, turn_start, offset))
+            speaker = match.group(1).strip()
+            turn_start = offset + match.end()
+        offset += len(line)
+    if offset > turn_start:
+        turns.append((speaker, turn_start, offset))
+
+    passages = []
+    section = "prepared"
+    for speaker, start, end in turns:
+        text = content[start:end]
+        if section == "prepared" and (speaker or "").lower() == "operator" and _QA_START.search(text):
+            section = "qa"
+        if len(_WORD.findall(text)) < PASSAGE_MIN_WORDS:
+            continue
+        for chunk_start, chunk_end in _chunk_turn(content, start, end):
+            passages.append({
+                "speaker": speaker,
+                "section": section,
+                "char_start": chunk_start,
+                "char_end": chunk_end,
+            })
+    return passages
+
+
+def get_transcript(db: Session, ticker: str, year: int, quarter: int) -> Optional[models.EarningsCallTranscript]:
+    return (
+        db.query(models.EarningsCallTranscript)
+        .filter_by(ticker=ticker, year=year, quarter=quarter)
+        .first()
+    )
+
+
+def get_latest_transcript(db: Session, ticker: str) -> Optional[models.EarningsCallTranscript]:
+    return (
+        db.query(models.EarningsCallTranscript)
+        .filter_by(ticker=ticker)
+        .order_by(models.EarningsCallTranscript.year.desc(), models.EarningsCallTranscript.quarter.desc())
+        .first()
+    )
+
+
+def store_transcript(db: Session, data: Dict[str, Any]) -> Optional[models.EarningsCallTranscript]:
+    """
+    FMP 응답 1건을 압축 저장하고 문단/단어 빈도를 함께 만듭니다. (commit은 호출하는 쪽에서 수행)
+    이미 있으면 내용을 교체합니다 (FMP가 전문을 정정하는 경우).
+    """
+    ticker = data.get("symbol")
+    year = data.get("year")
+    quarter = data.get("quarter")
+    content = data.get("content") or ""
+    if not ticker or not year or not quarter or not content:
+        return None
+
+    date = data.get("date")
+    if isinstance(date, str):
+        try:
+            date = datetime.fromisoformat(date)
+        except ValueError:
+            date = None
+
+    transcript = get_transcript(db, ticker, int(year), int(quarter))
+    if transcript is None:
+        transcript = models.EarningsCallTranscript(ticker=ticker, year=int(year), quarter=int(quarter))
+        db.add(transcript)
+    else:
+        transcript.passages.clear()
+        _index_cache.delete(str(transcript.id))
+
+    transcript.date = date
+    transcript.content_zlib = compress_content(content)
+    transcript.content_length = len(content)
+    transcript.fetched_at = datetime.utcnow()
+
+    for seq, passage in enumerate(split_passages(content)):
+        freqs, token_count = term_frequencies(content[passage["char_start"]:passage["char_end"]])
+        transcript.passages.append(models.EarningsCallPassage(
+            seq=seq,
+            term_freqs=freqs,
+            token_count=token_count,
+            **passage,
+        ))
+
+    print(
+        f"[Transcript] 저장: {ticker} {year}Q{quarter} "
+        f"{len(content):,}자 → {len(transcript.content_zlib):,}B, 문단 {len(transcript.passages)}개"
+    )
+    return transcript
+
+
+def _load_index(transcript: models.EarningsCallTranscript) -> Tuple[BM25Index, str, List[Tuple[Any, ...]]]:
+    # ORM 객체는 세션이 끝나면 만료되므로 캐시에는 평범한 값만 보관
+    key = str(transcript.id)
+    hit, cached = _index_cache.get(key)
+    if hit and cached[0] == transcript.fetched_at:
+        return cached[1]
+    passages = [
+        (p.seq, p.speaker, p.section, p.char_start, p.char_end)
+        for p in transcript.passages
+    ]
+    index = BM25Index([(p.term_freqs or {}, p.token_count) for p in transcript.passages])
+    loaded = (index, decompress_content(transcript.content_zlib), passages)
+    _index_cache.set(key, (transcript.fetched_at, loaded), INDEX_CACHE_TTL_SECONDS)
+    return loaded
+
+
+def search_passages(
+    transcript: models.EarningsCallTranscript,
+    query: str,
+    top_k: int = 5,
+) -> List[Dict[str, Any]]:
+    """질문과 관련된 문단 top_k개를 점수순으로 반환합니다."""
+    index, content, passages = _load_index(transcript)
+    results = []
+    for position, score in index.search(query, top_k=top_k):
+        seq, speaker, section, char_start, char_end = passages[position]
+        results.append({
+            "seq": seq,
+            "speaker": speaker,
+            "section": section,
+            "score": round(score, 3),
+            "text": content[char_start:char_end].strip(),
+        })
+    return results
+
+
+def passage_count(transcript: models.EarningsCallTranscript) -> int:
+    """문단 수 (캐시된 인덱스 기준이라 passages를 다시 읽지 않음)"""
+    return len(_load_index(transcript)[2])
+
+
+def transcript_content(transcript: models.EarningsCallTranscript) -> str:
+    return decompress_content(transcript.content_zlib)
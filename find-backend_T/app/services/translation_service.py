@@ -2,17 +2,14 @@ from __future__ import annotations
 
 """텍스트 번역을 담당하는 서비스 모듈."""
 
-import asyncio
 import json
 from typing import Any, Dict
 
-from openai import OpenAI
-
-from app.config import OPENAI_API_KEY
-
-_client = OpenAI(api_key=OPENAI_API_KEY)
+from app.llm_client import chat_completion
 
 PROFILE_FIELDS_TO_TRANSLATE = ("description", "industry", "sector")
+# description 번역은 출력이 길어 티커 변환보다 넉넉한 타임아웃을 둡니다.
+TRANSLATION_TIMEOUT = 30.0
 
 
 async def translate_company_profile(profile: Dict[str, Any]) -> Dict[str, str]:
@@ -38,10 +35,9 @@ async def translate_company_profile(profile: Dict[str, Any]) -> Dict[str, str]:
         f"{json.dumps(candidates, ensure_ascii=False)}"
     )
 
-    def _call_openai() -> str:
-        response = _client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
+    try:
+        response = await chat_completion(
+            [
                 {
                     "role": "system",
                     "content": "당신은 금융 데이터를 자연스럽게 번역하는 전문 번역가입니다. "
@@ -49,16 +45,11 @@ async def translate_company_profile(profile: Dict[str, Any]) -> Dict[str, str]:
                 },
                 {"role": "user", "content": prompt},
             ],
+            label="프로필 번역 API",
+            timeout=TRANSLATION_TIMEOUT,
             temperature=0,
         )
-        # [토큰 사용량 로깅] 프로필 번역 API 호출
-        if hasattr(response, 'usage') and response.usage:
-            usage = response.usage
-            print(f"[Token Usage] 프로필 번역 API - Prompt: {usage.prompt_tokens}, Completion: {usage.completion_tokens}, Total: {usage.total_tokens}")
-        return response.choices[0].message.content or ""
-
-    try:
-        completion_text = await asyncio.to_thread(_call_openai)
+        completion_text = response.choices[0].message.content or ""
         completion_text = completion_text.strip()
         if completion_text.startswith("```"):
             # 코드 블록 형태로 응답하는 경우 ```` 제거
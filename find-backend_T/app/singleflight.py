@@ -0,0 +1,75 @@
+# app/singleflight.py
+# 동일한 업스트림(FMP) 갱신 요청을 하나로 합치는 single-flight 레이어입니다.
+#
+# 여러 사용자가 같은 티커를 동시에 묻거나, 한 에이전트 턴에서 같은 데이터를
+# 필요로 하는 도구가 함께 실행되면 캐시 MISS마다 동일한 FMP 호출과 upsert가
+# 경쟁적으로 발생합니다(→ FMP 쿼터 낭비, Duplicate entry 재시도 폭주).
+#
+# (endpoint, ticker, period) 키로 진행 중인 갱신 작업을 등록해 두고,
+# 같은 키의 후속 요청은 새로 호출하지 않고 리더의 작업 완료를 기다립니다.
+#   - 리더: FMP 호출 + DB upsert + commit 을 1회 수행
+#   - 팔로워: 리더 완료 후 자신의 세션 스냅샷을 갱신하고 DB(또는 반환값)를 재사용
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from app.database import AnySession, db_commit
+
+# 리더가 취소되어 결과 없이 끝났음을 팔로워에게 알리는 표식
+_ABANDONED = object()
+
+_inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+_stats = {"leaders": 0, "followers": 0}
+
+
+async def single_flight(
+    key: Hashable,
+    factory: Callable[[], Awaitable[Any]],
+    db: Optional[AnySession] = None,
+) -> Any:
+    """
+    key에 해당하는 작업이 이미 진행 중이면 그 결과를 공유하고,
+    없으면 factory()를 실행하는 리더가 됩니다.
+
+    db(Session 또는 AsyncSession)가 주어지면 팔로워는 대기 후 현재 트랜잭션을 종료합니다.
+    (MySQL REPEATABLE READ 스냅샷이 남아 있으면 리더가 커밋한 행이 보이지 않음)
+    """
+    while True:
+        future = _inflight.get(key)
+        if future is None:
+            break
+
+        _stats["followers"] += 1
+        print(f"[SingleFlight] 진행 중인 요청에 합류: {key}")
+        result = await asyncio.shield(future)
+        if result is _ABANDONED:
+            # 리더가 취소됨 → 다시 시도 (이번엔 리더가 될 수 있음)
+            continue
+        if db is not None:
+            await db_commit(db)
+        return result
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    _stats["leaders"] += 1
+    try:
+        result = await factory()
+    except Exception as exc:
+        future.set_exception(exc)
+        future.exception()  # 팔로워가 없을 때 "never retrieved" 경고 방지
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        if not future.done():
+            # 취소 등으로 결과 없이 끝난 경우
+            future.set_result(_ABANDONED)
+        _inflight.pop(key, None)
+
+
+def single_flight_stats() -> Dict[str, int]:
+    """리더(실제 호출) / 팔로워(합류) 횟수와 현재 진행 중인 키 수를 반환합니다."""
+    return {**_stats, "inflight": len(_inflight)}
@@ -2,7 +2,7 @@
 
 import os
 import httpx
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
@@ -14,9 +14,16 @@ from app.routers import company
 from app.routers import market
 from app.routers import agent
 from app.routers import auth
+from app.routers import admin
 
-from app.database import engine, SessionLocal
+from app.database import async_engine, engine, SessionLocal
 from app import models
+from app.llm_client import close_llm_client
+from app.password_hasher import shutdown_password_hasher
+from app.metrics import CONTENT_TYPE, InstrumentedTransport, MetricsMiddleware, render_metrics
+from app.query_counter import QueryStatsMiddleware
+from app.config import PROFILER_ADMIN_TOKEN
+from app.profiler import ProfilerMiddleware
 from sqlalchemy import text
 
 
@@ -30,7 +37,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Queries", "X-DB-Time-Ms", "X-DB-Max-Repeat", "X-Profile-Id"],
 )
+# 관리자 토큰이 설정된 경우에만 요청 단위 프로파일러 등록 (미설정 시 오버헤드 없음)
+# QueryStatsMiddleware 안쪽에 있어야 요청의 DB 시간을 함께 기록할 수 있음
+if PROFILER_ADMIN_TOKEN:
+    app.add_middleware(ProfilerMiddleware)
+# 라우트별 처리 시간 (/metrics)
+app.add_middleware(MetricsMiddleware)
+# 요청별 쿼리 수/DB 시간 응답 헤더 + N+1 감지 (app/query_counter.py)
+app.add_middleware(QueryStatsMiddleware)
 
 # 2. 앱에 company 라우터를 포함시킵니다
 # 이제 company.py에 있는 모든 API가 자동으로 앱에 등록됩니다.
@@ -38,16 +54,21 @@ app.include_router(company.router)
 app.include_router(market.router)
 app.include_router(agent.router)
 app.include_router(auth.router)
+app.include_router(admin.router)
 # 3. 비동기 API 호출을 위한 클라이언트 (앱 실행 시 생성, 종료 시 해제)
 # 이 클라이언트는 이제 company.py에서도 Depends를 통해 사용할 수 있습니다.
 @app.on_event("startup")
 async def startup_event():
-    app.state.httpx_client = httpx.AsyncClient()
+    # 외부 API(FMP, Twelve Data) 호출 지연시간/상태 코드를 /metrics에 기록
+    app.state.httpx_client = httpx.AsyncClient(transport=InstrumentedTransport())
     print("FastAPI 앱이 시작되었습니다. API 클라이언트가 준비되었습니다.")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     await app.state.httpx_client.aclose()
+    await close_llm_client()
+    shutdown_password_hasher()
+    await async_engine.dispose()
     print("FastAPI 앱이 종료됩니다.")
 
 
@@ -85,4 +106,8 @@ def check_db_connection():
             "database": engine.url.database if engine.url else None,
             "host": engine.url.host if engine.url else None,
             "port": engine.url.port if engine.url else None
-        }
\ No newline at end of file
+        }
+# 6. Prometheus 지표 (라우트/도구/외부 API/LLM/캐시/DB 풀)
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
@@ -0,0 +1,5 @@
+-- chat_history 사용자별 최신순 조회용 복합 인덱스
+-- 기존에는 user_id FK 인덱스만 있어 사용자의 전체 대화를 읽은 뒤 created_at으로 filesort 했음
+-- (user_id, created_at, id) 인덱스로 최근 N개 / 키셋 페이지를 인덱스 순서대로 바로 읽음
+ALTER TABLE chat_history
+    ADD INDEX ix_chat_history_user_created (user_id, created_at, id);
@@ -0,0 +1,12 @@
+-- Key Metrics 최종 응답(평균/YoY/위젯) 사전 계산 테이블
+-- key_metrics 갱신 시 (ticker, period) 단위로 삭제되고, 다음 조회 시 재계산되어 저장됨
+CREATE TABLE IF NOT EXISTS company_derived_metrics (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    ticker VARCHAR(20) NOT NULL,
+    period VARCHAR(20) NOT NULL DEFAULT 'annual',
+    row_limit INT NOT NULL,
+    payload JSON NOT NULL,
+    computed_at DATETIME NOT NULL,
+    CONSTRAINT _cdm_ticker_period_limit_uc UNIQUE (ticker, period, row_limit),
+    CONSTRAINT fk_cdm_ticker FOREIGN KEY (ticker) REFERENCES company_profiles (ticker)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
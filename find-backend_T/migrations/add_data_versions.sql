@@ -0,0 +1,10 @@
+-- (ticker, dataset)별 원천 데이터 버전
+-- 재무/실적/뉴스 저장 시 version이 1씩 증가하며, 채팅 답변 캐시 키에 포함되어
+-- 원천 데이터가 바뀌면 이전 답변이 자동으로 무효화됨
+CREATE TABLE IF NOT EXISTS data_versions (
+    ticker VARCHAR(20) NOT NULL,
+    dataset VARCHAR(40) NOT NULL,
+    version INT NOT NULL DEFAULT 1,
+    updated_at DATETIME NOT NULL,
+    PRIMARY KEY (ticker, dataset)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
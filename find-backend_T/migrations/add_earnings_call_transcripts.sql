@@ -0,0 +1,29 @@
+-- 실적발표 컨퍼런스 콜 전문 저장소
+-- 전문은 zlib 압축(MEDIUMBLOB)으로 (ticker, year, quarter)당 1건 저장하고,
+-- 발언자/Q&A 단위 문단은 전문 내 글자 구간 + BM25 단어 빈도만 저장함
+CREATE TABLE IF NOT EXISTS earnings_call_transcripts (
+    id INT NOT NULL AUTO_INCREMENT,
+    ticker VARCHAR(20) NOT NULL,
+    year INT NOT NULL,
+    quarter INT NOT NULL,
+    date DATETIME NULL,
+    content_zlib MEDIUMBLOB NOT NULL,
+    content_length INT NOT NULL,
+    fetched_at DATETIME NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE KEY _transcript_ticker_year_quarter_uc (ticker, year, quarter)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS earnings_call_passages (
+    transcript_id INT NOT NULL,
+    seq INT NOT NULL,
+    speaker VARCHAR(255) NULL,
+    section VARCHAR(10) NOT NULL,
+    char_start INT NOT NULL,
+    char_end INT NOT NULL,
+    term_freqs JSON NOT NULL,
+    token_count INT NOT NULL,
+    PRIMARY KEY (transcript_id, seq),
+    CONSTRAINT fk_passage_transcript FOREIGN KEY (transcript_id)
+        REFERENCES earnings_call_transcripts (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
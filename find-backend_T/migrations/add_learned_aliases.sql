@@ -0,0 +1,18 @@
+-- LLM으로 찾은 기업명 → 티커 변환 결과
+-- 같은 표현이 다시 들어오면 LLM 대신 재사용하고, 재사용/수락이 쌓이면 promoted=1로
+-- 메모리 별칭 인덱스(app/services/company_alias_index.py)에 포함됨
+CREATE TABLE IF NOT EXISTS learned_aliases (
+    query_key VARCHAR(255) NOT NULL,
+    query_text VARCHAR(255) NOT NULL,
+    ticker VARCHAR(20) NOT NULL,
+    confidence FLOAT NOT NULL,
+    source VARCHAR(30) NOT NULL,
+    llm_calls INT NOT NULL DEFAULT 1,
+    hits INT NOT NULL DEFAULT 0,
+    accepts INT NOT NULL DEFAULT 0,
+    llm_calls_saved INT NOT NULL DEFAULT 0,
+    promoted TINYINT(1) NOT NULL DEFAULT 0,
+    created_at DATETIME NOT NULL,
+    last_used_at DATETIME NOT NULL,
+    PRIMARY KEY (query_key)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
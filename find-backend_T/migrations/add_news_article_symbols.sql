@@ -0,0 +1,21 @@
+-- 뉴스 ↔ 종목 매핑 테이블 (symbols LIKE '%TICKER%' 풀스캔 대체)
+CREATE TABLE IF NOT EXISTS news_article_symbols (
+    article_id INT NOT NULL,
+    symbol VARCHAR(20) NOT NULL,
+    publishedDate TIMESTAMP NOT NULL,
+    PRIMARY KEY (article_id, symbol),
+    INDEX ix_news_symbol_published (symbol, publishedDate),
+    CONSTRAINT fk_nas_article FOREIGN KEY (article_id) REFERENCES news_articles (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 기존 기사 백필: 쉼표로 구분된 symbols 컬럼을 행 단위로 분해 (MySQL 8 JSON_TABLE)
+INSERT IGNORE INTO news_article_symbols (article_id, symbol, publishedDate)
+SELECT a.id, UPPER(TRIM(j.symbol)), a.publishedDate
+FROM news_articles a
+JOIN JSON_TABLE(
+    CONCAT('["', REPLACE(REPLACE(a.symbols, '"', ''), ',', '","'), '"]'),
+    '$[*]' COLUMNS (symbol VARCHAR(20) PATH '$')
+) j
+WHERE a.symbols IS NOT NULL
+  AND a.symbols <> ''
+  AND TRIM(j.symbol) <> '';
@@ -0,0 +1,70 @@
+"""
+기업명 → 티커 변환 속도 측정: 메모리 별칭 인덱스(resolve) vs 기존 LIKE '%query%' 3중 스캔.
+
+사용법:
+    python scripts/bench_alias_resolve.py
+    python scripts/bench_alias_resolve.py 애플 앤비디아 "마이크로 소프트" --runs 200
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import or_
+
+from app import models
+from app.database import SessionLocal
+from app.services.company_alias_index import get_alias_index
+
+SAMPLES = ["애플", "엔비디아", "앤비디아", "구글", "마이크로 소프트", "microsfot", "Coca-Cola", "NVDA", "테슬"]
+
+
+def like_scan(db, query: str) -> list:
+    return db.query(models.CompanyProfile).filter(
+        or_(
+            models.CompanyProfile.companyName.like(f"%{query}%"),
+            models.CompanyProfile.k_name.like(f"%{query}%"),
+            models.CompanyProfile.ticker.like(f"%{query}%"),
+        )
+    ).limit(5).all()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("queries", nargs="*")
+    parser.add_argument("--runs", type=int, default=100)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        index = get_alias_index(db)
+        print(f"인덱스 구축: {(time.perf_counter() - start) * 1000:.1f}ms\n")
+
+        for query in args.queries or SAMPLES:
+            index_times, like_times = [], []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                matches = index.resolve(query)
+                index_times.append((time.perf_counter() - start) * 1000)
+            for _ in range(max(1, args.runs // 10)):
+                start = time.perf_counter()
+                rows = like_scan(db, query)
+                like_times.append((time.perf_counter() - start) * 1000)
+            resolved = [f"{m.ticker}({m.match_type})" for m in matches]
+            print(
+                f"{query:<16} index p50={statistics.median(index_times):.3f}ms {resolved} | "
+                f"LIKE p50={statistics.median(like_times):.2f}ms {[r.ticker for r in rows]}"
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+대화 기록 조회 벤치마크: (user_id, created_at, id) 복합 인덱스 + 키셋 페이지네이션.
+
+임시 테이블(bench_chat_history)에 합성 대화 N건(기본 1,000만)을 여러 사용자에게 나눠 적재하면서
+--checkpoints 구간마다 다음 쿼리의 응답 시간을 측정해, 테이블이 커져도 일정한지 확인합니다.
+1) 에이전트 최근 대화 로드: WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT 2
+2) 기록 API 첫 페이지:      ... LIMIT 21
+3) 기록 API 깊은 페이지:    키셋 (created_at, id) < 커서  vs  OFFSET
+마지막에 인덱스가 없는 경우(user_id 단일 인덱스만 있는 기존 스키마)와 EXPLAIN을 비교합니다.
+측정이 끝나면 임시 테이블은 삭제됩니다 (--keep 으로 유지 가능).
+
+사용법:
+    python scripts/bench_chat_history_pagination.py --rows 10000000 --users 50000
+    python scripts/bench_chat_history_pagination.py --rows 1000000 --checkpoints 4
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+
+TABLE = "bench_chat_history"
+BATCH = 20_000
+PAGE = 20
+
+RECENT_QUERY = f"""
+    SELECT id, role, content, created_at FROM {TABLE}
+    WHERE user_id = :user_id
+    ORDER BY created_at DESC, id DESC
+    LIMIT 2
+"""
+
+FIRST_PAGE_QUERY = f"""
+    SELECT id, role, content, created_at FROM {TABLE}
+    WHERE user_id = :user_id
+    ORDER BY created_at DESC, id DESC
+    LIMIT {PAGE + 1}
+"""
+
+KEYSET_QUERY = f"""
+    SELECT id, role, content, created_at FROM {TABLE}
+    WHERE user_id = :user_id
+      AND (created_at < :created_at OR (created_at = :created_at AND id < :id))
+    ORDER BY created_at DESC, id DESC
+    LIMIT {PAGE + 1}
+"""
+
+OFFSET_QUERY = f"""
+    SELECT id, role, content, created_at FROM {TABLE}
+    WHERE user_id = :user_id
+    ORDER BY created_at DESC, id DESC
+    LIMIT {PAGE + 1} OFFSET :offset
+"""
+
+
+def create_table(conn) -> None:
+    conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    conn.execute(text(f"""
+        CREATE TABLE {TABLE} (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            role VARCHAR(20) NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+            INDEX ix_bench_user (user_id),
+            INDEX ix_bench_user_created (user_id, created_at, id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """))
+
+
+def populate(conn, start_id: int, end_id: int, users: int, heavy_user: int, rng: random.Random) -> None:
+    """
+    id 순서대로 시간이 흐르도록 적재합니다 (실제 대화처럼 created_at이 단조 증가).
+    heavy_user는 전체의 약 1%를 차지하는 대화량이 많은 사용자입니다.
+    """
+    base = datetime(2024, 1, 1)
+    next_id = start_id
+    while next_id <= end_id:
+        rows = []
+        for message_id in range(next_id, min(next_id + BATCH, end_id + 1)):
+            user_id = heavy_user if rng.random() < 0.01 else rng.randint(1, users)
+            rows.append({
+                "id": message_id,
+                "user_id": user_id,
+                "role": "user" if message_id % 2 else "assistant",
+                "content": f"[bench] message {message_id}",
+                # 초 단위 TIMESTAMP라 같은 초에 여러 메시지가 생김 → id로 순서 보장
+                "created_at": base + timedelta(seconds=message_id // 3),
+            })
+        conn.execute(
+            text(f"INSERT INTO {TABLE} (id, user_id, role, content, created_at) "
+                 "VALUES (:id, :user_id, :role, :content, :created_at)"),
+            rows,
+        )
+        next_id += BATCH
+
+
+def timed(conn, sql: str, params: dict, repeat: int):
+    timings = []
+    rows = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = conn.execute(text(sql), params).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), rows
+
+
+def explain(conn, sql: str, params: dict) -> None:
+    for row in conn.execute(text("EXPLAIN " + sql), params).mappings():
+        print(f"    type={row['type']} key={row['key']} rows={row['rows']} extra={row['Extra']}")
+
+
+def deep_cursor(conn, user_id: int, depth: int):
+    """depth번째 메시지의 (created_at, id) - 깊은 페이지의 키셋 커서 역할."""
+    return conn.execute(
+        text(f"SELECT created_at, id FROM {TABLE} WHERE user_id = :user_id "
+             "ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET :offset"),
+        {"user_id": user_id, "offset": depth},
+    ).first()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--checkpoints", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="측정 후 임시 테이블 유지")
+    args = parser.parse_args()
+
+    heavy_user = args.users + 1
+    light_user = 1
+    rng = random.Random(42)
+
+    try:
+        with engine.begin() as conn:
+            create_table(conn)
+
+        print(f"[1] 적재하면서 구간별 측정 (rows={args.rows:,}, users={args.users:,})")
+        print(f"  {'rows':>12} | {'recent(heavy)':>13} | {'recent(light)':>13} | {'page1(heavy)':>12}")
+        loaded = 0
+        for checkpoint in range(1, args.checkpoints + 1):
+            target = args.rows * checkpoint // args.checkpoints
+            started = time.perf_counter()
+            with engine.begin() as conn:
+                populate(conn, loaded + 1, target, args.users, heavy_user, rng)
+                conn.execute(text(f"ANALYZE TABLE {TABLE}"))
+            loaded = target
+            with engine.connect() as conn:
+                heavy_ms, _ = timed(conn, RECENT_QUERY, {"user_id": heavy_user}, args.repeat)
+                light_ms, _ = timed(conn, RECENT_QUERY, {"user_id": light_user}, args.repeat)
+                page_ms, _ = timed(conn, FIRST_PAGE_QUERY, {"user_id": heavy_user}, args.repeat)
+            print(
+                f"  {loaded:>12,} | {heavy_ms:>11.2f}ms | {light_ms:>11.2f}ms | {page_ms:>10.2f}ms"
+                f"   (적재 {time.perf_counter() - started:.0f}s)"
+            )
+
+        with engine.connect() as conn:
+            heavy_total = conn.execute(
+                text(f"SELECT COUNT(*) FROM {TABLE} WHERE user_id = :user_id"), {"user_id": heavy_user}
+            ).scalar()
+            depth = heavy_total * 9 // 10
+            cursor = deep_cursor(conn, heavy_user, depth)
+            keyset_params = {"user_id": heavy_user, "created_at": cursor.created_at, "id": cursor.id}
+            offset_params = {"user_id": heavy_user, "offset": depth + 1}
+
+            keyset_ms, keyset_rows = timed(conn, KEYSET_QUERY, keyset_params, args.repeat)
+            offset_ms, offset_rows = timed(conn, OFFSET_QUERY, offset_params, args.repeat)
+            assert [r.id for r in keyset_rows] == [r.id for r in offset_rows], "키셋/OFFSET 결과 불일치"
+
+            print(f"\n[2] 깊은 페이지 (heavy user 메시지 {heavy_total:,}건 중 {depth:,}번째 이후)")
+            print(f"  KEYSET p50={keyset_ms:9.2f}ms")
+            print(f"  OFFSET p50={offset_ms:9.2f}ms")
+
+            print("\n[3] EXPLAIN")
+            print("  최근 대화 (복합 인덱스):")
+            explain(conn, RECENT_QUERY, {"user_id": heavy_user})
+            print("  키셋 페이지:")
+            explain(conn, KEYSET_QUERY, keyset_params)
+
+            # 기존 스키마(user_id 단일 인덱스)와 비교
+            ignored = RECENT_QUERY.replace(f"FROM {TABLE}", f"FROM {TABLE} IGNORE INDEX (ix_bench_user_created)")
+            before_ms, _ = timed(conn, ignored, {"user_id": heavy_user}, args.repeat)
+            print("  최근 대화 (user_id 단일 인덱스 - 기존 스키마):")
+            explain(conn, ignored, {"user_id": heavy_user})
+            print(f"\n[4] 최근 대화 로드 (heavy user): 복합 인덱스 {heavy_ms:.2f}ms vs 기존 {before_ms:.2f}ms")
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+
+
+if __name__ == "__main__":
+    main()
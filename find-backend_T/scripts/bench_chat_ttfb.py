@@ -0,0 +1,73 @@
+"""
+/api/v1/agent/chat 과 /api/v1/agent/chat/stream 의 Time-to-first-byte(TTFB)를 비교합니다.
+
+- TTFB: 요청 전송 후 첫 바이트를 받을 때까지의 시간
+- first token: 스트리밍 엔드포인트에서 첫 token 이벤트를 받을 때까지의 시간
+- total: 응답이 끝날 때까지의 시간
+
+사용법:
+    python scripts/bench_chat_ttfb.py --message "애플 현금흐름 알려줘" --runs 3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_quote_latency_during_chat import get_token  # noqa: E402
+
+
+async def measure_plain(client: httpx.AsyncClient, headers: dict, message: str) -> dict:
+    start = time.perf_counter()
+    async with client.stream("POST", "/api/v1/agent/chat", json={"message": message}, headers=headers) as response:
+        ttfb = None
+        async for _ in response.aiter_bytes():
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+    return {"ttfb": ttfb, "first_token": ttfb, "total": time.perf_counter() - start}
+
+
+async def measure_stream(client: httpx.AsyncClient, headers: dict, message: str) -> dict:
+    start = time.perf_counter()
+    ttfb = first_token = None
+    async with client.stream("POST", "/api/v1/agent/chat/stream", json={"message": message}, headers=headers) as response:
+        async for line in response.aiter_lines():
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+            if line.startswith("data: ") and first_token is None:
+                event = json.loads(line[len("data: "):])
+                if event.get("type") == "token":
+                    first_token = time.perf_counter() - start
+    return {"ttfb": ttfb, "first_token": first_token, "total": time.perf_counter() - start}
+
+
+def _fmt(value) -> str:
+    return f"{value:.2f}s" if value is not None else "-"
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--message", default="엔비디아 PER 어때?")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=180.0) as client:
+        headers = {"Authorization": f"Bearer {await get_token(client)}"}
+        for label, measure in (("/chat       ", measure_plain), ("/chat/stream", measure_stream)):
+            for run in range(args.runs):
+                result = await measure(client, headers, args.message)
+                print(
+                    f"{label} run {run + 1}: ttfb={_fmt(result['ttfb'])}  "
+                    f"first_token={_fmt(result['first_token'])}  total={_fmt(result['total'])}"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""
+로그인 폭주(기본 200건) 중 다른 요청의 지연시간을 측정하는 부하 벤치마크.
+
+1) 로그인 없이 quote / 대화 기록(/agent/history, sync 의존성 get_db·get_current_user 사용) /
+   답변 캐시에 적중하는 채팅 요청의 기준(baseline) 지연시간을 측정하고,
+2) 동시에 --logins 건의 /api/v1/auth/login 을 한꺼번에 보내며 같은 측정을 반복합니다.
+
+비밀번호 해싱이 공용 스레드풀에서 돌면 (2)에서 sync 의존성을 쓰는 요청이 해싱 대기열 뒤로 밀리고,
+전용 프로세스 풀(app/password_hasher.py)에서 돌면 두 구간의 지연시간이 거의 같게 유지됩니다.
+마지막에 /api/v1/auth/hasher-stats 로 해싱 풀의 최대 대기열 깊이와 평균 대기 시간을 출력합니다.
+
+사용법:
+    uvicorn main:app --port 8000  (단일 워커로 실행)
+    python scripts/bench_login_burst.py --logins 200 --ticker AAPL
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_quote_latency_during_chat import PASSWORD, USERNAME, get_token, summarize  # noqa: E402
+
+
+async def measure(
+    client: httpx.AsyncClient,
+    headers: dict,
+    ticker: str,
+    message: str,
+    duration: float,
+    interval: float,
+) -> Dict[str, List[float]]:
+    """duration 초 동안 quote / history / (캐시 적중) chat을 번갈아 호출하고 지연시간(ms)을 모읍니다."""
+    requests = {
+        "quote": lambda: client.get(f"/api/v1/company/quote/{ticker}"),
+        "history": lambda: client.get("/api/v1/agent/history?limit=20", headers=headers),
+        "chat": lambda: client.post("/api/v1/agent/chat", json={"message": message}, headers=headers),
+    }
+    latencies: Dict[str, List[float]] = {name: [] for name in requests}
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        for name, send in requests.items():
+            start = time.perf_counter()
+            response = await send()
+            latencies[name].append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                print(f"[WARN] {name} 응답 코드 {response.status_code}")
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def login_burst(base_url: str, count: int) -> List[float]:
+    """count건의 로그인을 동시에 보냅니다 (별도 커넥션 풀)."""
+    limits = httpx.Limits(max_connections=count)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300.0, limits=limits) as client:
+        async def login() -> float:
+            start = time.perf_counter()
+            response = await client.post("/api/v1/auth/login", data={"username": USERNAME, "password": PASSWORD})
+            response.raise_for_status()
+            return (time.perf_counter() - start) * 1000
+
+        return await asyncio.gather(*(login() for _ in range(count)))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--ticker", default="AAPL")
+    parser.add_argument("--logins", type=int, default=200, help="동시에 보낼 로그인 수")
+    parser.add_argument("--duration", type=float, default=10.0, help="구간별 측정 시간(초)")
+    parser.add_argument("--interval", type=float, default=0.05, help="측정 요청 간격(초)")
+    parser.add_argument("--message", default="애플 PER 알려줘")
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120.0) as client:
+        token = await get_token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        # 워밍업: quote 캐시 + 답변 캐시 채우기 (LLM 호출은 측정에서 제외)
+        await client.get(f"/api/v1/company/quote/{args.ticker}")
+        await client.post("/api/v1/agent/chat", json={"message": args.message}, headers=headers)
+
+        print("--- 1. Baseline (로그인 없음) ---")
+        baseline = await measure(client, headers, args.ticker, args.message, args.duration, args.interval)
+
+        print(f"--- 2. Login burst ({args.logins}건 동시 로그인) ---")
+        burst = asyncio.create_task(login_burst(args.base_url, args.logins))
+        under_load = await measure(client, headers, args.ticker, args.message, args.duration, args.interval)
+        login_latencies = await burst
+
+        stats = (await client.get("/api/v1/auth/hasher-stats", headers=headers)).json()
+
+    print("\n=== 결과 ===")
+    for name in baseline:
+        summarize(f"{name:<8} baseline  ", baseline[name])
+        summarize(f"{name:<8} login burst", under_load[name])
+    summarize("login    (burst 중)  ", login_latencies)
+    print(
+        f"해싱 풀: workers={stats.get('workers')} max_waiting={stats.get('max_waiting')} "
+        f"avg_wait={stats.get('avg_wait_ms')}ms avg_run={stats.get('avg_run_ms')}ms"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,152 @@
+"""
+/company/metrics/{ticker} 동시 처리량 벤치마크: 동기 Session(pymysql) vs AsyncSession(aiomysql).
+
+fetch_company_key_metrics는 두 세션을 모두 받으므로 같은 서비스 코드를 드라이버만 바꿔 비교합니다.
+1) inprocess (기본): 한 이벤트 루프에서 동시성 수준별로 요청을 실행하고 처리량(req/s), p50/p95,
+   이벤트 루프 지연(10ms 주기 타이머가 늦게 깨어난 최대 시간)을 측정합니다.
+   - sync : 요청마다 SessionLocal()  → 쿼리마다 루프가 멈춤 (기존 방식)
+   - async: 요청마다 AsyncSessionLocal() → DB 왕복 동안 다른 요청이 진행
+2) http: 실행 중인 서버의 /api/v1/company/metrics/{ticker} 로 동시 요청을 보냅니다.
+   이전 커밋(동기 세션)과 현재 커밋 서버에 각각 실행해 결과를 비교하세요.
+
+첫 호출은 FMP를 호출해 캐시를 채우므로 측정에서 제외합니다 (워밍업).
+
+사용법:
+    python scripts/bench_metrics_concurrency.py --tickers AAPL,MSFT,NVDA --requests 400 --concurrency 1,10,50
+    python scripts/bench_metrics_concurrency.py --mode http --base-url http://localhost:8000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import AsyncSessionLocal, SessionLocal, async_engine  # noqa: E402
+from app.services.key_metrics_service import fetch_company_key_metrics  # noqa: E402
+
+
+async def loop_lag_probe(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """interval마다 깨어나며 예정보다 늦게 깨어난 최대 시간(ms)을 반환합니다."""
+    worst = 0.0
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - expected)
+    return worst * 1000
+
+
+async def run_level(
+    call: Callable[[str], Awaitable[None]],
+    tickers: List[str],
+    total: int,
+    concurrency: int,
+) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(index: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await call(tickers[index % len(tickers)])
+            except Exception as exc:
+                errors += 1
+                print(f"[WARN] {exc}")
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(loop_lag_probe(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    lag = await probe
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "lag": lag,
+        "errors": errors,
+    }
+
+
+def print_row(label: str, concurrency: int, result: Dict[str, float]) -> None:
+    print(
+        f"  {label:<6} c={concurrency:<4} {result['rps']:8.1f} req/s  "
+        f"p50={result['p50']:7.1f}ms  p95={result['p95']:7.1f}ms  "
+        f"loop-lag max={result['lag']:7.1f}ms  errors={result['errors']}"
+    )
+
+
+async def bench_inprocess(args, tickers: List[str], levels: List[int]) -> None:
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        async def sync_call(ticker: str) -> None:
+            db = SessionLocal()
+            try:
+                await fetch_company_key_metrics(ticker, db, client, limit=args.limit)
+            finally:
+                db.close()
+
+        async def async_call(ticker: str) -> None:
+            async with AsyncSessionLocal() as db:
+                await fetch_company_key_metrics(ticker, db, client, limit=args.limit)
+
+        print("--- 워밍업 (캐시 채우기) ---")
+        for ticker in tickers:
+            await async_call(ticker)
+
+        print(f"\n=== 결과 (요청 {args.requests}건, limit={args.limit}) ===")
+        for concurrency in levels:
+            print_row("sync", concurrency, await run_level(sync_call, tickers, args.requests, concurrency))
+            print_row("async", concurrency, await run_level(async_call, tickers, args.requests, concurrency))
+    await async_engine.dispose()
+
+
+async def bench_http(args, tickers: List[str], levels: List[int]) -> None:
+    limits = httpx.Limits(max_connections=max(levels))
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60.0, limits=limits) as client:
+        async def http_call(ticker: str) -> None:
+            response = await client.get(f"/api/v1/company/metrics/{ticker}", params={"limit": args.limit})
+            response.raise_for_status()
+
+        print("--- 워밍업 (캐시 채우기) ---")
+        for ticker in tickers:
+            await http_call(ticker)
+
+        print(f"\n=== 결과 ({args.base_url}, 요청 {args.requests}건, limit={args.limit}) ===")
+        for concurrency in levels:
+            # loop-lag는 클라이언트 쪽 값이므로 참고용
+            print_row("http", concurrency, await run_level(http_call, tickers, args.requests, concurrency))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--tickers", default="AAPL,MSFT,NVDA")
+    parser.add_argument("--requests", type=int, default=400, help="동시성 수준별 총 요청 수")
+    parser.add_argument("--concurrency", default="1,10,50", help="쉼표로 구분한 동시성 수준")
+    parser.add_argument("--limit", type=int, default=3)
+    args = parser.parse_args()
+
+    tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+    levels = [int(c) for c in args.concurrency.split(",")]
+    if args.mode == "http":
+        await bench_http(args, tickers, levels)
+    else:
+        await bench_inprocess(args, tickers, levels)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,183 @@
+"""
+뉴스 심볼 조회 벤치마크: symbols LIKE '%TICKER%' vs news_article_symbols 인덱스.
+
+임시 테이블(bench_news_articles / bench_news_article_symbols)에 합성 뉴스 N건(기본 100만)을
+적재한 뒤, 같은 티커에 대해
+1) 기존 방식: symbols LIKE '%MS%' ORDER BY publishedDate DESC LIMIT 20
+2) 새 방식:   매핑 테이블 (symbol, publishedDate) 인덱스 JOIN
+의 응답 시간과 EXPLAIN, 그리고 "MS" 검색 시 "MSFT" 오탐 건수를 비교합니다.
+측정이 끝나면 임시 테이블은 삭제됩니다 (--keep 으로 유지 가능).
+
+사용법:
+    python scripts/bench_news_symbol_index.py --rows 1000000 --ticker MS
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+
+ARTICLES = "bench_news_articles"
+SYMBOLS = "bench_news_article_symbols"
+BATCH = 10_000
+
+# "MS"와 "MSFT"처럼 접두사가 겹치는 심볼을 일부러 포함
+SYMBOL_POOL = ["MS", "MSFT", "AAPL", "NVDA", "AMZN", "GOOGL", "META", "TSLA", "AMD", "INTC"] + [
+    f"S{i:03d}" for i in range(490)
+]
+
+LIKE_QUERY = f"""
+    SELECT id, title, publishedDate FROM {ARTICLES}
+    WHERE symbols LIKE :pattern
+    ORDER BY publishedDate DESC
+    LIMIT 20
+"""
+
+INDEX_QUERY = f"""
+    SELECT a.id, a.title, a.publishedDate FROM {SYMBOLS} s
+    JOIN {ARTICLES} a ON a.id = s.article_id
+    WHERE s.symbol = :symbol
+    ORDER BY s.publishedDate DESC
+    LIMIT 20
+"""
+
+
+def create_tables(conn) -> None:
+    conn.execute(text(f"DROP TABLE IF EXISTS {SYMBOLS}"))
+    conn.execute(text(f"DROP TABLE IF EXISTS {ARTICLES}"))
+    conn.execute(text(f"""
+        CREATE TABLE {ARTICLES} (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            url VARCHAR(512) NOT NULL UNIQUE,
+            title TEXT,
+            publishedDate TIMESTAMP NOT NULL,
+            symbols TEXT,
+            summary TEXT
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """))
+    conn.execute(text(f"""
+        CREATE TABLE {SYMBOLS} (
+            article_id INT NOT NULL,
+            symbol VARCHAR(20) NOT NULL,
+            publishedDate TIMESTAMP NOT NULL,
+            PRIMARY KEY (article_id, symbol),
+            INDEX ix_bench_symbol_published (symbol, publishedDate)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """))
+
+
+def populate(conn, total: int) -> None:
+    rng = random.Random(42)
+    base = datetime(2021, 1, 1)
+    next_id = 1
+    started = time.perf_counter()
+    while next_id <= total:
+        articles, links = [], []
+        for article_id in range(next_id, min(next_id + BATCH, total + 1)):
+            symbols = rng.sample(SYMBOL_POOL, rng.randint(1, 3))
+            published = base + timedelta(seconds=rng.randint(0, 4 * 365 * 24 * 3600))
+            articles.append({
+                "id": article_id,
+                "url": f"https://bench.example.com/news/{article_id}",
+                "title": f"Bench article {article_id}",
+                "publishedDate": published,
+                "symbols": ",".join(symbols),
+                "summary": "[bench] synthetic",
+            })
+            links.extend(
+                {"article_id": article_id, "symbol": symbol, "publishedDate": published}
+                for symbol in symbols
+            )
+        conn.execute(
+            text(f"INSERT INTO {ARTICLES} (id, url, title, publishedDate, symbols, summary) "
+                 "VALUES (:id, :url, :title, :publishedDate, :symbols, :summary)"),
+            articles,
+        )
+        conn.execute(
+            text(f"INSERT INTO {SYMBOLS} (article_id, symbol, publishedDate) "
+                 "VALUES (:article_id, :symbol, :publishedDate)"),
+            links,
+        )
+        next_id += BATCH
+        if (next_id - 1) % 100_000 == 0:
+            print(f"  적재 {next_id - 1:,}/{total:,} ({time.perf_counter() - started:.1f}s)")
+    conn.execute(text(f"ANALYZE TABLE {ARTICLES}, {SYMBOLS}"))
+
+
+def timed(conn, sql: str, params: dict, repeat: int):
+    timings = []
+    rows = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = conn.execute(text(sql), params).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, rows
+
+
+def explain(conn, sql: str, params: dict) -> None:
+    for row in conn.execute(text("EXPLAIN " + sql), params).mappings():
+        print(f"    table={row['table']} type={row['type']} key={row['key']} rows={row['rows']} extra={row['Extra']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--ticker", default="MS")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="측정 후 임시 테이블 유지")
+    args = parser.parse_args()
+    ticker = args.ticker.upper()
+
+    with engine.begin() as conn:
+        print(f"[1] 임시 테이블 생성 및 합성 뉴스 {args.rows:,}건 적재")
+        create_tables(conn)
+        populate(conn, args.rows)
+
+    try:
+        with engine.connect() as conn:
+            like_params = {"pattern": f"%{ticker}%"}
+            index_params = {"symbol": ticker}
+
+            print("\n[2] EXPLAIN")
+            print("  LIKE:")
+            explain(conn, LIKE_QUERY, like_params)
+            print("  INDEX:")
+            explain(conn, INDEX_QUERY, index_params)
+
+            like_ms, like_rows = timed(conn, LIKE_QUERY, like_params, args.repeat)
+            index_ms, _ = timed(conn, INDEX_QUERY, index_params, args.repeat)
+
+            false_positives = conn.execute(
+                text(f"SELECT COUNT(*) FROM {ARTICLES} WHERE symbols LIKE :pattern "
+                     f"AND id NOT IN (SELECT article_id FROM {SYMBOLS} WHERE symbol = :symbol)"),
+                {**like_params, **index_params},
+            ).scalar()
+            top20_false = sum(
+                1 for row in like_rows
+                if ticker not in conn.execute(
+                    text(f"SELECT symbols FROM {ARTICLES} WHERE id = :id"), {"id": row.id}
+                ).scalar().split(",")
+            )
+
+            print(f"\n[3] 결과 (ticker={ticker}, rows={args.rows:,}, repeat={args.repeat})")
+            print(f"  LIKE   p50={statistics.median(like_ms):9.2f}ms  max={max(like_ms):9.2f}ms")
+            print(f"  INDEX  p50={statistics.median(index_ms):9.2f}ms  max={max(index_ms):9.2f}ms")
+            print(f"  LIKE 오탐: 전체 {false_positives:,}건, 상위 20건 중 {top20_false}건")
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {SYMBOLS}"))
+                conn.execute(text(f"DROP TABLE IF EXISTS {ARTICLES}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+채팅(LLM) 부하 중 /api/v1/company/quote/{ticker} 지연시간을 측정하는 부하 벤치마크.
+
+1) 채팅 없이 quote 요청만 보내 기준(baseline) 지연시간을 측정하고,
+2) 동시에 N개의 /api/v1/agent/chat 요청을 흘려보내며 같은 측정을 반복합니다.
+
+LLM 호출이 이벤트 루프를 막으면 (2)의 p95/max가 채팅 응답 시간만큼 튀고,
+비동기 LLM 클라이언트가 적용되어 있으면 두 구간의 지연시간이 거의 같게 유지됩니다.
+
+사용법:
+    uvicorn main:app --port 8000  (단일 워커로 실행)
+    python scripts/bench_quote_latency_during_chat.py --chats 8 --ticker AAPL
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+
+USERNAME = "bench_user"
+PASSWORD = "bench_password123"
+
+
+async def get_token(client: httpx.AsyncClient) -> str:
+    login_data = {"username": USERNAME, "password": PASSWORD}
+    response = await client.post("/api/v1/auth/login", data=login_data)
+    if response.status_code != 200:
+        signup_data = {
+            "username": USERNAME,
+            "password": PASSWORD,
+            "name": "Bench User",
+            "age": 30,
+            "email": "bench@example.com",
+        }
+        await client.post("/api/v1/auth/signup", json=signup_data)
+        response = await client.post("/api/v1/auth/login", data=login_data)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def measure_quotes(client: httpx.AsyncClient, ticker: str, duration: float, interval: float) -> List[float]:
+    """duration 초 동안 interval 간격으로 quote를 호출하고 지연시간(ms) 목록을 반환합니다."""
+    latencies: List[float] = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get(f"/api/v1/company/quote/{ticker}")
+        latencies.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            print(f"[WARN] quote 응답 코드 {response.status_code}")
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run_chat(client: httpx.AsyncClient, token: str, message: str) -> float:
+    start = time.perf_counter()
+    response = await client.post(
+        "/api/v1/agent/chat",
+        json={"message": message},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    elapsed = time.perf_counter() - start
+    print(f"  chat 완료: {response.status_code} ({elapsed:.1f}s)")
+    return elapsed
+
+
+def summarize(label: str, latencies: List[float]) -> None:
+    if not latencies:
+        print(f"{label}: 측정값 없음")
+        return
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"{label}: n={len(ordered)}  p50={statistics.median(ordered):.1f}ms  "
+        f"p95={p95:.1f}ms  max={ordered[-1]:.1f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--ticker", default="AAPL")
+    parser.add_argument("--chats", type=int, default=8, help="동시에 실행할 채팅 수")
+    parser.add_argument("--duration", type=float, default=15.0, help="구간별 측정 시간(초)")
+    parser.add_argument("--interval", type=float, default=0.1, help="quote 호출 간격(초)")
+    parser.add_argument("--message", default="엔비디아 주가가 왜 떨어졌어?")
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120.0) as client:
+        token = await get_token(client)
+        # 캐시 워밍업 (첫 호출의 FMP 왕복은 측정에서 제외)
+        await client.get(f"/api/v1/company/quote/{args.ticker}")
+
+        print("--- 1. Baseline (채팅 없음) ---")
+        baseline = await measure_quotes(client, args.ticker, args.duration, args.interval)
+
+        print(f"--- 2. Under load ({args.chats}개 채팅 동시 실행) ---")
+        chat_tasks = [
+            asyncio.create_task(run_chat(client, token, args.message))
+            for _ in range(args.chats)
+        ]
+        under_load = await measure_quotes(client, args.ticker, args.duration, args.interval)
+        await asyncio.gather(*chat_tasks, return_exceptions=True)
+
+    print("\n=== 결과 ===")
+    summarize("baseline  ", baseline)
+    summarize("under load", under_load)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
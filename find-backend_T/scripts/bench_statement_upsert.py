@@ -0,0 +1,153 @@
+"""
+재무제표 저장 경로 벤치마크: 레코드별 SELECT → UPDATE/INSERT vs 일괄 upsert.
+
+가짜 티커(기본 ZZBENCH)의 분기 대차대조표 N건(기본 20)을
+1) 기존 방식: 레코드마다 SELECT 후 UPDATE/INSERT + 항목별 commit
+2) 새 방식:   INSERT ... ON DUPLICATE KEY UPDATE 한 문장 + commit 1회
+으로 여러 번 저장하고, 소요 시간과 실행된 SQL 문 수를 비교합니다.
+(두 방식 모두 "첫 적재"와 "재갱신"을 번갈아 측정하도록 매 반복마다 행을 지웁니다)
+
+사용법:
+    python scripts/bench_statement_upsert.py --rows 20 --repeat 10
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import event
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import models
+from app.database import SessionLocal, engine
+from app.services.bulk_upsert import bulk_upsert
+
+PERIOD = "quarter"
+
+_statement_count = 0
+_commit_count = 0
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_statements(conn, cursor, statement, parameters, context, executemany):
+    global _statement_count
+    _statement_count += 1
+
+
+@event.listens_for(engine, "commit")
+def _count_commits(conn):
+    global _commit_count
+    _commit_count += 1
+
+
+def make_rows(ticker: str, count: int, seed: int) -> List[Dict[str, Any]]:
+    base = date(2020, 3, 31)
+    rows = []
+    for i in range(count):
+        report_date = base + timedelta(days=91 * i)
+        rows.append({
+            "ticker": ticker,
+            "period": PERIOD,
+            "report_date": report_date,
+            "report_year": report_date.year,
+            "total_assets": 1_000_000 + i + seed,
+            "total_current_assets": 500_000 + i,
+            "total_liabilities": 400_000 + i,
+            "total_current_liabilities": 200_000 + i,
+            "total_noncurrent_liabilities": 200_000,
+            "total_equity": 600_000 + seed,
+            "cash_and_short_term_investments": 100_000,
+            "inventory": 10_000,
+            "accounts_receivable": 20_000,
+            "accounts_payable": 30_000,
+            "long_term_debt": 150_000,
+            "short_term_debt": 50_000,
+        })
+    return rows
+
+
+def legacy_upsert(db, rows: List[Dict[str, Any]]) -> None:
+    """기존 balance_sheet_service 방식 (레코드마다 조회 + 즉시 commit)."""
+    for row in rows:
+        existing = (
+            db.query(models.CompanyBalanceSheet)
+            .filter_by(ticker=row["ticker"], period=row["period"], report_date=row["report_date"])
+            .first()
+        )
+        if existing:
+            for key, value in row.items():
+                setattr(existing, key, value)
+        else:
+            db.add(models.CompanyBalanceSheet(**row))
+        db.commit()
+
+
+def bulk_path(db, rows: List[Dict[str, Any]]) -> None:
+    bulk_upsert(db, models.CompanyBalanceSheet, rows)
+    db.commit()
+
+
+def run(name: str, fn, ticker: str, count: int, repeat: int) -> None:
+    global _statement_count, _commit_count
+    timings = []
+    statements = []
+    commits = []
+    db = SessionLocal()
+    try:
+        for i in range(repeat):
+            # 짝수 회차는 빈 테이블(첫 적재), 홀수 회차는 기존 행 갱신
+            if i % 2 == 0:
+                db.query(models.CompanyBalanceSheet).filter_by(ticker=ticker).delete()
+                db.commit()
+            rows = make_rows(ticker, count, seed=i)
+            _statement_count = 0
+            _commit_count = 0
+            start = time.perf_counter()
+            fn(db, rows)
+            timings.append((time.perf_counter() - start) * 1000)
+            statements.append(_statement_count)
+            commits.append(_commit_count)
+    finally:
+        db.query(models.CompanyBalanceSheet).filter_by(ticker=ticker).delete()
+        db.commit()
+        db.close()
+
+    print(
+        f"{name:<8} rows={count:<3} "
+        f"avg={statistics.mean(timings):8.2f}ms  "
+        f"p50={statistics.median(timings):8.2f}ms  "
+        f"max={max(timings):8.2f}ms  "
+        f"SQL/refresh={statistics.mean(statements):.1f}  "
+        f"commit/refresh={statistics.mean(commits):.1f}"
+    )
+
+
+def ensure_profile(ticker: str) -> None:
+    db = SessionLocal()
+    try:
+        if not db.query(models.CompanyProfile).filter_by(ticker=ticker).first():
+            db.add(models.CompanyProfile(ticker=ticker, companyName="Bench Corp", last_updated=datetime.utcnow()))
+            db.commit()
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ticker", default="ZZBENCH")
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    ensure_profile(args.ticker)
+    run("legacy", legacy_upsert, args.ticker, args.rows, args.repeat)
+    run("bulk", bulk_path, args.ticker, args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+의도 라우터 확인 스크립트: 예시 질문별로 감지된 의도, 별칭 인덱스가 찾은 티커,
+미리 실행할 도구 목록과 별칭 인덱스 조회 시간을 출력합니다. (LLM/FMP 호출 없음)
+인자 없이 실행하면 한글 별칭이 다른 단어의 일부("메타버스", "소비자")로 잡히지 않는지도 확인하고,
+기대와 다르면 종료 코드 1로 끝납니다.
+
+사용법:
+    python scripts/check_intent_router.py
+    python scripts/check_intent_router.py "엔비디아 왜 떨어졌어?"
+"""
+
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.database import SessionLocal
+from app.mcp.intent_router import route_question
+from app.services.company_alias_index import get_alias_index
+
+SAMPLES = [
+    "애플 실적 어땠어?",
+    "엔비디아 PER 비싸?",
+    "테슬라 왜 떨어졌어?",
+    "NVDA랑 AMD 요즘 뉴스",
+    "마이크로소프트 주가 추세",
+    "그럼 작년은?",
+]
+
+# (질문, 기대 티커): 한글 별칭 단어 경계
+BOUNDARY_CASES = [
+    ("소비자 물가 발표 후 엔비디아 어때?", ["NVDA"]),  # 비자(V) 아님
+    ("메타버스 관련주", []),                           # 메타(META) 아님
+    ("파인애플 가격", []),                             # 애플(AAPL) 아님
+    ("인텔리전스 뭐야", []),                           # 인텔(INTC) 아님
+    ("엔비디아랑 테슬라 비교", ["NVDA", "TSLA"]),       # 조사가 붙은 별칭은 인식
+    ("애플은 왜 떨어졌어?", ["AAPL"]),
+]
+
+
+def check_boundaries(db) -> int:
+    index = get_alias_index(db)
+    failures = 0
+    print("\n[한글 별칭 경계]")
+    for question, expected in BOUNDARY_CASES:
+        found = index.find_in_text(question)
+        ok = found == expected
+        failures += not ok
+        print(f"  {'OK  ' if ok else 'FAIL'} {question} → {found} (기대 {expected})")
+    return failures
+
+
+def main() -> int:
+    questions = sys.argv[1:] or SAMPLES
+    failures = 0
+    db = SessionLocal()
+    try:
+        for question in questions:
+            start = time.perf_counter()
+            plan = route_question(question, db)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(f"\nQ: {question}  ({elapsed_ms:.1f}ms)")
+            print(f"  intents : {plan.intents}")
+            print(f"  tickers : {plan.tickers}")
+            for name, args in plan.calls:
+                print(f"  prefetch: {name}({args})")
+        if not sys.argv[1:]:
+            failures = check_boundaries(db)
+    finally:
+        db.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
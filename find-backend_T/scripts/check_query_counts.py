@@ -0,0 +1,88 @@
+"""
+서비스별 SQL 쿼리 수 / N+1 점검 스크립트.
+
+주요 서비스를 track_queries 범위 안에서 두 번씩(캐시 MISS 가능 / 캐시 HIT) 실행하고
+쿼리 수, DB 시간, 가장 많이 반복된 SQL 모양을 출력합니다.
+--strict 를 주면 같은 모양의 쿼리가 --threshold 번 이상 반복된 서비스가 있을 때 종료 코드 1로 끝납니다
+(CI나 변경 전후 점검용).
+
+사용법:
+    python scripts/check_query_counts.py AAPL
+    python scripts/check_query_counts.py AAPL MSFT --threshold 3 --strict
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.database import AsyncSessionLocal, SessionLocal, async_engine
+from app.query_counter import NPlusOneDetected, track_queries
+from app.services.income_statement_service import fetch_company_income_statements
+from app.services.key_metrics_service import fetch_company_key_metrics
+from app.services.ratings_service import fetch_analyst_ratings
+
+
+async def run_key_metrics(ticker, client):
+    async with AsyncSessionLocal() as db:
+        await fetch_company_key_metrics(ticker, db, client, limit=5)
+
+
+async def run_ratings(ticker, client):
+    with SessionLocal() as db:
+        await fetch_analyst_ratings(ticker, db, client, limit=10)
+
+
+async def run_income_statements(ticker, client):
+    with SessionLocal() as db:
+        await fetch_company_income_statements(ticker, db, client, limit=5)
+
+
+SERVICES = {
+    "fetch_company_key_metrics": run_key_metrics,
+    "fetch_analyst_ratings": run_ratings,
+    "fetch_company_income_statements": run_income_statements,
+}
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("tickers", nargs="+")
+    parser.add_argument("--threshold", type=int, default=None, help="기본값: N_PLUS_ONE_THRESHOLD")
+    parser.add_argument("--strict", action="store_true", help="N+1 의심이 있으면 종료 코드 1")
+    args = parser.parse_args()
+
+    failures = []
+    async with httpx.AsyncClient(timeout=30) as client:
+        for ticker in args.tickers:
+            for name, run in SERVICES.items():
+                for attempt in (1, 2):
+                    label = f"{name}({ticker}) {attempt}회차"
+                    try:
+                        with track_queries(label, threshold=args.threshold, strict=args.strict) as stats:
+                            await run(ticker.upper(), client)
+                    except NPlusOneDetected as e:
+                        failures.append(str(e))
+                    summary = stats.summary()
+                    print(f"{label:<52} 쿼리 {summary['queries']:>4}개  DB {summary['db_ms']:>8.1f}ms  "
+                          f"최대 반복 {summary['max_repeat']}")
+                    for suspect in summary["suspects"][:3]:
+                        print(f"    x{suspect['count']}  {suspect['statement'][:140]}")
+    await async_engine.dispose()
+
+    if failures:
+        print(f"\nN+1 의심 {len(failures)}건:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
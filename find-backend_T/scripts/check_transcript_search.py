@@ -0,0 +1,76 @@
+"""
+컨퍼런스 콜 문단 검색 확인 스크립트: 전문 전체와 top-k 문단의 토큰 수를 비교하고,
+두 번째 조회부터 FMP 호출 없이 저장본을 쓰는지 확인합니다.
+
+사용법:
+    python scripts/check_transcript_search.py NVDA "data center demand guidance"
+    python scripts/check_transcript_search.py AAPL "china iphone" --year 2024 --quarter 4 --top-k 3
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.database import SessionLocal
+from app.mcp.compaction import compact_tool_response, estimate_tokens
+from app.services.earnings_service import fetch_earnings_call_transcript, search_earnings_call_transcript
+
+
+class CountingClient(httpx.AsyncClient):
+    """FMP(업스트림) 호출 횟수를 세는 클라이언트."""
+
+    calls = 0
+
+    async def get(self, *args, **kwargs):
+        CountingClient.calls += 1
+        return await super().get(*args, **kwargs)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("ticker")
+    parser.add_argument("query")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--quarter", type=int)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        async with CountingClient(timeout=30) as client:
+            for attempt in (1, 2):
+                before = CountingClient.calls
+                start = time.perf_counter()
+                result = await search_earnings_call_transcript(
+                    args.ticker, args.query, db, client, args.year, args.quarter, args.top_k
+                )
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                print(f"\n[{attempt}회차] {elapsed_ms:.1f}ms, FMP 호출 {CountingClient.calls - before}회")
+                if result.get("error"):
+                    print(f"  에러: {result['error']}")
+                    return
+                for passage in result["passages"]:
+                    print(f"  #{passage['seq']} [{passage['section']}] {passage['speaker']} ({passage['score']})")
+                    print(f"    {passage['text'][:160]}...")
+
+            full = await fetch_earnings_call_transcript(args.ticker, db, client, args.year, args.quarter)
+            full_tokens = estimate_tokens(full.get("content") or "")
+            compacted_tokens = estimate_tokens(compact_tool_response("fetch_earnings_call_transcript", full))
+            passage_tokens = estimate_tokens(compact_tool_response("search_earnings_call_transcript", result))
+            print(f"\n전문 전체: ~{full_tokens:,} tokens (압축 후 전송: ~{compacted_tokens:,})")
+            print(f"top-{args.top_k} 문단: ~{passage_tokens:,} tokens")
+            print(f"총 FMP 호출: {CountingClient.calls}회")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())